@@ -0,0 +1,118 @@
+# -*- coding: UTF-8 -*-
+"""
+Long-lived camera subscription with a small ring buffer of recent frames.
+
+Subscribing to ALVideoDevice takes hundreds of milliseconds, so instead of
+subscribing on every detection the stream keeps the camera open, grabs frames
+on a background thread and hands out the freshest one instantly. The camera
+is released again after `idle_timeout` seconds without anybody asking.
+"""
+
+import collections
+import threading
+import time
+
+# ALVideoDevice resolution ids
+RESOLUTIONS = {
+    0: (160, 120),  # kQQVGA
+    1: (320, 240),  # kQVGA
+    2: (640, 480),  # kVGA
+    3: (1280, 960),  # k4VGA
+}
+RGB_COLORSPACE = 11  # kRGBColorSpace
+
+
+class CameraStream(object):
+
+    def __init__(self, video, logger, name, camera_index=0, resolution=2,
+                 fps=10, buffer_size=3, idle_timeout=60.0, first_frame_timeout=3.0):
+        if resolution not in RESOLUTIONS:
+            raise ValueError("Unknown resolution id %s, expected one of %s" % (resolution, RESOLUTIONS.keys()))
+        self.video = video
+        self.logger = logger
+        self.name = name
+        self.camera_index = camera_index
+        self.resolution = resolution
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.first_frame_timeout = first_frame_timeout
+
+        self._frames = collections.deque(maxlen=buffer_size)  # (timestamp, nao_img)
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._handle = None
+        self._thread = None
+        self._running = False
+        self._last_used = 0.0
+
+    @property
+    def running(self):
+        return self._running
+
+    def latest(self):
+        """Returns the freshest buffered frame, subscribing first if needed."""
+        self._last_used = time.time()
+        if not self._running:
+            self.start()
+        with self._lock:
+            deadline = time.time() + self.first_frame_timeout
+            while not self._frames and self._running and time.time() < deadline:
+                self._new_frame.wait(deadline - time.time())
+            if not self._frames:
+                return None
+            return self._frames[-1][1]
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            width, height = RESOLUTIONS[self.resolution]
+            self.logger.info("Subscribing camera %s (%dx%d, %d FPS)", self.name, width, height, self.fps)
+            self._handle = self.video.subscribeCamera(
+                self.name + "_" + str(time.time()), self.camera_index,
+                self.resolution, RGB_COLORSPACE, self.fps
+            )
+            self._frames.clear()
+            self._running = True
+            self._last_used = time.time()
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        thread = self._thread
+        self._release()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(2.0)
+
+    def _release(self):
+        with self._lock:
+            self._running = False
+            self._thread = None
+            handle, self._handle = self._handle, None
+            self._frames.clear()
+            self._new_frame.notify_all()
+        if handle is not None:
+            self.video.unsubscribe(handle)
+            self.logger.info("Camera %s released", self.name)
+
+    def _run(self):
+        period = 1.0 / self.fps
+        handle = self._handle
+        # a restarted stream gets a new handle, the old thread then just exits
+        while self._running and self._handle == handle:
+            started = time.time()
+            if started - self._last_used > self.idle_timeout:
+                self.logger.info("Camera idle for %.0fs, releasing", self.idle_timeout)
+                self._release()
+                return
+            try:
+                nao_img = self.video.getImageRemote(handle)
+            except Exception as e:
+                self.logger.warn("Failed to grab frame: %s", str(e))
+                nao_img = None
+            if nao_img is not None:
+                with self._lock:
+                    self._frames.append((time.time(), nao_img))
+                    self._new_frame.notify_all()
+            time.sleep(max(0.0, period - (time.time() - started)))
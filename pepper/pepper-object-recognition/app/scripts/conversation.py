@@ -12,6 +12,8 @@ class Conversation:
         self.memory_length = memory_length
         self.language = language
         self.inter_frame_memory = {}  # {label: {"frames_seen": .., "last_seen": ....}}
+        # {(label, track_id): {"last_seen": ....}}, objects of a tracking session
+        self.track_memory = {}
 
     def no_data_message(self):
         return get_random_phrase(self.language, "NO_DATA")
@@ -22,7 +24,10 @@ class Conversation:
             return label.encode("utf-8")
         return str(label)
 
-    def observe_current_frame(self, clean_labels, now):
+    def observe_current_frame(self, clean_labels, now, track_ids=None):
+        """With track ids from server side tracking every object is remembered on
+        its own, so a second cup is new even while the first one is in view.
+        frames_seen is counted per label either way, it drives the phrasing."""
         newly_seen = []
 
         for label in clean_labels:
@@ -32,11 +37,17 @@ class Conversation:
                     "frames_seen": 1,
                     "last_seen": now,
                 }
-                newly_seen.append(label)
+                if track_ids is None:
+                    newly_seen.append(label)
             else:
                 # seen before: increment frames_seen
                 self.inter_frame_memory[label]["frames_seen"] += 1
                 self.inter_frame_memory[label]["last_seen"] = now
+        if track_ids is not None:
+            for key in zip(clean_labels, track_ids):
+                if key not in self.track_memory:
+                    newly_seen.append(key[0])
+                self.track_memory[key] = {"last_seen": now}
         logger.info("The robot sees for the first time: %s", str(newly_seen))
         return newly_seen
 
@@ -45,26 +56,32 @@ class Conversation:
             "Looking for labels to forget, memory length: %s", self.memory_length
         )
         forget_before = now - self.memory_length
-        to_delete = []
+        for memory in (self.inter_frame_memory, self.track_memory):
+            to_delete = []
 
-        for label, info in self.inter_frame_memory.items():
-            if info["last_seen"] < forget_before:
-                to_delete.append(label)
+            for key, info in memory.items():
+                if info["last_seen"] < forget_before:
+                    to_delete.append(key)
 
-        logger.info("The robot is going to forget %s", str(to_delete))
-        logger.info("Memory before deletion: %s", str(self.inter_frame_memory))
-        for label in to_delete:
-            del self.inter_frame_memory[label]
+            logger.info("The robot is going to forget %s", str(to_delete))
+            logger.info("Memory before deletion: %s", str(memory))
+            for key in to_delete:
+                del memory[key]
 
-        logger.info("Memory after deletion: %s", str(self.inter_frame_memory))
+            logger.info("Memory after deletion: %s", str(memory))
 
-    def observe(self, labels):
+    def observe(self, labels, only_new=False, track_ids=None):
+        """Returns a sentence about the labels, with only_new=True None when
+        nothing new was seen (used by watch mode to stay quiet). track_ids, one
+        per label, come with objects of a tracking session."""
         now = time.time()
         clean_labels = [self._clean_label(label) for label in labels]
         # forget
         self.forget(now)
         # observe
-        newly_seen = self.observe_current_frame(clean_labels, now)
+        newly_seen = self.observe_current_frame(clean_labels, now, track_ids)
+        if only_new and not newly_seen:
+            return None
         # if newly_seen:
         #     # if something new seen, talk about that only ?
         #     return self.get_sentence(newly_seen)
@@ -17,9 +17,15 @@ import stk.services
 import stk.logging
 import time
 import io
-import requests
+import socket
 from PIL import Image
+from camera import CameraStream
 from conversation import Conversation
+from transport import ServerTransport
+from watcher import SceneWatcher
+
+# ALVideoDevice colorspace ids -> raw upload colorspace names
+NAO_COLORSPACES = {11: "rgb", 13: "bgr"}
 
 
 class PepperObjectRecognition(object):
@@ -38,12 +44,39 @@ class PepperObjectRecognition(object):
 
         # Config of connection
         self.server_base_url = "http://localhost:8000"
-        self.server_url = self.server_base_url + "/api/detect"
         self.conf_threshold = 0.3
+        # send raw camera buffer instead of JPEG, saves encoding on the robot
+        self.upload_raw = True
+        self.transport = ServerTransport(
+            self.server_base_url,
+            self.logger,
+            use_stream=False,  # True: one WebSocket for frames, results and sentences
+            compression=None,  # None, "lz4" or "zstd"
+            tracking_session=None,  # e.g. "pepper": watch mode tracks objects, counts them individually
+            client_id=socket.gethostname(),  # robots sharing one server are told apart
+        )
 
         # Initialize Logic
         self.conversation = Conversation(memory_length=50, language="cs")
         self.camera_handle = None
+        # keep the camera subscribed between detections, None subscribes per detection
+        self.camera = CameraStream(
+            self.video,
+            self.logger,
+            self.APP_ID,
+            resolution=2,  # 640x480
+            fps=5,
+            idle_timeout=60.0,
+        )
+        # continuous watch mode, only frames where the scene changed go to the server
+        self.watcher = SceneWatcher(
+            self.camera,
+            self.send_frame,
+            self.handle_watch_data,
+            self.logger,
+            target_fps=2.0,
+            change_threshold=6.0,
+        )
 
     @qi.bind(returnType=qi.Void, paramsType=[qi.String])
     def detect(self, lang_code):
@@ -56,33 +89,58 @@ class PepperObjectRecognition(object):
         self.detect_and_speak()
 
     def detect_and_speak(self):
+        self.logger.info("Taking picture...")
+        nao_img = self.take_picture()
+
+        if nao_img is None:
+            self.logger.warn("No picture taken.")
+            self.tts.say(self.conversation.no_data_message())
+            return
+
+        # the server reports a tracked object from its second frame on, a single
+        # query would miss what was just put in front of the robot
+        data = self.send_frame(nao_img, track=False)
+        self.handle_processed_data(data)
+
+    def send_frame(self, nao_img, track=True):
+        if self.upload_raw:
+            return self.get_processed_data_from_server_raw(nao_img, track)
+        img_bytes = self._process_nao_image(nao_img)
+        return self.get_processed_data_from_server(img_bytes, track)
+
+    @qi.bind(returnType=qi.Void, paramsType=[qi.String])
+    def startWatching(self, lang_code):
+        """
+        Called by Dialog, robot keeps watching and comments on new objects.
+        lang_code: 'en' or 'cs'
+        """
+        if self.camera is None:
+            self.logger.warn("Watch mode needs the persistent camera stream.")
+            return
+        self.conversation.language = lang_code
+        self.watcher.start()
+
+    @qi.bind(returnType=qi.Void, paramsType=[])
+    def stopWatching(self):
+        self.watcher.stop()
+
+    def take_picture(self):
+        if self.camera is not None:
+            return self.camera.latest()
+
         # Subscribe to camera temporarily
         camera_name = self.APP_ID + "_" + str(time.time())
         self.logger.info("Starting camera called: %s, resolution 640x480, RGB color, 10 FPS", camera_name)
         self.camera_handle = self.video.subscribeCamera(camera_name, 0, 2, 11, 10)
         self.logger.info("Camera started")
-
         try:
-            self.logger.info("Taking picture...")
-            nao_img = self.video.getImageRemote(self.camera_handle)
-
-            if nao_img is None:
-                self.logger.warn("No picture taken.")
-                self.tts.say(self.conversation.no_data_message())
-                return
-
-            img_bytes = self._process_nao_image(nao_img)
-            data = self.get_processed_data_from_server(img_bytes)
-            self.handle_processed_data(data)
-
+            return self.video.getImageRemote(self.camera_handle)
         finally:
             # Freeing up the camera
             if self.camera_handle:
                 self.video.unsubscribe(self.camera_handle)
                 self.camera_handle = None
 
-
-
     def _process_nao_image(self, nao_img):
         width = nao_img[0]
         height = nao_img[1]
@@ -94,33 +152,18 @@ class PepperObjectRecognition(object):
         img_jpeg_bytes = img_buffer.getvalue()
         return img_jpeg_bytes
 
-    def get_processed_data_from_server(self, img_jpeg_bytes):
-        data = {}
-        try:
-            files = {
-                "image": ("capture.jpg", img_jpeg_bytes, "image/jpeg")
-            }
-            response = requests.post(self.server_url, files=files, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-            else:
-                self.logger.warn("Server returned %d", response.status_code)
-        except Exception, e:
-            self.logger.error("Network Request failed: %s", str(e))
-        return data
+    def get_processed_data_from_server(self, img_jpeg_bytes, track=True):
+        return self.transport.detect_jpeg(img_jpeg_bytes, track)
+
+    def get_processed_data_from_server_raw(self, nao_img, track=True):
+        width = nao_img[0]
+        height = nao_img[1]
+        colorspace = NAO_COLORSPACES.get(nao_img[3], "rgb")
+        return self.transport.detect_raw(width, height, colorspace, str(nao_img[6]), track)
 
     def send_sentence_to_server(self, sentence):
-        try:
-            payload = {"sentence": sentence}
-            response = requests.post(
-                self.server_base_url + "/dashboard/sentence",
-                json=payload,
-                timeout=3
-            )
-            if response.status_code != 200:
-                self.logger.warn("Dashboard server returned %d", response.status_code)
-        except Exception as e:
-            self.logger.error("Failed sending sentence to dashboard: %s", str(e))
+        # fire-and-forget, the next detection does not wait for the dashboard
+        self.transport.send_sentence(sentence)
 
     def handle_processed_data(self, data):
         objects = data.get("objects", [])
@@ -139,11 +182,30 @@ class PepperObjectRecognition(object):
             self.logger.info("No labels for objects detected.")
             return
 
-        sentence = self.conversation.observe(labels)
+        sentence = self.conversation.observe(labels, track_ids=self._track_ids(objects))
+        self.logger.info("[ROBOT]: %s", sentence)
+        self.tts.say(sentence)
+        self.send_sentence_to_server(sentence)
+
+    def handle_watch_data(self, data):
+        objects = data.get("objects", [])
+        labels = [obj["label"] for obj in objects]
+        # in watch mode speak up only when something new shows up
+        sentence = self.conversation.observe(
+            labels, only_new=True, track_ids=self._track_ids(objects)
+        )
+        if sentence is None:
+            return
         self.logger.info("[ROBOT]: %s", sentence)
         self.tts.say(sentence)
         self.send_sentence_to_server(sentence)
 
+    def _track_ids(self, objects):
+        """Track ids of the objects, None unless the server tracks this session."""
+        if not objects or "track_id" not in objects[0]:
+            return None
+        return [obj["track_id"] for obj in objects]
+
     @qi.bind(returnType=qi.Void, paramsType=[])
     def stop(self):
         "Stop the service."
@@ -152,8 +214,12 @@ class PepperObjectRecognition(object):
 
     def cleanup(self):
         self.logger.info("Cleaning up")
+        self.watcher.stop()
         if self.camera_handle:
             self.video.unsubscribe(self.camera_handle)
+        if self.camera is not None:
+            self.camera.stop()
+        self.transport.close()
         self.logger.info("Cleaned up")
 
     @qi.nobind
@@ -0,0 +1,207 @@
+# -*- coding: UTF-8 -*-
+"""
+Robot side of the connection to the detection server.
+
+Keeps one pooled keep-alive HTTP session, sends dashboard sentences
+fire-and-forget from a background thread and optionally talks to the server
+over a single WebSocket (/api/stream) carrying frames up and results back.
+"""
+
+import json
+import Queue
+import threading
+import urllib
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import websocket  # websocket-client
+except ImportError:
+    websocket = None
+
+
+class ServerTransport(object):
+
+    def __init__(self, base_url, logger, timeout=5, use_stream=False, compression=None,
+                 tracking_session=None, client_id=None):
+        self.base_url = base_url
+        self.logger = logger
+        self.timeout = timeout
+        self.compression = compression  # None, "lz4" or "zstd" for raw frames
+        # session id for server side tracking, objects then carry a track_id
+        self.tracking_session = tracking_session
+
+        self.session = requests.Session()
+        # names the robot to the server: per-robot config, rate limit and fair share
+        self.client_id = client_id
+        if client_id:
+            self.session.headers["X-Client-Id"] = client_id
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        self.use_stream = use_stream and websocket is not None
+        if use_stream and websocket is None:
+            self.logger.warn("websocket-client not installed, using HTTP transport")
+        self._ws = None
+        self._ws_lock = threading.Lock()
+
+        self._sentences = Queue.Queue(maxsize=16)
+        self._sentence_worker = threading.Thread(target=self._send_sentences)
+        self._sentence_worker.daemon = True
+        self._sentence_worker.start()
+
+    # frames
+
+    def detect_jpeg(self, img_jpeg_bytes, track=True):
+        """track=False leaves the frame out of the tracking session."""
+        session = self.tracking_session if track else None
+        if self.use_stream:
+            header = {"type": "frame", "format": "jpeg"}
+            if session:
+                header["session"] = session
+            data = self._stream_frame(header, img_jpeg_bytes)
+            if data is not None:
+                return data
+        files = {"image": ("capture.jpg", img_jpeg_bytes, "image/jpeg")}
+        form = {"session": session} if session else None
+        return self._post_for_json("/api/detect", files=files, data=form)
+
+    def detect_raw(self, width, height, colorspace, data, track=True):
+        session = self.tracking_session if track else None
+        compression, payload = self._compress(data)
+        self.logger.info("Sending raw image (%dx%d %s, compression %s)", width, height, colorspace, compression)
+        if self.use_stream:
+            header = {
+                "type": "frame",
+                "format": "raw",
+                "width": width,
+                "height": height,
+                "colorspace": colorspace,
+                "compression": compression,
+            }
+            if session:
+                header["session"] = session
+            result = self._stream_frame(header, payload)
+            if result is not None:
+                return result
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "X-Frame-Width": str(width),
+            "X-Frame-Height": str(height),
+            "X-Frame-Colorspace": colorspace,
+            "X-Frame-Compression": compression,
+        }
+        if session:
+            headers["X-Session"] = session
+        return self._post_for_json("/api/detect/raw", data=payload, headers=headers)
+
+    def _compress(self, data):
+        if self.compression == "lz4" and lz4 is not None:
+            return "lz4", lz4.frame.compress(data)
+        if self.compression == "zstd" and zstandard is not None:
+            return "zstd", zstandard.ZstdCompressor(level=1).compress(data)
+        if self.compression:
+            self.logger.warn("Compression %s not available, sending uncompressed", self.compression)
+        return "none", data
+
+    def _post_for_json(self, path, **kwargs):
+        data = {}
+        try:
+            response = self.session.post(self.base_url + path, timeout=self.timeout, **kwargs)
+            if response.status_code == 200:
+                data = response.json()
+            else:
+                self.logger.warn("Server returned %d", response.status_code)
+        except Exception, e:
+            self.logger.error("Network Request failed: %s", str(e))
+        return data
+
+    # sentences
+
+    def send_sentence(self, sentence):
+        """Queues the sentence for the dashboard and returns immediately."""
+        try:
+            self._sentences.put_nowait(sentence)
+        except Queue.Full:
+            self.logger.warn("Sentence queue full, dropping: %s", sentence)
+
+    def _send_sentences(self):
+        while True:
+            sentence = self._sentences.get()
+            if sentence is None:
+                return
+            if self.use_stream and self._stream_send({"type": "sentence", "text": sentence}):
+                continue
+            try:
+                response = self.session.post(
+                    self.base_url + "/dashboard/sentence",
+                    json={"sentence": sentence},
+                    timeout=3
+                )
+                if response.status_code != 200:
+                    self.logger.warn("Dashboard server returned %d", response.status_code)
+            except Exception as e:
+                self.logger.error("Failed sending sentence to dashboard: %s", str(e))
+
+    # websocket stream
+
+    def _stream_url(self):
+        url = self.base_url.replace("http://", "ws://", 1) + "/api/stream"
+        if self.client_id:
+            url += "?client=" + urllib.quote(self.client_id)
+        return url
+
+    def _connect_stream(self):
+        if self._ws is None:
+            self._ws = websocket.create_connection(self._stream_url(), timeout=self.timeout)
+            self.logger.info("Connected to server stream %s", self._stream_url())
+        return self._ws
+
+    def _drop_stream(self, error):
+        self.logger.warn("Server stream failed, falling back to HTTP: %s", str(error))
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        self._ws = None
+
+    def _stream_send(self, message):
+        with self._ws_lock:
+            try:
+                self._connect_stream().send(json.dumps(message))
+                return True
+            except Exception as e:
+                self._drop_stream(e)
+                return False
+
+    def _stream_frame(self, header, payload):
+        """Sends one frame over the stream, None means use HTTP instead."""
+        with self._ws_lock:
+            try:
+                ws = self._connect_stream()
+                ws.send(json.dumps(header))
+                ws.send_binary(payload)
+                return json.loads(ws.recv())
+            except Exception as e:
+                self._drop_stream(e)
+                return None
+
+    def close(self):
+        try:
+            self._sentences.put_nowait(None)
+        except Queue.Full:
+            pass  # daemon thread, dies with the service
+        with self._ws_lock:
+            if self._ws is not None:
+                self._ws.close()
+                self._ws = None
+        self.session.close()
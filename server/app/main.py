@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 import logging
 
@@ -6,6 +7,10 @@ from fastapi.staticfiles import StaticFiles
 
 from app.routes import dashboard
 from app.routes import detect
+from app.routes import health
+from app.routes import metrics
+from app.services.annotation import annotation_worker
+from app.services.metrics import ServerTimingMiddleware
 
 LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -27,20 +32,33 @@ logger.info("Initializing FastAPI server...")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("Startup: Initializing Detection Service Translations...")
-    await detect.DETECTION_SERVICE.initialize_translations()
-    logger.info("Startup: Translations loaded.")
+    # the model loads in the background, /health/ready reports when it is done
+    logger.info("Startup: Loading detection model and translations...")
+    startup = asyncio.create_task(detect.DETECTION_SERVICE.start())
+    detect.BATCH_SCHEDULER.start()
+    annotation_worker.start()
     yield
     logger.info("Shutdown: Cleaning up...")
+    startup.cancel()
+    if detect.MODEL_SWITCH is not None:
+        detect.MODEL_SWITCH.cancel()
+    if detect.LANGUAGE_SWITCH is not None:
+        detect.LANGUAGE_SWITCH.cancel()
+    await detect.BATCH_SCHEDULER.stop()
+    await annotation_worker.stop()
+    detect.DETECTION_SERVICE.close()
 
 
 app = FastAPI(
     title="Pepper Object Detection Server", version="0.1.0", lifespan=lifespan
 )
+app.add_middleware(ServerTimingMiddleware)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 
 app.include_router(detect.router, prefix="/api")
 app.include_router(dashboard.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 logger.info("Server initialized")
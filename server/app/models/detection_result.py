@@ -1,3 +1,7 @@
+from dataclasses import dataclass
+
+import numpy as np
+import orjson
 from pydantic import BaseModel
 from pydantic import Field
 
@@ -10,9 +14,61 @@ class DetectionObject(BaseModel):
     bbox: list[float] = Field(
         ..., description="Bounding box of object", min_length=4, max_length=4
     )
+    track_id: int | None = Field(
+        None, description="Identity of the object across frames, tracking mode only"
+    )
 
 
 class DetectionResponse(BaseModel):
     objects: list[DetectionObject] = Field(
         ..., description="List of detected objects of type DetectionObject"
     )
+    imgsz: int | None = Field(None, description="Inference resolution")
+
+
+@dataclass(frozen=True)
+class Detections:
+    """Columnar detections of one image, host-side NumPy arrays.
+
+    Hot-path counterpart of DetectionResponse: filtering works on masks and
+    serialisation goes straight to JSON bytes of the same shape, without building
+    a DetectionObject per box."""
+
+    boxes: np.ndarray  # (N, 4) float32 xyxy
+    confidences: np.ndarray  # (N,) float32
+    class_ids: np.ndarray  # (N,) int64
+    labels: np.ndarray  # (N,) object, display labels
+    imgsz: int | None = None  # inference resolution
+    track_ids: np.ndarray | None = None  # (N,) int64, tracking mode only
+
+    def __len__(self) -> int:
+        return len(self.confidences)
+
+    def select(self, mask: np.ndarray) -> "Detections":
+        return Detections(
+            boxes=self.boxes[mask],
+            confidences=self.confidences[mask],
+            class_ids=self.class_ids[mask],
+            labels=self.labels[mask],
+            imgsz=self.imgsz,
+            track_ids=None if self.track_ids is None else self.track_ids[mask],
+        )
+
+    def to_objects(self) -> list[dict]:
+        objects = [
+            {"label": label, "confidence": confidence, "bbox": bbox}
+            for label, confidence, bbox in zip(
+                self.labels.tolist(),
+                self.confidences.tolist(),
+                self.boxes.tolist(),
+                strict=True,
+            )
+        ]
+        if self.track_ids is not None:
+            for obj, track_id in zip(objects, self.track_ids.tolist(), strict=True):
+                obj["track_id"] = track_id
+        return objects
+
+    def to_json(self) -> bytes:
+        """Serialises as DetectionResponse JSON."""
+        return orjson.dumps({"objects": self.to_objects(), "imgsz": self.imgsz})
@@ -1,19 +1,80 @@
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from pydantic_settings import SettingsConfigDict
-import torch
 
 DEFAULT_MODEL_NAME = "rtdetr-x.pt"
 DEFAULT_LANGUAGE = "en"
 DETECTION_CONFIG = {
     "confidence_threshold": None,
+    "classes": None,  # allow list of labels or class ids, None allows all
+    "exclude_classes": (),
+    "max_detections": None,
     "model": DEFAULT_MODEL_NAME,
     "language": DEFAULT_LANGUAGE,
 }
 
 
+def parse_classes(value: str | list | tuple | None) -> tuple[str, ...] | None:
+    """Normalises a class list given as "person,3,cup" or a JSON list."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(str(c).strip().lower() for c in value if str(c).strip())
+
+
+@dataclass(frozen=True)
+class DetectionOptions:
+    """Inference options of one request, pushed into the model predict call.
+
+    Hashable, so requests with equal options can share a batch and cache entries.
+    None keeps the model default (conf 0.25, no class filter, 300 detections)."""
+
+    confidence_threshold: float | None = None
+    classes: tuple[str, ...] | None = None
+    exclude_classes: tuple[str, ...] = ()
+    max_detections: int | None = None
+    imgsz: int | None = None
+    tiled: bool = False
+
+    def __post_init__(self):
+        if self.confidence_threshold is not None and not (
+            0 <= self.confidence_threshold <= 1
+        ):
+            raise ValueError(
+                f"Confidence threshold must be in [0, 1], got {self.confidence_threshold}"
+            )
+        if self.max_detections is not None and self.max_detections < 1:
+            raise ValueError(
+                f"Max detections must be positive, got {self.max_detections}"
+            )
+        if self.imgsz is not None and self.imgsz < 32:
+            raise ValueError(f"Image size must be at least 32, got {self.imgsz}")
+
+    @classmethod
+    def from_config(cls, config: dict = DETECTION_CONFIG, **overrides):
+        """Global DETECTION_CONFIG values, overridden by the non-None request ones."""
+        values = {
+            "confidence_threshold": config.get("confidence_threshold"),
+            "classes": parse_classes(config.get("classes")),
+            "exclude_classes": parse_classes(config.get("exclude_classes")) or (),
+            "max_detections": config.get("max_detections"),
+            "imgsz": None,
+            "tiled": False,
+        }
+        for name, value in overrides.items():
+            if value is None:
+                continue
+            if name in ("classes", "exclude_classes"):
+                value = parse_classes(value)
+            values[name] = value
+        return cls(**values)
+
+
 class YOLOSettings(BaseSettings):
     """Settable by enviroment variables PEPPER_{var}"""
 
@@ -32,11 +93,188 @@ class YOLOSettings(BaseSettings):
     )
     # will not let user set this, as this should be set by the one who sets up the server
     imgsz: int = Field(640, description="image size")
+    imgsz_steps: list[int] = Field(
+        [320, 480, 640],
+        description="resolutions of fast mode and of the adaptive controller, capped at imgsz",
+    )
+    adaptive_imgsz: bool = Field(
+        False,
+        description="lower the resolution of auto mode requests while the batch queue latency is above target",
+    )
+    target_queue_ms: float = Field(
+        50.0, gt=0, description="batch queue latency the adaptive resolution aims for"
+    )
+    tiling: bool = Field(
+        False,
+        description="sliced inference by default, requests can still switch it per frame",
+    )
+    tile_max_scale: float = Field(
+        1.5,
+        gt=0,
+        description="frames are sliced until no tile is downscaled more than this to imgsz",
+    )
+    tile_overlap: float = Field(
+        0.2, ge=0, lt=1, description="overlap of neighbouring tiles, fraction of a tile"
+    )
+    max_tiles: int = Field(8, ge=1, description="maximum number of tiles per frame")
+    tile_nms_threshold: float = Field(
+        0.6,
+        gt=0,
+        le=1,
+        description="intersection over the smaller box above which tile detections are merged",
+    )
+    tracker: str = Field(
+        "bytetrack.yaml",
+        description="ultralytics tracker config of tracking sessions, bytetrack.yaml, botsort.yaml or a path",
+    )
+    max_tracking_sessions: int = Field(
+        64,
+        ge=1,
+        description="tracking sessions kept at once, the least recently used ones are dropped",
+    )
+    tracking_session_ttl_s: float = Field(
+        60.0, gt=0, description="seconds an idle tracking session is kept"
+    )
+    track_skip_frames: int = Field(
+        0,
+        ge=0,
+        description="frames in a row a tracking session may skip detection, moving its tracks by their motion model",
+    )
+    max_clients: int = Field(
+        64,
+        ge=1,
+        description="client sessions kept at once, the least recently used ones are dropped",
+    )
+    client_ttl_s: float = Field(
+        600.0,
+        gt=0,
+        description="seconds an idle client session without config overrides is kept",
+    )
+    client_rate_limit: float = Field(
+        0.0,
+        ge=0,
+        description="frames per second each client may send, 0 is unlimited, clients can override it",
+    )
+    client_burst: float = Field(
+        10.0, ge=1, description="frames a client may send at once above its rate limit"
+    )
     language: str = Field(DEFAULT_LANGUAGE, description="language of labels")
+    label_languages: list[str] = Field(
+        [],
+        description='languages whose label catalogues are prepared for loaded models after startup, e.g. ["cs", "fr"]',
+    )
+    translation_backends: list[Literal["dictionary", "google"]] = Field(
+        ["dictionary", "google"],
+        description='translation backends tried in order for labels missing from the translation cache, ["dictionary"] works offline',
+    )
+    translation_dictionary_dir: str | None = Field(
+        None,
+        description="directory of <language>.json label dictionaries, default detection_models/translations",
+    )
+    translation_batch_size: int = Field(
+        50, ge=1, description="labels sent in one translation request"
+    )
+    translation_concurrency: int = Field(
+        2, ge=1, description="translation requests in flight at once"
+    )
+    translation_retries: int = Field(
+        3, ge=0, description="retries of a failed translation request, with backoff"
+    )
+    translation_timeout_s: float = Field(
+        10.0, gt=0, description="timeout of one translation request"
+    )
+    model_memory_budget_mb: float = Field(
+        4096,
+        gt=0,
+        description="memory budget for models kept loaded at once, least recently used ones are evicted",
+    )
+    result_cache_size: int = Field(
+        256,
+        ge=0,
+        description="number of cached detection results, 0 disables the cache",
+    )
+    result_cache_ttl_s: float = Field(
+        5.0, gt=0, description="seconds a cached detection result stays valid"
+    )
+    result_cache_perceptual: bool = Field(
+        False,
+        description="match near-duplicate frames by perceptual hash instead of exact content",
+    )
+    result_cache_max_distance: int = Field(
+        4, ge=0, le=64, description="max dHash bit distance of a perceptual cache hit"
+    )
+    model_backends: dict[str, str] = Field(
+        {},
+        description='inference backend per model, e.g. {"rtdetr-x.pt": "openvino-int8"}, exported and cached on first load',
+    )
+    export_calibration_data: str | None = Field(
+        None, description="ultralytics dataset yaml used to calibrate INT8 exports"
+    )
+    workers: int = Field(
+        0,
+        ge=0,
+        description="number of inference worker processes, 0 runs inference in the web process",
+    )
+    worker_devices: list[str] = Field(
+        [],
+        description='devices assigned to workers round robin, e.g. ["cuda:0", "cuda:1"], defaults to device',
+    )
+    worker_timeout_s: float = Field(
+        60.0, gt=0, description="seconds an inference worker may take for a predict job"
+    )
+    worker_load_timeout_s: float = Field(
+        600.0,
+        gt=0,
+        description="seconds an inference worker may take to load, export and warm up a model",
+    )
+    fused_model_cache: bool = Field(
+        False,
+        description="keep fused .pt models in detection_models/.cache, so restarts skip fusing",
+    )
+    warmup_runs: int = Field(
+        1,
+        ge=0,
+        description="inference passes on a blank frame after a model is loaded, before it serves requests",
+    )
+    warmup_batch_size: int = Field(
+        1, ge=1, description="number of frames in each warm-up pass"
+    )
+    precision: Literal["fp32", "fp16", "bf16"] = Field(
+        "fp32",
+        description="inference precision of .pt models, fp16 needs CUDA, exported models keep their export precision",
+    )
+    compile: bool | str = Field(
+        False,
+        description='torch.compile .pt models, true or a mode such as "reduce-overhead" or "max-autotune-no-cudagraphs"',
+    )
+    channels_last: bool = Field(
+        False, description="channels-last memory layout for .pt models"
+    )
+    torch_threads: int | None = Field(
+        None,
+        ge=1,
+        description="torch intra-op CPU threads, default torch's choice (split across inference workers)",
+    )
+    torch_interop_threads: int | None = Field(
+        None, ge=1, description="torch inter-op CPU threads, default torch's choice"
+    )
+    max_batch_size: int = Field(
+        8, ge=1, description="maximum number of images in one batched predict call"
+    )
+    max_batch_wait_ms: float = Field(
+        5.0,
+        ge=0,
+        description="how long the batch scheduler waits for more requests before running a batch",
+    )
 
     @property
     def device_actual(self):
-        return self.device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if self.device:
+            return self.device
+        # imported here, so importing the settings does not pull in torch
+        import torch
+
+        return "cuda" if torch.cuda.is_available() else "cpu"
 
     @property
     def model_path(self) -> Path:
@@ -38,7 +38,7 @@ async def list_models():
     """Return a list of available detection models stored in detection_models folder."""
     try:
         models = DETECTION_SERVICE.available_models
-        return {"models": models}
+        return {"models": models, "loaded": DETECTION_SERVICE.pool.loaded}
     except Exception as e:
         return {"models": [], "error": str(e)}
 
@@ -1,104 +1,515 @@
 import asyncio
-import base64
-import io
+import json
 import logging
-import random
+import time
+import uuid
 
 from fastapi import APIRouter
+from fastapi import Form
+from fastapi import Header
 from fastapi import Request
 from fastapi import UploadFile
+from fastapi import WebSocket
+from fastapi import WebSocketDisconnect
 from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from PIL import Image
-from PIL import ImageDraw
-from PIL import ImageFont
+from fastapi.responses import Response
+import orjson
 
+from app.models.detection_result import Detections
 from app.models.detection_settings import DETECTION_CONFIG
+from app.models.detection_settings import DetectionOptions
+from app.models.detection_settings import parse_classes
+from app.services.annotation import annotation_worker
+from app.services.batching import BatchScheduler
+from app.services.clients import CONFIG_KEYS
+from app.services.clients import ClientRegistry
+from app.services.clients import ClientSession
 from app.services.detection import DetectionService
+from app.services.detection import UnknownClassesError
+from app.services.frames import DecodedFrame
+from app.services.frames import FrameFormatError
+from app.services.metrics import stage
+from app.services.tracking import TrackingService
 from app.services.ws_manager import ws_manager
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 DETECTION_SERVICE = DetectionService()
-
-
-def get_color_encoding(objects: list[dict]) -> dict[str, str]:
-    logger.info("Running color encoding, computing unique colors for labels...")
-    unique_labels = list({obj["label"] for obj in objects})
-    colors = {
-        label: tuple(random.choices(range(50, 256), k=3)) for label in unique_labels
-    }
-    logger.info(f"{len(colors)} colors assigned")
-    return colors
-
-
-def annotate_image(
-    img_bytes: bytes, objects: list[dict], colors: dict[str, str]
-) -> str:
-    logger.info(f"Annotating image with {len(objects)} objects")
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    draw = ImageDraw.Draw(img)
-    w, h = img.size
-    num_objects = max(1, len(objects))
-    font_size = max(10, int(h * 0.05 / (num_objects**0.5)))  # bulharske konstanty
-    try:
-        # font supportingunicode is beter
-        font = ImageFont.truetype(
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size
-        )
-    except OSError:
-        font = ImageFont.load_default()
-    rect_width = max(2, int(h * 0.005))
-    for obj in objects:
-        x1, y1, x2, y2 = obj["bbox"]
-        label = obj["label"]
-        conf = obj["confidence"]
-        color = colors[label]
-        draw.rectangle([x1, y1, x2, y2], outline=color, width=rect_width)
-        text = f"{label} {conf:.2f}"
-        bbox = font.getbbox(text)
-        text_w, text_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-
-        text_bg = [x1, y1 - text_h - 2, x1 + text_w + 2, y1]
-        draw.rectangle(text_bg, fill=color)
-        draw.text((x1 + 1, y1 - text_h - 1), text, fill="black", font=font)
-
-    buffered = io.BytesIO()
-    img.save(buffered, format="JPEG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+BATCH_SCHEDULER = BatchScheduler(
+    DETECTION_SERVICE.detect_batch,
+    max_batch_size=DETECTION_SERVICE.settings.max_batch_size,
+    max_wait_ms=DETECTION_SERVICE.settings.max_batch_wait_ms,
+    # one batch in flight per inference worker
+    max_concurrent_batches=max(1, DETECTION_SERVICE.settings.workers),
+    # queue latency drives the adaptive resolution of "auto" requests
+    observe_queue=DETECTION_SERVICE.resolution.observe,
+)
+CLIENTS = ClientRegistry(
+    max_clients=DETECTION_SERVICE.settings.max_clients,
+    ttl_s=DETECTION_SERVICE.settings.client_ttl_s,
+    rate_limit=DETECTION_SERVICE.settings.client_rate_limit,
+    burst=DETECTION_SERVICE.settings.client_burst,
+)
+TRACKING = TrackingService(
+    tracker=DETECTION_SERVICE.settings.tracker,
+    max_sessions=DETECTION_SERVICE.settings.max_tracking_sessions,
+    ttl_s=DETECTION_SERVICE.settings.tracking_session_ttl_s,
+    skip_frames=DETECTION_SERVICE.settings.track_skip_frames,
+)
+# background model switch started by /config/model
+MODEL_SWITCH: asyncio.Task | None = None
+# language switch started by /config/language, still running if labels are missing
+LANGUAGE_SWITCH: asyncio.Task | None = None
+LANGUAGE_SWITCH_WAIT_S = 5.0
 
 
 @router.post("/detect")
-async def detect(image: UploadFile) -> JSONResponse:
-    """API endpoint which runs object recognition inference on a single image instance."""
+async def detect(
+    image: UploadFile,
+    model: str | None = Form(None),
+    conf: float | None = Form(None),
+    classes: str | None = Form(None),
+    exclude_classes: str | None = Form(None),
+    max_det: int | None = Form(None),
+    mode: str | None = Form(None),
+    tiled: bool | None = Form(None),
+    session: str | None = Form(None),
+    client_id: str | None = Header(None, alias="X-Client-Id"),
+) -> Response:
+    """API endpoint which runs object recognition inference on a single image instance.
+
+    Optional `model` form field selects one of the available models for this request,
+    the default model is used otherwise. `conf`, `classes`, `exclude_classes`
+    (comma separated labels or class ids) and `max_det` override the global
+    detection config for this request, unknown class names are rejected with 400.
+    `mode` picks the resolution: "fast" for continuous watching, "precise" for
+    full resolution, "auto" (default) lets the server adapt it to load. The
+    response reports the resolution used as `imgsz`. `tiled` switches sliced
+    inference for small objects in large frames, the server default is
+    PEPPER_TILING. A `session` id turns on tracking: frames of
+    one session are tracked together and objects carry a stable `track_id`.
+    The X-Client-Id header names the robot, its session config (see
+    /config/client) fills in what the request leaves out and its frames are
+    rate limited and scheduled fairly against the other robots."""
+    client = CLIENTS.get(client_id)
+    if not client.admit():
+        return _rate_limited(client)
     img_bytes = await image.read()
+    model = model or client.config.get("model")
+    if model is not None and model not in DETECTION_SERVICE.available_models:
+        return JSONResponse(
+            status_code=400, content={"error": "Model not available", "detail": model}
+        )
+    try:
+        options = _detection_options(
+            client, conf, classes, exclude_classes, max_det, mode, tiled
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400, content={"error": "Invalid options", "detail": str(e)}
+        )
     try:
         logger.info("Running detection endpoint...")
-        response = await run_in_threadpool(DETECTION_SERVICE.detect, img_bytes)
-        response_dict = response.model_dump()
-        confidence_threshold = DETECTION_CONFIG.get("confidence_threshold")
-        if confidence_threshold is not None:
-            response_dict["objects"] = [
-                obj
-                for obj in response_dict["objects"]
-                if obj["confidence"] > confidence_threshold
-            ]
-        colors = get_color_encoding(response_dict["objects"])
-        annotated_image_b64 = await run_in_threadpool(
-            annotate_image, img_bytes, response_dict["objects"], colors
+        with stage("decode"):
+            frame = await run_in_threadpool(DecodedFrame.from_bytes, img_bytes)
+        detections = await _run_detection(frame, model, options, client, session)
+        return _json_response(detections)
+    except UnknownClassesError as e:
+        return JSONResponse(
+            status_code=400, content={"error": "Unknown classes", "detail": e.classes}
         )
-        broadcast_message = {
-            "objects": response_dict["objects"],
-            "image": annotated_image_b64,
-            "colors": colors,
-        }
-        asyncio.create_task(ws_manager.broadcast(broadcast_message))
-        return JSONResponse(status_code=200, content=response_dict)
     except Exception as e:
         logger.error(f"Detection failed: {e}")
         return JSONResponse(content={"error": "Inference failed", "detail": str(e)})
 
 
+@router.post("/detect/raw")
+async def detect_raw(
+    request: Request,
+    width: int = Header(..., alias="X-Frame-Width", gt=0),
+    height: int = Header(..., alias="X-Frame-Height", gt=0),
+    colorspace: str = Header("rgb", alias="X-Frame-Colorspace"),
+    compression: str = Header("none", alias="X-Frame-Compression"),
+    model: str | None = Header(None, alias="X-Model"),
+    conf: float | None = Header(None, alias="X-Confidence"),
+    classes: str | None = Header(None, alias="X-Classes"),
+    exclude_classes: str | None = Header(None, alias="X-Exclude-Classes"),
+    max_det: int | None = Header(None, alias="X-Max-Detections"),
+    mode: str | None = Header(None, alias="X-Mode"),
+    tiled: bool | None = Header(None, alias="X-Tiled"),
+    session: str | None = Header(None, alias="X-Session"),
+    client_id: str | None = Header(None, alias="X-Client-Id"),
+) -> Response:
+    """API endpoint which runs inference on a raw 8-bit RGB/BGR frame.
+
+    The request body is the interleaved pixel buffer, optionally compressed with
+    lz4 or zstd, described by the X-Frame-* headers. No image decoding happens on
+    the server, the buffer is handed to the model as a NumPy view. Detection
+    options, mode, tiling, the tracking session and the client are set per
+    request the same way as in /detect, via headers."""
+    client = CLIENTS.get(client_id)
+    if not client.admit():
+        return _rate_limited(client)
+    body = await request.body()
+    model = model or client.config.get("model")
+    if model is not None and model not in DETECTION_SERVICE.available_models:
+        return JSONResponse(
+            status_code=400, content={"error": "Model not available", "detail": model}
+        )
+    try:
+        options = _detection_options(
+            client, conf, classes, exclude_classes, max_det, mode, tiled
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400, content={"error": "Invalid options", "detail": str(e)}
+        )
+    try:
+        with stage("decode"):
+            # decompressing a large frame would stall the event loop
+            frame = await run_in_threadpool(
+                DecodedFrame.from_raw, body, width, height, colorspace, compression
+            )
+    except FrameFormatError as e:
+        return JSONResponse(
+            status_code=400, content={"error": "Invalid frame", "detail": str(e)}
+        )
+    try:
+        logger.info(f"Running raw detection endpoint ({width}x{height} {colorspace})")
+        detections = await _run_detection(frame, model, options, client, session)
+        return _json_response(detections)
+    except UnknownClassesError as e:
+        return JSONResponse(
+            status_code=400, content={"error": "Unknown classes", "detail": e.classes}
+        )
+    except Exception as e:
+        logger.error(f"Detection failed: {e}")
+        return JSONResponse(content={"error": "Inference failed", "detail": str(e)})
+
+
+@router.websocket("/stream")
+async def stream(websocket: WebSocket):
+    """Persistent robot channel carrying frames up and results back.
+
+    Each frame is a JSON header {"type": "frame", "format": "jpeg" | "raw", ...}
+    followed by one binary message with the image; raw frames carry the same
+    width/height/colorspace/compression fields as /detect/raw, optional model,
+    conf, classes, exclude_classes, max_det, mode and tiled fields work as in
+    /detect. Frames with "track": true are tracked in a session of the connection,
+    or in the one named by a "session" field. The client is named by the `client`
+    query parameter, each connection is a client of its own otherwise. The server
+    answers every frame with {"type": "result", "objects": [...], "imgsz": ...},
+    or with {"type": "result", "error": ..., "detail": ...}; a malformed header or
+    a message of the wrong kind is answered the same way and the stream goes on.
+    Messages {"type": "sentence", "text": ...} are forwarded to the dashboard,
+    unanswered."""
+    await websocket.accept()
+    connection_session = f"stream-{uuid.uuid4().hex}"
+    client_id = websocket.query_params.get("client") or connection_session
+    logger.info(f"Robot stream connected (client {client_id})")
+    try:
+        while True:
+            try:
+                header = _stream_header(await _receive(websocket))
+            except ValueError as e:
+                await _send_result(
+                    websocket, {"error": "Invalid header", "detail": str(e)}
+                )
+                continue
+            if header.get("type") == "sentence":
+                await ws_manager.broadcast(
+                    {"type": "sentence", "text": header.get("text", "")}
+                )
+                continue
+            payload = (await _receive(websocket)).get("bytes")
+            if payload is None:
+                await _send_result(
+                    websocket,
+                    {"error": "Invalid frame", "detail": "Expected a binary frame"},
+                )
+                continue
+            session = header.get("session")
+            if session is not None:
+                session = str(session)
+            elif header.get("track"):
+                session = connection_session
+            client = CLIENTS.get(client_id)
+            if client.admit():
+                result = await _run_stream_frame(header, payload, client, session)
+            else:
+                result = {"error": "Rate limit exceeded", "detail": client_id}
+            await _send_result(websocket, result)
+    except WebSocketDisconnect:
+        logger.info("Robot stream disconnected")
+    finally:
+        TRACKING.close(connection_session)
+        if client_id == connection_session:
+            # an anonymous connection is a client of its own, a reconnect is a new one
+            CLIENTS.close(client_id)
+
+
+async def _receive(websocket: WebSocket) -> dict:
+    """Next text or binary message of the stream."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    return message
+
+
+def _stream_header(message: dict) -> dict:
+    text = message.get("text")
+    if text is None:
+        raise ValueError("Expected a JSON header, got a binary message")
+    # JSONDecodeError is a ValueError too
+    header = json.loads(text)
+    if not isinstance(header, dict):
+        raise ValueError("Header must be a JSON object")
+    return header
+
+
+async def _send_result(websocket: WebSocket, result: dict):
+    with stage("serialize"):
+        text = orjson.dumps({"type": "result", **result}).decode()
+    await websocket.send_text(text)
+
+
+async def _run_stream_frame(
+    header: dict, payload: bytes, client: ClientSession, session: str | None
+) -> dict:
+    model = header.get("model") or client.config.get("model")
+    if model is not None and model not in DETECTION_SERVICE.available_models:
+        return {"error": "Model not available", "detail": model}
+    try:
+        options = _detection_options(
+            client,
+            header.get("conf"),
+            header.get("classes"),
+            header.get("exclude_classes"),
+            header.get("max_det"),
+            header.get("mode"),
+            header.get("tiled"),
+        )
+    except (TypeError, ValueError) as e:
+        return {"error": "Invalid options", "detail": str(e)}
+    try:
+        with stage("decode"):
+            if header.get("format", "jpeg") == "raw":
+                frame = await run_in_threadpool(
+                    DecodedFrame.from_raw,
+                    payload,
+                    int(header["width"]),
+                    int(header["height"]),
+                    header.get("colorspace", "rgb"),
+                    header.get("compression", "none"),
+                )
+            else:
+                frame = await run_in_threadpool(DecodedFrame.from_bytes, payload)
+    except (FrameFormatError, KeyError, ValueError) as e:
+        return {"error": "Invalid frame", "detail": str(e)}
+    try:
+        detections = await _run_detection(frame, model, options, client, session)
+        return {"objects": detections.to_objects(), "imgsz": detections.imgsz}
+    except UnknownClassesError as e:
+        return {"error": "Unknown classes", "detail": e.classes}
+    except Exception as e:
+        logger.error(f"Detection failed: {e}")
+        return {"error": "Inference failed", "detail": str(e)}
+
+
+def _detection_options(
+    client: ClientSession,
+    conf=None,
+    classes=None,
+    exclude_classes=None,
+    max_det=None,
+    mode=None,
+    tiled=None,
+) -> DetectionOptions:
+    """Global detection config overridden by the client's session config, then by
+    the options given with the request.
+
+    The resolution mode is resolved here, so requests of one batch share imgsz."""
+    if mode is None:
+        mode = client.config.get("mode")
+    if tiled is None:
+        tiled = client.config.get("tiled")
+    return DetectionOptions.from_config(
+        {**DETECTION_CONFIG, **client.config},
+        confidence_threshold=None if conf is None else float(conf),
+        classes=classes,
+        exclude_classes=exclude_classes,
+        max_detections=None if max_det is None else int(max_det),
+        imgsz=DETECTION_SERVICE.resolution.for_mode(mode),
+        tiled=DETECTION_SERVICE.settings.tiling if tiled is None else bool(tiled),
+    )
+
+
+def _rate_limited(client: ClientSession) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"error": "Rate limit exceeded", "detail": client.client_id},
+    )
+
+
+def _json_response(detections: Detections) -> Response:
+    with stage("serialize"):
+        content = detections.to_json()
+    return Response(content=content, media_type="application/json")
+
+
+async def _run_detection(
+    frame: DecodedFrame,
+    model: str | None,
+    options: DetectionOptions,
+    client: ClientSession,
+    session: str | None = None,
+) -> Detections:
+    start = time.perf_counter()
+    client.requests += 1
+    try:
+        detections = await _detect(frame, model, options, client, session)
+    except Exception:
+        client.failed += 1
+        raise
+    client.observe(time.perf_counter() - start)
+    return detections
+
+
+async def _detect(
+    frame: DecodedFrame,
+    model: str | None,
+    options: DetectionOptions,
+    client: ClientSession,
+    session: str | None,
+) -> Detections:
+    await DETECTION_SERVICE.wait_ready()
+    if model is not None:
+        await DETECTION_SERVICE.ensure_model(model)
+    language = client.config.get("language")
+    if language is not None:
+        model = model or DETECTION_SERVICE.model_name
+        await DETECTION_SERVICE.ensure_labels(model, language)
+    if session is None:
+        # threshold and class filter run inside the model, no post filtering here
+        detections = await BATCH_SCHEDULER.submit(
+            frame, model, options, client.client_id, client.weight
+        )
+    else:
+        detections = await _run_tracking(frame, model, options, client, session)
+    # dashboard annotation runs in the background, only if someone is watching
+    annotation_worker.submit(frame, detections)
+    if language is not None:
+        detections = DETECTION_SERVICE.relabel(detections, model, language)
+    return detections
+
+
+async def _run_tracking(
+    frame: DecodedFrame,
+    model: str | None,
+    options: DetectionOptions,
+    client: ClientSession,
+    session: str,
+) -> Detections:
+    tracking = TRACKING.session(session)
+    # frames of a session are tracked in arrival order
+    async with tracking.lock:
+        with stage("track"):
+            detections = TRACKING.propagate(tracking, options)
+        if detections is not None:
+            return detections
+        detections = await BATCH_SCHEDULER.submit(
+            frame,
+            model,
+            TRACKING.detection_options(options),
+            client.client_id,
+            client.weight,
+        )
+        with stage("track"):
+            return await run_in_threadpool(
+                TRACKING.update, tracking, frame, detections, options
+            )
+
+
+@router.get("/clients")
+async def clients():
+    """Session config and request stats of every known client."""
+    return {
+        client.client_id: {"config": client.config, **client.stats}
+        for client in CLIENTS
+    }
+
+
+@router.get("/config/client/{client_id}")
+async def client_config(client_id: str):
+    """Session config and request stats of one client."""
+    client = CLIENTS.find(client_id)
+    if client is None:
+        return JSONResponse(
+            status_code=404, content={"error": "Unknown client", "detail": client_id}
+        )
+    return {"client": client_id, "config": client.config, **client.stats}
+
+
+@router.post("/config/client/{client_id}")
+async def set_client_config(client_id: str, request: Request):
+    """Api config endpoint which sets the session config of one robot.
+
+    Payload with any of confidence_threshold, classes, exclude_classes,
+    max_detections, model, language, mode (auto | fast | precise), tiled, weight
+    (share of inference against other clients, default 1) and rate_limit (frames
+    per second, 0 is unlimited). They override the global config for requests with
+    this X-Client-Id, null restores the global value. Omitted keys keep their
+    current value."""
+    data = await request.json()
+    logger.info(f"Received request to change config of client {client_id}: {data}")
+    update = {key: data[key] for key in CONFIG_KEYS if key in data}
+    try:
+        update = _client_config(update)
+    except (TypeError, ValueError) as e:
+        return {"ok": False, "error": str(e)}
+    client = CLIENTS.configure(client_id, update)
+    return {"ok": True, "client": client_id, "config": client.config}
+
+
+def _client_config(update: dict) -> dict:
+    """Validated and normalised client config update, raises ValueError."""
+    values = {key: value for key, value in update.items() if value is not None}
+    for key in ("classes", "exclude_classes"):
+        if key in values:
+            values[key] = parse_classes(values[key])
+    if "confidence_threshold" in values:
+        values["confidence_threshold"] = float(values["confidence_threshold"])
+    if "max_detections" in values:
+        values["max_detections"] = int(values["max_detections"])
+    DetectionOptions.from_config({**DETECTION_CONFIG, **values})
+    if "model" in values and values["model"] not in DETECTION_SERVICE.available_models:
+        raise ValueError(f"Model not available: {values['model']}")
+    if "language" in values:
+        values["language"] = str(values["language"]).strip().lower()
+    if "mode" in values:
+        DETECTION_SERVICE.resolution.for_mode(values["mode"])
+    if "tiled" in values:
+        values["tiled"] = bool(values["tiled"])
+    if "weight" in values:
+        values["weight"] = float(values["weight"])
+        if values["weight"] <= 0:
+            raise ValueError(f"Weight must be positive, got {values['weight']}")
+    if "rate_limit" in values:
+        values["rate_limit"] = float(values["rate_limit"])
+        if values["rate_limit"] < 0:
+            raise ValueError(
+                f"Rate limit must not be negative, got {values['rate_limit']}"
+            )
+    return {**update, **values}
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the detection result cache."""
+    return DETECTION_SERVICE.cache.stats
+
+
 @router.post("/config/threshold")
 async def set_threshold(request: Request):
     """Api config endpoint which sets detection threshold.
@@ -107,6 +518,10 @@ async def set_threshold(request: Request):
     logger.info(
         f"Received request to change confidence threshold to {data['threshold']}"
     )
+    try:
+        DetectionOptions(confidence_threshold=float(data["threshold"]))
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
     global DETECTION_CONFIG
     DETECTION_CONFIG["confidence_threshold"] = float(data["threshold"])
     logger.info(
@@ -115,24 +530,117 @@ async def set_threshold(request: Request):
     return {"ok": True, "threshold": DETECTION_CONFIG["confidence_threshold"]}
 
 
+@router.post("/config/filter")
+async def set_filter(request: Request):
+    """Api config endpoint which sets the class filter and max detections.
+
+    Payload {"classes": [...] | null, "exclude_classes": [...], "max_detections": int | null},
+    classes are labels (English or translated) or class ids, null allows all classes.
+    Omitted keys keep their current value."""
+    data = await request.json()
+    global DETECTION_CONFIG
+    logger.info(f"Received request to change detection filter with: {data}")
+    update = {
+        key: data[key]
+        for key in ("classes", "exclude_classes", "max_detections")
+        if key in data
+    }
+    if "classes" in update:
+        update["classes"] = parse_classes(update["classes"])
+    if "exclude_classes" in update:
+        update["exclude_classes"] = parse_classes(update["exclude_classes"]) or ()
+    try:
+        options = DetectionOptions.from_config({**DETECTION_CONFIG, **update})
+        if DETECTION_SERVICE.ready:
+            DETECTION_SERVICE.check_classes(options)
+    except (TypeError, ValueError) as e:
+        return {"ok": False, "error": str(e)}
+    DETECTION_CONFIG.update(update)
+    logger.info(f"Detection config: {DETECTION_CONFIG}")
+    return {
+        "ok": True,
+        "classes": DETECTION_CONFIG["classes"],
+        "exclude_classes": DETECTION_CONFIG["exclude_classes"],
+        "max_detections": DETECTION_CONFIG["max_detections"],
+    }
+
+
 @router.post("/config/model")
 async def set_model(request: Request):
     """Api config endpoint which sets detection model from the possible already downloaded detection models.
 
+    The switch runs in the background and the endpoint answers right away,
+    progress is pushed to the dashboard as {"type": "model_status", ...} messages
+    and can be polled with GET /config/model. Requests keep being served by the
+    current model until the new one is loaded and warmed up.
+
     NOTE: run model download manually."""
     data = await request.json()
 
-    global DETECTION_SERVICE, DETECTION_CONFIG
+    global DETECTION_SERVICE, MODEL_SWITCH
 
     logger.info(f"Received request to change detection model config with: {data}")
     model_name = data.get("model")
     if model_name not in DETECTION_SERVICE.available_models:
         return {"ok": False, "error": "Model not available"}
+    if not DETECTION_SERVICE.ready or (
+        MODEL_SWITCH is not None and not MODEL_SWITCH.done()
+    ):
+        return {
+            "ok": False,
+            "error": "Model switch in progress",
+            "status": DETECTION_SERVICE.model_status,
+        }
     logger.info("Reloading detection service with model: " + model_name)
+    MODEL_SWITCH = asyncio.create_task(_switch_model(model_name))
+    await asyncio.sleep(0)  # let the switch publish its "loading" status
+    return {"ok": True, "selected_model": model_name, "status": "loading"}
+
+
+@router.get("/config/model")
+async def model_status():
+    """Active model and progress of the last model switch."""
+    return {
+        **DETECTION_SERVICE.model_status,
+        "active_model": DETECTION_SERVICE.model_name,
+    }
+
+
+async def _switch_model(model_name: str):
+    async def publish(status: dict):
+        await ws_manager.broadcast({"type": "model_status", **status})
+
+    try:
+        await DETECTION_SERVICE.reload_with_model(model_name, progress=publish)
+    except Exception:
+        return  # reported through model_status
     DETECTION_CONFIG["model"] = model_name
-    await DETECTION_SERVICE.reload_with_model(model_name)
     logger.info(f"Detection config: {DETECTION_CONFIG}")
-    return {"ok": True, "selected_model": model_name}
+
+
+@router.post("/config/export")
+async def export_model(request: Request):
+    """Api config endpoint which exports a .pt model to an inference backend.
+
+    Payload {"model": "yolov8n.pt", "backend": "onnx" | "openvino" | "torchscript",
+    "precision": "fp32" | "fp16" | "int8"}. The artefact is cached next to the model
+    and becomes selectable through /config/model."""
+    data = await request.json()
+    logger.info(f"Received request to export model with: {data}")
+    model_name = data.get("model")
+    if model_name not in DETECTION_SERVICE.available_models:
+        return {"ok": False, "error": "Model not available"}
+    try:
+        path = await run_in_threadpool(
+            DETECTION_SERVICE.export,
+            model_name,
+            data.get("backend", "onnx"),
+            data.get("precision", "fp32"),
+        )
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "exported_model": path.name}
 
 
 @router.post("/config/language")
@@ -140,22 +648,40 @@ async def set_language(request: Request):
     """
     API config endpoint which sets the language for label translations.
 
-    Accepted values: any language supported by googletrans (e.g., 'en', 'cs', 'fr'...).
-    After changing the language, translations are reloaded in DetectionService.
+    Accepted values: any language of the translation backends (e.g., 'en', 'cs', 'fr'...).
+    Languages with prepared label catalogues switch at once. Otherwise labels are
+    translated first: if that takes longer than a few seconds the endpoint answers
+    with "pending" and the switch completes in the background.
     """
     data = await request.json()
     lang = data.get("language", "en").strip().lower()
 
-    global DETECTION_SERVICE, DETECTION_CONFIG
+    global DETECTION_SERVICE, DETECTION_CONFIG, LANGUAGE_SWITCH
 
     logger.info(f"Received request to change detection language to: {lang}")
-    DETECTION_CONFIG["language"] = lang
-    DETECTION_SERVICE.settings.language = lang
-    DETECTION_SERVICE.translate_to = lang
-    DETECTION_SERVICE.translation_path = DETECTION_SERVICE.model_path.with_suffix(
-        f".{DETECTION_SERVICE.translate_to}.labels.json"
-    )
-    await DETECTION_SERVICE.initialize_translations()
+    if LANGUAGE_SWITCH is not None and not LANGUAGE_SWITCH.done():
+        return {"ok": False, "error": "Language switch in progress", "pending": True}
+    LANGUAGE_SWITCH = asyncio.create_task(_switch_language(lang))
+    # a switch finishing after the answer has its failure logged, not raised
+    LANGUAGE_SWITCH.add_done_callback(lambda t: t.cancelled() or t.exception())
+    try:
+        await asyncio.wait_for(asyncio.shield(LANGUAGE_SWITCH), LANGUAGE_SWITCH_WAIT_S)
+    except TimeoutError:
+        return {
+            "ok": False,
+            "error": "Translating labels, the language changes when done",
+            "pending": True,
+        }
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "language": lang}
 
+
+async def _switch_language(lang: str):
+    try:
+        await DETECTION_SERVICE.set_language(lang)
+    except Exception as e:
+        logger.error(f"Switching language to {lang} failed: {e}")
+        raise
+    DETECTION_CONFIG["language"] = lang
     logger.info(f"Language set to {lang}")
-    return {"ok": True, "language": lang}
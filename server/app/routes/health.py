@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.routes.detect import DETECTION_SERVICE
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+async def live():
+    """Liveness probe, the process is up and the event loop responds."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def ready():
+    """Readiness probe, 503 until the default model is loaded and warmed up."""
+    if DETECTION_SERVICE.ready:
+        return {"status": "ready", "model": DETECTION_SERVICE.model_name}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "not ready", **DETECTION_SERVICE.model_status},
+    )
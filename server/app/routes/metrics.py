@@ -0,0 +1,143 @@
+import logging
+
+import anyio.to_thread
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.routes.detect import BATCH_SCHEDULER
+from app.routes.detect import CLIENTS
+from app.routes.detect import DETECTION_SERVICE
+from app.routes.detect import TRACKING
+from app.services.annotation import annotation_worker
+from app.services.metrics import REGISTRY
+from app.services.ws_manager import ws_manager
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def _threadpool(field: str) -> float:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return limiter.borrowed_tokens if field == "busy" else limiter.total_tokens
+
+
+def _label_tables() -> dict:
+    return {
+        (("model", model), ("language", language)): len(table)
+        for (model, language), table in DETECTION_SERVICE.label_tables.items()
+    }
+
+
+def _worker_in_flight() -> dict:
+    workers = DETECTION_SERVICE.workers
+    if workers is None:
+        return {}
+    return {(("worker", str(i)),): n for i, n in enumerate(workers.in_flight)}
+
+
+def _per_client(value) -> dict:
+    return {(("client", client.client_id),): value(client) for client in CLIENTS}
+
+
+# sampled at scrape time, the hot path does not pay for them
+REGISTRY.gauge(
+    "pepper_batch_queue_depth",
+    "Frames waiting for the batch scheduler",
+    lambda: BATCH_SCHEDULER.queue_depth,
+)
+REGISTRY.gauge(
+    "pepper_threadpool_busy",
+    "Worker threads in use by run_in_threadpool",
+    lambda: _threadpool("busy"),
+)
+REGISTRY.gauge(
+    "pepper_threadpool_limit",
+    "Size of the run_in_threadpool thread pool",
+    lambda: _threadpool("limit"),
+)
+REGISTRY.gauge(
+    "pepper_auto_imgsz",
+    "Current resolution of auto mode requests",
+    lambda: DETECTION_SERVICE.resolution.current,
+)
+REGISTRY.gauge(
+    "pepper_models_loaded",
+    "Models resident in the model pool",
+    lambda: len(DETECTION_SERVICE.pool.loaded),
+)
+REGISTRY.gauge(
+    "pepper_model_pool_bytes",
+    "Estimated memory held by loaded models",
+    lambda: DETECTION_SERVICE.pool.memory_used,
+)
+REGISTRY.gauge(
+    "pepper_label_catalogue_size",
+    "Labels of each loaded catalogue per model and language",
+    _label_tables,
+)
+REGISTRY.gauge(
+    "pepper_label_tables",
+    "Cached label lookup tables",
+    lambda: len(DETECTION_SERVICE.label_tables),
+)
+REGISTRY.counter(
+    "pepper_result_cache_hits_total",
+    "Result cache hits",
+    lambda: DETECTION_SERVICE.cache.stats["hits"],
+)
+REGISTRY.counter(
+    "pepper_result_cache_misses_total",
+    "Result cache misses",
+    lambda: DETECTION_SERVICE.cache.stats["misses"],
+)
+REGISTRY.gauge(
+    "pepper_result_cache_size",
+    "Entries in the result cache",
+    lambda: DETECTION_SERVICE.cache.stats["size"],
+)
+REGISTRY.counter(
+    "pepper_client_requests_total",
+    "Requests per client session",
+    lambda: _per_client(lambda c: c.requests),
+)
+REGISTRY.counter(
+    "pepper_client_rate_limited_total",
+    "Frames rejected by the rate limit per client session",
+    lambda: _per_client(lambda c: c.rate_limited),
+)
+REGISTRY.gauge(
+    "pepper_client_latency_p95_seconds",
+    "95th percentile of the recent request latencies per client session",
+    lambda: _per_client(lambda c: c.latency(0.95)),
+)
+REGISTRY.gauge(
+    "pepper_tracking_sessions",
+    "Live tracking sessions",
+    lambda: len(TRACKING),
+)
+REGISTRY.counter(
+    "pepper_tracking_propagated_frames_total",
+    "Frames answered by track propagation instead of detection",
+    lambda: TRACKING.propagated,
+)
+REGISTRY.gauge(
+    "pepper_dashboard_clients",
+    "Connected dashboard clients",
+    lambda: len(ws_manager.active_connections),
+)
+REGISTRY.counter(
+    "pepper_annotation_dropped_total",
+    "Frames skipped by the annotation worker because a newer one arrived",
+    lambda: annotation_worker.dropped,
+)
+REGISTRY.gauge(
+    "pepper_worker_jobs_in_flight",
+    "Jobs in flight per inference worker",
+    _worker_in_flight,
+)
+
+
+@router.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """Prometheus text exposition of the server metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,94 @@
+"""Precision, torch.compile, memory layout and thread options for .pt models.
+
+Everything is driven by YOLOSettings. `configure_torch` validates the options
+against the device and sets the torch thread pools once per process at startup.
+`prepare_model` adjusts a freshly loaded model, and `predict_kwargs` and
+`predict_context` are applied to every predict call. Exported backends
+(ONNX, OpenVINO, TorchScript) fix precision and layout at export time, so none
+of this applies to them.
+"""
+
+from contextlib import nullcontext
+import logging
+
+from app.models.detection_settings import YOLOSettings
+
+logger = logging.getLogger(__name__)
+
+
+def validate(settings: YOLOSettings, device: str):
+    """Raises ValueError for options the device or torch build cannot run."""
+    import torch
+
+    on_cuda = device.startswith("cuda")
+    if settings.precision == "fp16" and not on_cuda:
+        raise ValueError(f"fp16 inference needs a CUDA device, got {device}")
+    if settings.precision == "bf16" and on_cuda and not torch.cuda.is_bf16_supported():
+        raise ValueError(f"bf16 inference is not supported on {device}")
+    if settings.compile and not hasattr(torch, "compile"):
+        raise ValueError(f"torch.compile needs torch 2, got {torch.__version__}")
+
+
+def configure_torch(settings: YOLOSettings, devices: list[str]):
+    """Validates the options for every device and sets the thread pools."""
+    import torch
+
+    for device in devices:
+        validate(settings, device)
+    if settings.torch_threads:
+        torch.set_num_threads(settings.torch_threads)
+    interop = settings.torch_interop_threads
+    if interop and torch.get_num_interop_threads() != interop:
+        # only possible before torch runs any inter-op parallel work
+        torch.set_num_interop_threads(interop)
+    logger.info(
+        f"Torch {torch.__version__}: precision {settings.precision}, "
+        f"compile {settings.compile}, channels_last {settings.channels_last}, "
+        f"{torch.get_num_threads()} threads, "
+        f"{torch.get_num_interop_threads()} interop threads"
+    )
+
+
+def prepare_model(model, settings: YOLOSettings):
+    if settings.channels_last:
+        import torch
+
+        model.model.to(memory_format=torch.channels_last)
+        # ultralytics builds a contiguous NCHW batch, converted on the way in so
+        # the first convolution does not reorder it itself
+        model.model.register_forward_pre_hook(_channels_last_input)
+    return model
+
+
+def _channels_last_input(module, args):
+    import torch
+
+    if args and isinstance(args[0], torch.Tensor) and args[0].dim() == 4:
+        return (args[0].contiguous(memory_format=torch.channels_last), *args[1:])
+    return None
+
+
+def is_pytorch(model) -> bool:
+    # exported models keep the artefact path in .model
+    return hasattr(getattr(model, "model", None), "parameters")
+
+
+def predict_kwargs(settings: YOLOSettings) -> dict:
+    """Predict kwargs for .pt models, inference already runs in inference_mode.
+
+    Only non-default values are passed, they never change within a process."""
+    kwargs = {}
+    if settings.precision == "fp16":
+        kwargs["half"] = True
+    if settings.compile:
+        kwargs["compile"] = settings.compile
+    return kwargs
+
+
+def predict_context(settings: YOLOSettings, device: str):
+    """bf16 runs under autocast, ultralytics itself only knows fp16."""
+    if settings.precision != "bf16":
+        return nullcontext()
+    import torch
+
+    return torch.autocast(device.split(":")[0], dtype=torch.bfloat16)
@@ -0,0 +1,139 @@
+import asyncio
+import contextlib
+import contextvars
+import io
+import logging
+import random
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import ImageDraw
+from PIL import ImageFont
+
+from app.models.detection_result import Detections
+from app.services.frames import DecodedFrame
+from app.services.metrics import stage
+from app.services.ws_manager import ConnectionManager
+from app.services.ws_manager import ws_manager
+
+logger = logging.getLogger(__name__)
+
+
+def get_color_encoding(objects: list[dict]) -> dict[str, str]:
+    logger.info("Running color encoding, computing unique colors for labels...")
+    unique_labels = list({obj["label"] for obj in objects})
+    colors = {
+        label: tuple(random.choices(range(50, 256), k=3)) for label in unique_labels
+    }
+    logger.info(f"{len(colors)} colors assigned")
+    return colors
+
+
+def annotate_image(
+    frame: DecodedFrame, objects: list[dict], colors: dict[str, str]
+) -> bytes:
+    """Draws the detections on a copy of the frame, returns JPEG bytes."""
+    logger.info(f"Annotating image with {len(objects)} objects")
+    with stage("annotate"):
+        return _draw(frame, objects, colors)
+
+
+def _draw(frame: DecodedFrame, objects: list[dict], colors: dict[str, str]) -> bytes:
+    img = frame.pil.copy()  # frame is shared, never draw on it
+    draw = ImageDraw.Draw(img)
+    w, h = img.size
+    num_objects = max(1, len(objects))
+    font_size = max(10, int(h * 0.05 / (num_objects**0.5)))  # bulharske konstanty
+    try:
+        # font supportingunicode is beter
+        font = ImageFont.truetype(
+            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size
+        )
+    except OSError:
+        font = ImageFont.load_default()
+    rect_width = max(2, int(h * 0.005))
+    for obj in objects:
+        x1, y1, x2, y2 = obj["bbox"]
+        label = obj["label"]
+        conf = obj["confidence"]
+        color = colors[label]
+        draw.rectangle([x1, y1, x2, y2], outline=color, width=rect_width)
+        text = f"{label} {conf:.2f}"
+        bbox = font.getbbox(text)
+        text_w, text_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+        text_bg = [x1, y1 - text_h - 2, x1 + text_w + 2, y1]
+        draw.rectangle(text_bg, fill=color)
+        draw.text((x1 + 1, y1 - text_h - 1), text, fill="black", font=font)
+
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG")
+    return buffered.getvalue()
+
+
+class AnnotationWorker:
+    """Annotates detections for the dashboard off the request path.
+
+    Frames are only accepted while dashboard clients are connected. The worker
+    keeps just the latest submitted frame: when annotation falls behind, older
+    frames are replaced (and counted as dropped) instead of queueing up."""
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self.dropped = 0
+        self._latest: tuple[DecodedFrame, Detections] | None = None
+        self._pending: asyncio.Event | None = None
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self.manager.active_connections)
+
+    def start(self):
+        if self._worker is not None and not self._worker.done():
+            return
+        self._pending = asyncio.Event()
+        # fresh context, a lazy start must not inherit the request's timings
+        self._worker = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+        self._latest = None
+
+    def submit(self, frame: DecodedFrame, detections: Detections):
+        """Hands a finished detection over to the worker, never blocks."""
+        if not self.has_subscribers:
+            return
+        self.start()
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = (frame, detections)
+        self._pending.set()
+
+    async def _run(self):
+        while True:
+            await self._pending.wait()
+            self._pending.clear()
+            frame, detections = self._latest
+            self._latest = None
+            if not self.has_subscribers:
+                continue
+            try:
+                objects = detections.to_objects()
+                colors = get_color_encoding(objects)
+                annotated_image = await run_in_threadpool(
+                    annotate_image, frame, objects, colors
+                )
+                await self.manager.broadcast(
+                    {"type": "detection", "objects": objects, "colors": colors},
+                    image=annotated_image,
+                )
+            except Exception as e:
+                logger.error(f"Dashboard annotation failed: {e}")
+
+
+annotation_worker = AnnotationWorker(ws_manager)
@@ -0,0 +1,209 @@
+import asyncio
+from collections.abc import Callable
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.models.detection_result import Detections
+from app.models.detection_settings import DetectionOptions
+from app.services.frames import DecodedFrame
+from app.services.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+# requests are batched together only with equal model and detection options
+BatchGroup = tuple[str | None, DetectionOptions | None]
+# frame, result future, stage timings of the request
+Job = tuple[DecodedFrame, asyncio.Future, dict[str, float]]
+# finish tag, arrival order, batch group, frame, future, timings
+Pending = tuple[float, int, BatchGroup, DecodedFrame, asyncio.Future, dict]
+
+
+class BatchScheduler:
+    """Collects concurrent detect requests into one batched predict call.
+
+    A batch is dispatched once it holds `max_batch_size` frames or once the first
+    queued frame has waited `max_wait_ms`, whichever comes first. Requests for
+    different models or detection options are split into one batch per group. At
+    most `max_concurrent_batches` batches run at a time (one per inference worker),
+    so the next one fills up while the model is busy. `observe_queue` is called
+    with the queue latency of every dispatched request.
+
+    Frames are taken in weighted fair order across clients (self-clocked fair
+    queuing): each frame gets a finish tag 1 / weight after the later of its
+    client's previous tag and the tag of the last dispatched frame. A client
+    flooding the queue only pushes its own tags back, the others keep their
+    share of inference in proportion to their weights."""
+
+    def __init__(
+        self,
+        detect_batch: Callable[
+            [list[DecodedFrame], str | None, DetectionOptions | None], list[Detections]
+        ],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 1,
+        observe_queue: Callable[[float], None] | None = None,
+    ):
+        self.detect_batch = detect_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+        self.observe_queue = observe_queue
+        self._slots: asyncio.Semaphore | None = None
+        self._dispatches: set[asyncio.Task] = set()
+        self._pending: list[Pending] = []
+        self._arrived: asyncio.Event | None = None
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        self._finish_tags: dict[str, float] = {}
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        if self._worker is not None and not self._worker.done():
+            return
+        self._arrived = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        # fresh context, a lazy start must not inherit the request's timings
+        self._worker = asyncio.create_task(self._run(), context=contextvars.Context())
+        logger.info(
+            f"Batch scheduler started (max batch size {self.max_batch_size}, "
+            f"max wait {self.max_wait * 1000:.1f} ms)"
+        )
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        while self._pending:
+            *_, future, _ = heapq.heappop(self._pending)
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+        logger.info("Batch scheduler stopped")
+
+    async def submit(
+        self,
+        frame: DecodedFrame,
+        model_name: str | None = None,
+        options: DetectionOptions | None = None,
+        client: str = "",
+        weight: float = 1.0,
+    ) -> Detections:
+        """Queues a frame of a client and waits for its result from a batch."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        # filled by the dispatcher: queued, then inference (the whole batch)
+        timings = {"queued_at": time.perf_counter()}
+        tag = max(self._virtual_time, self._finish_tags.get(client, 0.0)) + 1 / weight
+        self._finish_tags[client] = tag
+        heapq.heappush(
+            self._pending,
+            (tag, next(self._order), (model_name, options), frame, future, timings),
+        )
+        self._arrived.set()
+        try:
+            return await future
+        finally:
+            for stage in ("queue", "inference"):
+                if stage in timings:
+                    record_stage(stage, timings[stage])
+
+    def _pop(self) -> tuple[BatchGroup, DecodedFrame, asyncio.Future, dict]:
+        tag, _, *job = heapq.heappop(self._pending)
+        self._virtual_time = tag
+        if len(self._finish_tags) > 2 * len(self._pending) + 64:
+            # clients whose tags are behind the clock start fresh anyway
+            self._finish_tags = {
+                client: t for client, t in self._finish_tags.items() if t > tag
+            }
+        return tuple(job)
+
+    async def _wait_arrival(self, timeout: float | None = None):
+        self._arrived.clear()
+        await asyncio.wait_for(self._arrived.wait(), timeout)
+
+    async def _collect(
+        self,
+    ) -> list[tuple[BatchGroup, DecodedFrame, asyncio.Future, dict]]:
+        while not self._pending:
+            await self._wait_arrival()
+        batch = [self._pop()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if self._pending:
+                batch.append(self._pop())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                await self._wait_arrival(timeout)
+            except TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # wait for a free slot first, the batch keeps filling meanwhile
+            await self._slots.acquire()
+            batch = await self._collect()
+            task = asyncio.create_task(self._dispatch_batch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task):
+        self._dispatches.discard(task)
+        self._slots.release()
+
+    async def _dispatch_batch(
+        self, batch: list[tuple[BatchGroup, DecodedFrame, asyncio.Future, dict]]
+    ):
+        groups: dict[BatchGroup, list[Job]] = {}
+        for group_key, frame, future, timings in batch:
+            # handlers which gave up waiting do not need inference
+            if not future.done():
+                groups.setdefault(group_key, []).append((frame, future, timings))
+        for group_key, group in groups.items():
+            await self._dispatch(group, *group_key)
+
+    async def _dispatch(
+        self,
+        group: list[Job],
+        model_name: str | None,
+        options: DetectionOptions | None,
+    ):
+        start = time.perf_counter()
+        for _, _, timings in group:
+            timings["queue"] = start - timings["queued_at"]
+            if self.observe_queue is not None:
+                self.observe_queue(timings["queue"])
+        try:
+            results = await run_in_threadpool(
+                self.detect_batch, [frame for frame, *_ in group], model_name, options
+            )
+        except Exception as e:
+            logger.error(f"Batched detection failed: {e}")
+            for _, future, _ in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+        for (_, future, timings), result in zip(group, results, strict=True):
+            timings["inference"] = elapsed
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,179 @@
+"""Per-robot sessions of the detection server.
+
+Every request names its client (X-Client-Id header, or the `client` query
+parameter of a stream), requests without one share the "default" session. A session holds the
+client's config overrides, its rate limit and scheduling weight and its
+request stats. Sessions are kept in LRU order, idle ones without config
+overrides expire after `ttl_s` and the least recently used ones without config
+overrides are dropped beyond `max_clients`. Configured robots are never
+dropped, they would silently fall back to the server defaults.
+"""
+
+from collections import OrderedDict
+from collections import deque
+from dataclasses import dataclass
+from dataclasses import field
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLIENT = "default"
+# overridable per client, detection options use the DETECTION_CONFIG names
+CONFIG_KEYS = (
+    "confidence_threshold",
+    "classes",
+    "exclude_classes",
+    "max_detections",
+    "model",
+    "language",
+    "mode",
+    "tiled",
+    "weight",
+    "rate_limit",
+)
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`, 0 is unlimited."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def allow(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+@dataclass
+class ClientSession:
+    client_id: str
+    limiter: TokenBucket
+    config: dict = field(default_factory=dict)
+    requests: int = 0
+    rate_limited: int = 0
+    failed: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=256))
+    last_seen: float = field(default_factory=time.monotonic)
+
+    @property
+    def weight(self) -> float:
+        return self.config.get("weight", 1.0)
+
+    def admit(self) -> bool:
+        """False when the frame is over the client's rate limit."""
+        if self.limiter.allow():
+            return True
+        self.rate_limited += 1
+        return False
+
+    def observe(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def latency(self, q: float) -> float:
+        """Latency quantile in seconds over the recent requests, 0 without any."""
+        return float(np.quantile(self.latencies, q)) if self.latencies else 0.0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+            "latency_p50_ms": round(self.latency(0.5) * 1000, 2),
+            "latency_p95_ms": round(self.latency(0.95) * 1000, 2),
+            "idle_s": round(time.monotonic() - self.last_seen, 1),
+        }
+
+
+class ClientRegistry:
+    def __init__(
+        self,
+        max_clients: int = 64,
+        ttl_s: float = 600.0,
+        rate_limit: float = 0.0,
+        burst: float = 10.0,
+    ):
+        self.max_clients = max_clients
+        self.ttl_s = ttl_s
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self._clients: OrderedDict[str, ClientSession] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __iter__(self):
+        return iter(list(self._clients.values()))
+
+    def get(self, client_id: str | None) -> ClientSession:
+        """Session of the client, created on first use."""
+        client_id = client_id or DEFAULT_CLIENT
+        now = time.monotonic()
+        self._expire(now)
+        client = self._clients.get(client_id)
+        if client is None:
+            client = ClientSession(client_id, TokenBucket(self.rate_limit, self.burst))
+            self._clients[client_id] = client
+            logger.info(f"Client {client_id} connected")
+            self._evict(keep=client_id)
+        self._clients.move_to_end(client_id)
+        client.last_seen = now
+        return client
+
+    def find(self, client_id: str) -> ClientSession | None:
+        """Session of a known client, without creating or touching it."""
+        return self._clients.get(client_id)
+
+    def close(self, client_id: str):
+        if self._clients.pop(client_id, None) is not None:
+            logger.info(f"Client {client_id} disconnected")
+
+    def configure(self, client_id: str, update: dict) -> ClientSession:
+        """Applies config overrides, None values restore the server default."""
+        client = self.get(client_id)
+        for key, value in update.items():
+            if value is None:
+                client.config.pop(key, None)
+            else:
+                client.config[key] = value
+        if "rate_limit" in update:
+            client.limiter = TokenBucket(
+                client.config.get("rate_limit", self.rate_limit), self.burst
+            )
+        return client
+
+    def _evict(self, keep: str):
+        over = len(self._clients) - self.max_clients
+        if over <= 0:
+            return
+        dropped = [
+            client_id
+            for client_id, client in self._clients.items()
+            if not client.config and client_id != keep
+        ][:over]
+        for client_id in dropped:
+            del self._clients[client_id]
+            logger.info(f"Client {client_id} dropped, too many clients")
+
+    def _expire(self, now: float):
+        expired = [
+            client_id
+            for client_id, client in self._clients.items()
+            if not client.config and now - client.last_seen > self.ttl_s
+        ]
+        for client_id in expired:
+            del self._clients[client_id]
+            logger.info(f"Client {client_id} expired")
@@ -1,22 +1,61 @@
 import asyncio
-import io
-import json
+from collections.abc import Awaitable
+from collections.abc import Callable
+from contextlib import nullcontext
+from dataclasses import replace
+from functools import cached_property
 import logging
 import os
 from pathlib import Path
+import threading
+import time
 import urllib.request
 
-from googletrans import Translator
-from PIL import Image
-from ultralytics import YOLO
+from fastapi.concurrency import run_in_threadpool
+import numpy as np
 
-from app.models.detection_result import DetectionObject
-from app.models.detection_result import DetectionResponse
+from app.models.detection_result import Detections
+from app.models.detection_settings import DetectionOptions
 from app.models.detection_settings import YOLOSettings
+from app.services.acceleration import configure_torch
+from app.services.acceleration import is_pytorch
+from app.services.acceleration import predict_context
+from app.services.acceleration import predict_kwargs
+from app.services.acceleration import prepare_model
+from app.services.export import backend_of
+from app.services.export import export_model
+from app.services.export import is_model
+from app.services.export import load_fused
+from app.services.export import load_yolo
+from app.services.export import parse_backend
+from app.services.export import save_fused
+from app.services.frames import DecodedFrame
+from app.services.labels import build_catalogue
+from app.services.labels import catalogue_path
+from app.services.labels import load_catalogue
+from app.services.labels import save_catalogue
+from app.services.metrics import BATCH_SIZE
+from app.services.metrics import stage
+from app.services.model_pool import ModelPool
+from app.services.resolution import ResolutionController
+from app.services.result_cache import ResultCache
+from app.services.tiling import merge
+from app.services.tiling import tile_boxes
+from app.services.tiling import tile_grid
+from app.services.translation import create_translator
+from app.services.workers import WorkerPool
 
 logger = logging.getLogger(__name__)
 
 
+class UnknownClassesError(ValueError):
+    """Class filter naming classes the model does not have."""
+
+    def __init__(self, classes: list[str]):
+        self.classes = classes
+        super().__init__(f"Unknown classes: {', '.join(classes)}")
+
+
 def download_model(model_url: str, model_path: Path):
     logger.info(f"Downloading model from {model_url} to {model_path}")
     model_path.parent.mkdir(parents=True, exist_ok=True)
@@ -26,105 +65,490 @@ def download_model(model_url: str, model_path: Path):
 class DetectionService:
     def __init__(self, settings: YOLOSettings = None):
         self.settings = settings or YOLOSettings()
-        self.model_path: Path = self.settings.model_path
-        self.device = self.settings.device_actual
+        self.models_dir: Path = self.settings.model_path.parent
         self.imgsz = self.settings.imgsz
-        self.model = self.load_model()
+        self.resolution = ResolutionController(
+            self.imgsz,
+            self.settings.imgsz_steps,
+            target_queue_ms=self.settings.target_queue_ms,
+            adaptive=self.settings.adaptive_imgsz,
+        )
+        # with workers the pool holds RemoteModel stand-ins, weights live in workers
+        self.workers = WorkerPool(self.settings) if self.settings.workers else None
+        self.pool = ModelPool(
+            self.load_model,
+            active_name=self.settings.model_name,
+            memory_budget_mb=self.settings.model_memory_budget_mb,
+        )
+        self._predict_locks: dict[str, threading.Lock] = {}
+        # nothing is loaded here, `start` runs the startup pipeline in the lifespan
+        self.ready = False
+        self._started = asyncio.Event()
+        # progress of startup and of the last model switch, see reload_with_model
+        self.model_status = {"model": self.model_name, "state": "starting"}
 
         self.translate_to = self.settings.language or "en"
-        self.translation_path = self.model_path.with_suffix(
-            f".{self.translate_to}.labels.json"
+        self.translator = create_translator(self.settings, self.models_dir)
+        # label catalogues by (model, language), see app.services.labels
+        self.label_tables: dict[tuple[str, str], np.ndarray] = {}
+        self._labels_task: asyncio.Task | None = None
+        self.cache = ResultCache(
+            max_size=self.settings.result_cache_size,
+            ttl_s=self.settings.result_cache_ttl_s,
+            perceptual=self.settings.result_cache_perceptual,
+            max_distance=self.settings.result_cache_max_distance,
         )
-        self.translations = {}
+
+    @cached_property
+    def device(self) -> str:
+        # resolved on first use, so building the service does not import torch
+        return self.settings.device_actual
+
+    @property
+    def model_name(self) -> str:
+        return self.pool.active_name
+
+    @property
+    def model(self):
+        return self.pool.active
+
+    @property
+    def model_path(self) -> Path:
+        return self.models_dir / self.model_name
 
     @property
     def available_models(self) -> list[str]:
-        models_dir = self.model_path.parent  # pretty dirty
-        return [f for f in os.listdir(models_dir) if f.endswith(".pt")]
-
-    def load_model(self):
-        if not self.model_path.exists():
-            download_model(self.settings.model_url, self.model_path)
-        model = YOLO(str(self.model_path))
-        logger.info(f"Loaded model from {self.model_path}")
-        if self.settings.fuse_model:
-            logger.info("Fusing model")
-            model.fuse()
+        return [f for f in os.listdir(self.models_dir) if is_model(self.models_dir / f)]
+
+    def translation_path(self, model_name: str, language: str | None = None) -> Path:
+        return (self.models_dir / model_name).with_suffix(
+            f".{language or self.translate_to}.labels.json"
+        )
+
+    def load_model(self, model_name: str):
+        if self.workers is not None:
+            return self.workers.load(model_name)
+        model_path = self.models_dir / model_name
+        if not model_path.exists():
+            if model_name != self.settings.model_name:
+                raise FileNotFoundError(
+                    f"Model {model_name} not found in {self.models_dir}"
+                )
+            download_model(self.settings.model_url, model_path)
+        backend = self.settings.model_backends.get(model_name)
+        if backend is not None:
+            model_path = self.export(model_name, *parse_backend(backend))
+        if backend_of(model_path.name) != "pytorch":
+            # exported graphs are already fused, the runtime picks the device
+            model = load_yolo(model_path)
+            logger.info(f"Loaded model from {model_path}")
+            return model
+        model = None
+        if self.settings.fuse_model and self.settings.fused_model_cache:
+            model = load_fused(self.models_dir, model_name)
+        if model is None:
+            model = load_yolo(model_path)
+            logger.info(f"Loaded model from {model_path}")
+            if self.settings.fuse_model:
+                logger.info("Fusing model")
+                model.fuse()
+                if self.settings.fused_model_cache:
+                    save_fused(self.models_dir, model_name, model)
         model.to(self.device)
+        prepare_model(model, self.settings)
         logger.info(f"Model fully loaded to device: {self.device}")
         return model
 
-    async def initialize_translations(self):
-        if self.translate_to.strip().lower() != "en":
-            logger.info(f"Initializing translation to language: {self.translate_to}")
-            self.translations = await self.load_or_create_translations()
-        else:
-            logger.info(
-                f"No translation needed the language is set to: {self.translate_to}"
+    def export(self, model_name: str, backend: str, precision: str = "fp32") -> Path:
+        """Exports a model next to its checkpoint, cached until the .pt changes."""
+        return export_model(
+            self.models_dir,
+            model_name,
+            backend,
+            precision,
+            imgsz=self.imgsz,
+            device=self.device,
+            batch=self.settings.max_batch_size,
+            data=self.settings.export_calibration_data,
+        )
+
+    async def ensure_model(self, model_name: str):
+        """Loads a model into the pool off the event loop, with its labels."""
+        if not self.pool.is_loaded(model_name):
+            await run_in_threadpool(self.pool.get, model_name)
+        await self.ensure_labels(model_name)
+
+    async def ensure_labels(self, model_name: str, language: str | None = None):
+        """Loads the label catalogue of a loaded model, built and cached on first
+        use. Only a catalogue that was never built needs translations."""
+        language = language or self.translate_to
+        key = (model_name, language)
+        if key in self.label_tables:
+            return
+        # a model evicted meanwhile is reloaded, never on the event loop
+        names = (await run_in_threadpool(self.pool.get, model_name)).names
+        path = catalogue_path(self.models_dir, model_name, language)
+        table = await run_in_threadpool(load_catalogue, path, names)
+        if table is None:
+            logger.info(f"Building label catalogue of {model_name} in {language}")
+            translations = (
+                {}
+                if language == "en"
+                else await self.translate_labels(model_name, language)
             )
+            table = build_catalogue(names, translations)
+            if language == "en" or len(translations) == len(set(names.values())):
+                await run_in_threadpool(save_catalogue, path, names, table)
+            else:
+                # served as is, the next build retries the missing labels
+                logger.warning(
+                    f"Label catalogue of {model_name} in {language} is incomplete"
+                )
+        self.label_tables[key] = table
 
-    async def load_or_create_translations(self) -> dict:
-        if self.translation_path.exists():
-            logger.info(f"Loading existing translations from {self.translation_path}")
-            with open(self.translation_path, encoding="utf-8") as f:
-                return json.load(f)
-
-        logger.info("No translation file found. Generating translations...")
-        all_labels = list(self.model.names.values())
-
-        # CHANGED: Called directly with await, no asyncio.run()
-        translations = await self.translate_all_labels(all_labels)
-
-        with open(self.translation_path, "w", encoding="utf-8") as f:
-            json.dump(translations, f, ensure_ascii=False, indent=2)
-        logger.info(f"Saved translations to {self.translation_path}")
-        return translations
-
-    async def translate_label(self, label: str) -> tuple:
-        translator = Translator()
-        result = await translator.translate(label, dest=self.translate_to)
-        return label, result.text
-
-    async def translate_all_labels(self, labels: list[str]) -> dict:
-        tasks = [asyncio.create_task(self.translate_label(lbl)) for lbl in labels]
-        results = await asyncio.gather(*tasks)
-        return dict(results)
-
-    def detect(self, image_bytes: bytes) -> DetectionResponse:
-        logger.info("Running detection on image")
-        img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        results = self.model.predict(
-            img, device=self.device, imgsz=self.imgsz, verbose=False
+    async def prepare_labels(self, languages: list[str] | None = None):
+        """Catalogues of every loaded model in the configured languages, so
+        switching to one of them needs no translation."""
+        languages = languages or self.settings.label_languages
+        for model_name in self.pool.loaded:
+            for language in languages:
+                try:
+                    await self.ensure_labels(model_name, language)
+                except Exception as e:
+                    logger.error(
+                        f"Label catalogue of {model_name} in {language} failed: {e}"
+                    )
+
+    async def translate_labels(self, model_name: str, language: str) -> dict:
+        """{English label: translation} of the classes known to the translator."""
+        translation_path = self.translation_path(model_name, language)
+        if translation_path.exists():
+            # per-model files of earlier versions seed the shared cache
+            logger.info(f"Importing translations from {translation_path}")
+            await run_in_threadpool(
+                self.translator.cache.import_json, translation_path, language
+            )
+        model = await run_in_threadpool(self.pool.get, model_name)
+        labels = list(model.names.values())
+        return await self.translator.translate(labels, language)
+
+    def detect(
+        self,
+        frame: DecodedFrame,
+        model_name: str | None = None,
+        options: DetectionOptions | None = None,
+    ) -> Detections:
+        return self.detect_batch([frame], model_name, options)[0]
+
+    def detect_batch(
+        self,
+        frames: list[DecodedFrame],
+        model_name: str | None = None,
+        options: DetectionOptions | None = None,
+    ) -> list[Detections]:
+        """Runs a single predict call over all frames, one response per frame.
+
+        Frames found in the result cache are answered without inference. Threshold,
+        class filter and max detections are applied by the model itself."""
+        model_name = model_name or self.model_name
+        options = options or DetectionOptions()
+        imgsz = self.imgsz_of(model_name, options)
+        keys = [
+            self.cache.key(frame, model_name, imgsz, self.translate_to, options)
+            for frame in frames
+        ]
+        with stage("cache_lookup"):
+            responses = [self.cache.get(key) for key in keys]
+        misses = [i for i, response in enumerate(responses) if response is None]
+        if not misses:
+            logger.info(f"All {len(frames)} image(s) answered from result cache")
+            return responses
+
+        logger.info(
+            f"Running detection with {model_name} on batch of {len(misses)} image(s)"
         )
-        objects = []
-        for r in results:
-            for box, cls, conf in zip(
-                r.boxes.xyxy, r.boxes.cls, r.boxes.conf, strict=True
-            ):
-                en_label = self.model.names[int(cls)]
-                label = (
-                    en_label
-                    if self.translate_to.strip().lower() == "en"
-                    else self.translations.get(en_label)
+        # the lease keeps a model swapped out meanwhile loaded until we are done
+        with self.pool.lease(model_name) as model:
+            labels = self.label_table(model_name, model.names)
+            predict_args = self.predict_args(options, model.names, labels)
+            predict_args["imgsz"] = imgsz
+            BATCH_SIZE.observe(len(misses))
+            predict = self._predict_tiled if options.tiled else self._predict
+            with stage("predict"):
+                arrays = predict(
+                    model_name, model, [frames[i] for i in misses], predict_args
                 )
-                objects.append(
-                    DetectionObject(
-                        label=label,
-                        confidence=float(conf),
-                        bbox=[float(x) for x in box],
+        with stage("postprocess"):
+            for i, data in zip(misses, arrays, strict=True):
+                responses[i] = self._to_detections(data, labels, imgsz)
+                self.cache.put(keys[i], responses[i])
+        return responses
+
+    def imgsz_of(self, model_name: str, options: DetectionOptions) -> int:
+        """Requested resolution for .pt models, exported graphs keep their export size."""
+        if (
+            backend_of(model_name) != "pytorch"
+            or model_name in self.settings.model_backends
+        ):
+            return self.imgsz
+        return options.imgsz or self.imgsz
+
+    def warm_up(self, model_name: str):
+        """Inference on blank frames at every serving resolution, so lazy
+        initialisation (CUDA context, cuDNN autotune, allocator, runtime graph
+        setup) is not paid by a real request."""
+        if self.workers is not None or not self.settings.warmup_runs:
+            return  # workers warm up their own copy when loading it
+        frame = DecodedFrame(rgb=np.zeros((self.imgsz, self.imgsz, 3), np.uint8))
+        frames = [frame] * self.settings.warmup_batch_size
+        sizes = {
+            self.imgsz_of(model_name, DetectionOptions(imgsz=s))
+            for s in self.resolution.steps
+        }
+        with self.pool.lease(model_name) as model:
+            labels = self.label_table(model_name, model.names)
+            predict_args = self.predict_args(DetectionOptions(), model.names, labels)
+            start = time.perf_counter()
+            for imgsz in sorted(sizes):
+                for _ in range(self.settings.warmup_runs):
+                    self._predict(
+                        model_name, model, frames, {**predict_args, "imgsz": imgsz}
                     )
-                )
-        logger.info(f"Found {len(objects)} objects in provided image.")
-        return DetectionResponse(objects=objects)
+        logger.info(f"Warmed up {model_name} in {time.perf_counter() - start:.2f}s")
 
-    async def reload_with_model(self, model_name: str):
-        logger.info(f"Reloading DetectionService with model {model_name}")
-        settings = YOLOSettings(model_name=model_name)
-        self.settings = settings
-        self.model_path = settings.model_path
-        self.model = self.load_model()
-        self.translation_path = self.model_path.with_suffix(
-            f".{self.translate_to}.labels.json"
+    def _predict(
+        self,
+        model_name: str,
+        model,
+        frames: list[DecodedFrame],
+        predict_args: dict,
+    ) -> list[np.ndarray]:
+        if self.workers is not None:
+            return self.workers.predict(model_name, frames, predict_args)
+        # ultralytics predictors are not thread-safe, a background warm-up and
+        # the batches of the same model take turns (workers run jobs one by one)
+        with self._predict_locks.setdefault(model_name, threading.Lock()):
+            return self.predict_arrays(
+                model, [frame.bgr for frame in frames], predict_args
+            )
+
+    def _predict_tiled(
+        self,
+        model_name: str,
+        model,
+        frames: list[DecodedFrame],
+        predict_args: dict,
+    ) -> list[np.ndarray]:
+        """Sliced inference: each frame and its tiles run in one predict call, tile
+        boxes are shifted to frame coordinates and merged per frame."""
+        settings = self.settings
+        crops: list[DecodedFrame] = []
+        origins = []  # (frame index, x, y) of each crop
+        for index, frame in enumerate(frames):
+            crops.append(frame)
+            origins.append((index, 0, 0))
+            columns, rows = tile_grid(
+                frame.width,
+                frame.height,
+                predict_args["imgsz"],
+                max_scale=settings.tile_max_scale,
+                overlap=settings.tile_overlap,
+                max_tiles=settings.max_tiles,
+            )
+            if columns * rows == 1:
+                continue
+            rgb = frame.rgb
+            for x0, y0, x1, y1 in tile_boxes(
+                frame.width, frame.height, columns, rows, settings.tile_overlap
+            ).tolist():
+                crops.append(DecodedFrame(rgb=rgb[y0:y1, x0:x1]))
+                origins.append((index, x0, y0))
+        arrays = self._predict(model_name, model, crops, predict_args)
+        parts: list[list[np.ndarray]] = [[] for _ in frames]
+        for (index, x, y), data in zip(origins, arrays, strict=True):
+            parts[index].append(data + np.array([x, y, x, y, 0, 0], data.dtype))
+        return [
+            merge(
+                np.concatenate(part),
+                settings.tile_nms_threshold,
+                predict_args["max_det"],
+            )
+            for part in parts
+        ]
+
+    def predict_arrays(
+        self, model, imgs: list[np.ndarray], predict_args: dict
+    ) -> list[np.ndarray]:
+        """Raw (N, 6) xyxy/conf/class arrays, one device -> host copy per image."""
+        # the predictor keeps the previous imgsz, so it is always passed
+        predict_args = {"imgsz": self.imgsz, **predict_args}
+        context = nullcontext()
+        if is_pytorch(model):
+            predict_args = {**predict_kwargs(self.settings), **predict_args}
+            context = predict_context(self.settings, self.device)
+        with context:
+            results = model.predict(
+                imgs, device=self.device, verbose=False, **predict_args
+            )
+        return [r.boxes.data.cpu().numpy() for r in results]
+
+    def label_table(self, model_name: str, names: dict[int, str]) -> np.ndarray:
+        """Label catalogue of the model in the current language, indexed by class
+        id. English names until `ensure_labels` has loaded it."""
+        table = self.label_tables.get((model_name, self.translate_to))
+        if table is None:
+            return build_catalogue(names, {})
+        return table
+
+    def relabel(
+        self, detections: Detections, model_name: str, language: str
+    ) -> Detections:
+        """Detections with labels in another language, loaded by `ensure_labels`."""
+        if language == self.translate_to:
+            return detections
+        table = self.label_tables[(model_name, language)]
+        return replace(detections, labels=table[detections.class_ids])
+
+    @staticmethod
+    def predict_args(
+        options: DetectionOptions, names: dict[int, str], labels: np.ndarray
+    ) -> dict:
+        """Maps options to predict kwargs. Every key is always passed, the
+        predictor keeps the arguments of its previous call otherwise. Raises
+        UnknownClassesError for class names the model does not know."""
+        args = {"classes": None, "max_det": options.max_detections or 300}
+        if options.confidence_threshold is not None:
+            args["conf"] = options.confidence_threshold
+        if options.classes is not None or options.exclude_classes:
+            # classes are matched by class id, English name or translated label
+            lookup = {str(i): i for i in range(len(names))}
+            lookup.update({names[i].lower(): i for i in range(len(names))})
+            lookup.update({label.lower(): i for i, label in enumerate(labels)})
+            requested = (*(options.classes or ()), *options.exclude_classes)
+            unknown = [c for c in dict.fromkeys(requested) if c not in lookup]
+            if unknown:
+                # a misspelt allow list would silently filter out everything
+                raise UnknownClassesError(unknown)
+            allowed = (
+                set(range(len(names)))
+                if options.classes is None
+                else {lookup[c] for c in options.classes}
+            )
+            allowed -= {lookup[c] for c in options.exclude_classes}
+            args["classes"] = sorted(allowed)
+        return args
+
+    def check_classes(self, options: DetectionOptions):
+        """Raises UnknownClassesError for classes the active model does not know."""
+        model = self.model
+        self.predict_args(
+            options, model.names, self.label_table(self.model_name, model.names)
         )
-        self.translations = {}
-        await self.initialize_translations()
+
+    @staticmethod
+    def _to_detections(
+        data: np.ndarray, labels: np.ndarray, imgsz: int | None = None
+    ) -> Detections:
+        class_ids = data[:, 5].astype(np.int64)
+        logger.info(f"Found {len(data)} objects in provided image.")
+        return Detections(
+            boxes=data[:, :4],
+            confidences=data[:, 4],
+            class_ids=class_ids,
+            labels=labels[class_ids],
+            imgsz=imgsz,
+        )
+
+    async def start(self):
+        """Startup pipeline: inference workers, default model, translations and
+        warm-up. `ready` is set once the default model can serve at full speed."""
+        start = time.perf_counter()
+        try:
+            # devices resolve here, importing the app does not import torch
+            devices = [self.device] if self.workers is None else self.workers.devices
+            await run_in_threadpool(configure_torch, self.settings, devices)
+            if self.workers is not None:
+                await run_in_threadpool(self.workers.start)
+            await self.reload_with_model(self.model_name)
+        except Exception as e:
+            logger.error(f"Detection service failed to start: {e}")
+            self.model_status = {
+                "model": self.model_name,
+                "state": "failed",
+                "error": str(e),
+            }
+        else:
+            self.ready = True
+            logger.info(
+                f"Detection service ready in {time.perf_counter() - start:.2f}s"
+            )
+            # other languages are prepared in the background, not on the ready path
+            self._labels_task = asyncio.create_task(self.prepare_labels())
+        finally:
+            self._started.set()
+
+    async def wait_ready(self):
+        """Waits for `start`, requests arriving meanwhile are served afterwards."""
+        await self._started.wait()
+        if not self.ready:
+            raise RuntimeError(
+                f"Detection service failed to start: {self.model_status.get('error')}"
+            )
+
+    def close(self):
+        if self._labels_task is not None:
+            self._labels_task.cancel()
+        if self.workers is not None:
+            self.workers.stop()
+
+    async def reload_with_model(
+        self,
+        model_name: str,
+        progress: Callable[[dict], Awaitable[None]] | None = None,
+    ):
+        """Switches the default model without blocking the event loop.
+
+        The new model is loaded and warmed up off the loop next to the old one, which
+        keeps serving requests until the pointer swap. Requests already running on
+        the old model finish on it, it is released after the last of them.
+        `progress` is awaited with `model_status` after every step."""
+        logger.info(f"Reloading DetectionService with model {model_name}")
+        start = time.perf_counter()
+
+        async def report(state: str, **detail):
+            self.model_status = {
+                "model": model_name,
+                "state": state,
+                "active_model": self.model_name,
+                **detail,
+            }
+            if progress is not None:
+                await progress(self.model_status)
+
+        await report("loading")
+        try:
+            # pinned, so requests finishing on other models cannot evict it meanwhile
+            await run_in_threadpool(self.pool.acquire, model_name)
+            try:
+                await self.ensure_model(model_name)
+                await report("warming_up")
+                await run_in_threadpool(self.warm_up, model_name)
+                self.pool.activate(model_name)
+            finally:
+                self.pool.release(model_name)
+        except Exception as e:
+            logger.error(f"Switching to model {model_name} failed: {e}")
+            await report("failed", error=str(e))
+            raise
+        self.cache.clear()
+        self.settings = self.settings.model_copy(update={"model_name": model_name})
+        await report("ready", seconds=round(time.perf_counter() - start, 2))
+
+    async def set_language(self, language: str):
+        """Switches the label language, catalogues are loaded before the switch
+        so requests never see a half translated model list."""
+        for model_name in self.pool.loaded:
+            await self.ensure_labels(model_name, language)
+        self.settings.language = language
+        self.translate_to = language
+        self.cache.clear()
@@ -0,0 +1,229 @@
+"""Exported inference backends for CPU-only servers.
+
+A .pt model in detection_models/ can be exported to ONNX Runtime, OpenVINO or
+TorchScript, optionally quantised to FP16 or INT8. The artefact is cached next to
+the source model and is listed as a model of its own:
+
+    yolov8n.pt -> yolov8n.onnx, yolov8n.int8.onnx, yolov8n.fp16.torchscript,
+                  yolov8n_int8_openvino_model/, ...
+
+Run from the server directory:
+    python -m app.services.export yolov8n.pt --backend openvino --precision int8
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "fp16", "int8")
+SUPPORTED_PRECISIONS = {
+    "onnx": ("fp32", "fp16", "int8"),
+    "openvino": ("fp32", "fp16", "int8"),
+    "torchscript": ("fp32", "fp16"),
+}
+# FP16 ONNX and TorchScript graphs can only be traced on a CUDA device
+CUDA_ONLY = {("onnx", "fp16"), ("torchscript", "fp16")}
+OPENVINO_SUFFIX = "_openvino_model"
+# fused .pt models, hidden from the model list
+FUSED_CACHE_DIR = ".cache"
+
+
+def backend_of(model_name: str) -> str:
+    if model_name.endswith(OPENVINO_SUFFIX):
+        return "openvino"
+    suffix = Path(model_name).suffix.lstrip(".")
+    return suffix if suffix in SUPPORTED_PRECISIONS else "pytorch"
+
+
+def is_model(path: Path) -> bool:
+    """True for .pt checkpoints and exported artefacts."""
+    if path.name.endswith(OPENVINO_SUFFIX):
+        return path.is_dir()
+    return path.suffix in (".pt", ".onnx", ".torchscript")
+
+
+def parse_backend(spec: str) -> tuple[str, str]:
+    """Parses "openvino-int8" into ("openvino", "int8"), fp32 if no precision."""
+    backend, _, precision = spec.strip().lower().partition("-")
+    precision = precision or "fp32"
+    if backend not in SUPPORTED_PRECISIONS:
+        raise ValueError(
+            f"Unknown backend {backend}, expected one of {list(SUPPORTED_PRECISIONS)}"
+        )
+    if precision not in SUPPORTED_PRECISIONS[backend]:
+        raise ValueError(
+            f"{backend} does not support {precision}, "
+            f"expected one of {SUPPORTED_PRECISIONS[backend]}"
+        )
+    return backend, precision
+
+
+def artefact_name(model_name: str, backend: str, precision: str = "fp32") -> str:
+    stem = Path(model_name).stem
+    if backend == "openvino":
+        tag = "" if precision == "fp32" else f"_{precision}"
+        return f"{stem}{tag}{OPENVINO_SUFFIX}"
+    tag = "" if precision == "fp32" else f".{precision}"
+    return f"{stem}{tag}.{backend}"
+
+
+def load_yolo(model_path: Path):
+    """Loads a checkpoint or an exported artefact with the matching predictor."""
+    # ultralytics (and torch with it) is imported on first load, not at startup
+    from ultralytics import RTDETR
+    from ultralytics import YOLO
+
+    if backend_of(model_path.name) == "pytorch":
+        # YOLO switches itself to RT-DETR based on the checkpoint head
+        return YOLO(str(model_path))
+    if "rtdetr" in model_path.name:
+        return RTDETR(str(model_path))
+    return YOLO(str(model_path), task="detect")
+
+
+def fused_cache_path(models_dir: Path, model_name: str) -> Path:
+    return models_dir / FUSED_CACHE_DIR / f"{Path(model_name).stem}.fused.pt"
+
+
+def load_fused(models_dir: Path, model_name: str):
+    """The cached fused model, or None if missing or older than the checkpoint."""
+    source = models_dir / model_name
+    cached = fused_cache_path(models_dir, model_name)
+    if not cached.exists() or cached.stat().st_mtime < source.stat().st_mtime:
+        return None
+    logger.info(f"Using cached fused model {cached}")
+    return load_yolo(cached)
+
+
+def save_fused(models_dir: Path, model_name: str, model):
+    """Saves a fused model as held in memory (fp32, layers folded)."""
+    import torch
+
+    cached = fused_cache_path(models_dir, model_name)
+    cached.parent.mkdir(exist_ok=True)
+    # several inference workers may write the same model at once
+    partial = cached.with_suffix(f".{os.getpid()}.tmp")
+    torch.save({**model.ckpt, "model": model.model, "ema": None}, partial)
+    partial.replace(cached)
+    logger.info(f"Cached fused model at {cached}")
+
+
+def export_model(
+    models_dir: Path,
+    model_name: str,
+    backend: str,
+    precision: str = "fp32",
+    imgsz: int = 640,
+    device: str = "cpu",
+    batch: int = 8,
+    data: str | None = None,
+) -> Path:
+    """Exports a .pt model, or returns the cached artefact if it is up to date.
+
+    ONNX and OpenVINO graphs get a dynamic batch axis up to `batch`, so batched
+    requests keep working. INT8 OpenVINO calibrates on `data` (ultralytics dataset
+    yaml), INT8 ONNX uses weight-only dynamic quantisation and needs no data."""
+    parse_backend(f"{backend}-{precision}")
+    if backend_of(model_name) != "pytorch":
+        raise ValueError(f"Only .pt models can be exported, got {model_name}")
+    if (backend, precision) in CUDA_ONLY and not device.startswith("cuda"):
+        raise ValueError(f"{precision} {backend} export needs a CUDA device")
+
+    source = models_dir / model_name
+    target = models_dir / artefact_name(model_name, backend, precision)
+    if not source.exists():
+        raise FileNotFoundError(f"Model {model_name} not found in {models_dir}")
+    if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+        logger.info(f"Using cached {backend} {precision} export {target}")
+        return target
+
+    logger.info(f"Exporting {model_name} to {backend} {precision}")
+    # ultralytics writes next to the checkpoint under a fixed name, export from a
+    # copy so artefacts of other precisions are not overwritten
+    with tempfile.TemporaryDirectory(dir=models_dir) as workdir:
+        model = load_yolo(Path(shutil.copy(source, workdir)))
+        if backend == "onnx" and precision == "int8":
+            exported = Path(
+                model.export(
+                    format="onnx", imgsz=imgsz, dynamic=True, batch=batch, device=device
+                )
+            )
+            _quantize_onnx(exported, Path(workdir) / target.name)
+            exported = Path(workdir) / target.name
+        else:
+            exported = Path(
+                model.export(
+                    format=backend,
+                    imgsz=imgsz,
+                    half=precision == "fp16",
+                    int8=precision == "int8",
+                    # traced TorchScript has a fixed batch of 1
+                    dynamic=backend != "torchscript",
+                    batch=1 if backend == "torchscript" else batch,
+                    device=device,
+                    data=data,
+                )
+            )
+        if target.is_dir():
+            shutil.rmtree(target)
+        shutil.move(exported, target)
+    logger.info(f"Exported {model_name} to {target}")
+    return target
+
+
+def _quantize_onnx(source: Path, target: Path):
+    from ultralytics.utils.checks import check_requirements
+
+    # installed on demand like the other ultralytics export dependencies
+    check_requirements("onnxruntime")
+    import onnx
+    from onnxruntime.quantization import QuantType
+    from onnxruntime.quantization import quantize_dynamic
+
+    quantized = target.with_suffix(".tmp.onnx")
+    quantize_dynamic(source, quantized, weight_type=QuantType.QUInt8)
+    # keep the ultralytics metadata (class names, stride, imgsz)
+    model = onnx.load(quantized)
+    del model.metadata_props[:]
+    model.metadata_props.extend(onnx.load(source).metadata_props)
+    onnx.save(model, target)
+    quantized.unlink()
+
+
+def main():
+    from app.models.detection_settings import YOLOSettings
+
+    settings = YOLOSettings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "model", help="model file in detection_models/, e.g. yolov8n.pt"
+    )
+    parser.add_argument("--backend", choices=list(SUPPORTED_PRECISIONS), required=True)
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32")
+    parser.add_argument("--imgsz", type=int, default=settings.imgsz)
+    parser.add_argument("--device", default=settings.device_actual)
+    parser.add_argument("--batch", type=int, default=settings.max_batch_size)
+    parser.add_argument("--data", help="calibration dataset yaml for INT8 OpenVINO")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    path = export_model(
+        settings.model_path.parent,
+        args.model,
+        args.backend,
+        args.precision,
+        imgsz=args.imgsz,
+        device=args.device,
+        batch=args.batch,
+        data=args.data,
+    )
+    print(path.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+from functools import cached_property
+import hashlib
+import io
+import logging
+
+import lz4.frame
+import numpy as np
+from PIL import Image
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+COLORSPACES = ("rgb", "bgr")
+COMPRESSIONS = ("none", "lz4", "zstd")
+
+
+class FrameFormatError(ValueError):
+    """Raised when a raw frame buffer does not match its declared header."""
+
+
+def decompress(buffer: bytes, compression: str) -> bytes:
+    if compression == "none":
+        return buffer
+    try:
+        if compression == "lz4":
+            return lz4.frame.decompress(buffer)
+        if compression == "zstd":
+            return zstandard.ZstdDecompressor().decompress(buffer)
+    except (RuntimeError, zstandard.ZstdError) as e:
+        raise FrameFormatError(f"Failed to decompress {compression} frame: {e}") from e
+    raise FrameFormatError(
+        f"Unsupported compression {compression}, expected one of {COMPRESSIONS}"
+    )
+
+
+def frame_from_raw(
+    buffer: bytes,
+    width: int,
+    height: int,
+    colorspace: str = "rgb",
+    compression: str = "none",
+) -> np.ndarray:
+    """Wraps a raw interleaved 8-bit frame as an RGB (height, width, 3) array.
+
+    Uncompressed buffers are not copied, the returned array is a read-only view
+    of the request body."""
+    colorspace = colorspace.lower()
+    if colorspace not in COLORSPACES:
+        raise FrameFormatError(
+            f"Unsupported colorspace {colorspace}, expected one of {COLORSPACES}"
+        )
+    buffer = decompress(buffer, compression.lower())
+    expected = width * height * 3
+    if len(buffer) != expected:
+        raise FrameFormatError(
+            f"Frame buffer has {len(buffer)} bytes, expected {expected} for {width}x{height}"
+        )
+    frame = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+    return frame[..., ::-1] if colorspace == "bgr" else frame
+
+
+def content_digest(*chunks: bytes) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.digest()
+
+
+class DecodedFrame:
+    """Request-scoped image shared by every stage of a detect request.
+
+    The upload is decoded exactly once when the frame is built, the encoded bytes
+    are not kept around. Other representations are derived lazily from the
+    decoded pixels and cached for the lifetime of the request."""
+
+    def __init__(
+        self,
+        rgb: np.ndarray | None = None,
+        pil: Image.Image | None = None,
+        digest: bytes | None = None,
+    ):
+        if rgb is None and pil is None:
+            raise ValueError("DecodedFrame needs pixels")
+        self._rgb = rgb
+        self._pil = pil
+        self._digest = digest
+        self._resized: dict[tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DecodedFrame":
+        """Decodes an encoded upload (JPEG, PNG...)."""
+        return cls(
+            pil=Image.open(io.BytesIO(data)).convert("RGB"),
+            digest=content_digest(data),
+        )
+
+    @classmethod
+    def from_raw(
+        cls,
+        buffer: bytes,
+        width: int,
+        height: int,
+        colorspace: str = "rgb",
+        compression: str = "none",
+    ) -> "DecodedFrame":
+        """Wraps a raw camera buffer, see `frame_from_raw`."""
+        header = f"{width}x{height}:{colorspace}:{compression}".encode()
+        return cls(
+            rgb=frame_from_raw(buffer, width, height, colorspace, compression),
+            digest=content_digest(header, buffer),
+        )
+
+    @property
+    def width(self) -> int:
+        return self._pil.width if self._pil is not None else self._rgb.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self._pil.height if self._pil is not None else self._rgb.shape[0]
+
+    @property
+    def digest(self) -> bytes:
+        """Content hash of the upload, used as the result cache key."""
+        if self._digest is None:
+            self._digest = content_digest(np.ascontiguousarray(self.rgb))
+        return self._digest
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """(height, width, 3) uint8 RGB pixels."""
+        if self._rgb is None:
+            self._rgb = np.asarray(self._pil)
+        return self._rgb
+
+    @cached_property
+    def bgr(self) -> np.ndarray:
+        """Model input, ultralytics expects BGR arrays (flipped view, no copy)."""
+        return self.rgb[..., ::-1]
+
+    @property
+    def pil(self) -> Image.Image:
+        """Shared PIL view, copy it before drawing on it."""
+        if self._pil is None:
+            self._pil = Image.fromarray(np.ascontiguousarray(self._rgb))
+        return self._pil
+
+    def resized(self, size: tuple[int, int]) -> np.ndarray:
+        """RGB pixels resized to (width, height), cached per size."""
+        if size not in self._resized:
+            self._resized[size] = np.asarray(
+                self.pil.resize(size, Image.Resampling.BILINEAR)
+            )
+        return self._resized[size]
+
+    @cached_property
+    def dhash(self) -> int:
+        """64-bit difference hash, near-duplicate frames differ in a few bits."""
+        gray = self.resized((9, 8)).mean(axis=2)
+        bits = np.packbits(gray[:, 1:] > gray[:, :-1])
+        return int.from_bytes(bits.tobytes(), "big")
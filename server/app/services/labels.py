@@ -0,0 +1,102 @@
+"""Label catalogues: the display labels of a model in one language.
+
+A catalogue is an object array indexed by class id, so mapping detections to
+labels is one gather, `catalogue[class_ids]`. It is built once per (model,
+language) and cached in detection_models/.cache/labels/ as a small UTF-8 text
+file with one label per line in class id order. A header holds a digest of the
+model's class names, so a catalogue never outlives the classes it was built
+for. Loading one is a single read and split, no JSON and no per-label lookups.
+
+Run from the server directory to pre-generate the catalogues of every model in
+detection_models/, for PEPPER_LANGUAGE and PEPPER_LABEL_LANGUAGES or the given
+languages:
+    python -m app.services.labels cs fr de
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from app.services.export import FUSED_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+HEADER = "#pepper-labels 1"
+
+
+def names_digest(names: dict[int, str]) -> str:
+    joined = "\n".join(names[i] for i in range(len(names)))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()[:16]
+
+
+def catalogue_path(models_dir: Path, model_name: str, language: str) -> Path:
+    return models_dir / FUSED_CACHE_DIR / "labels" / f"{model_name}.{language}.txt"
+
+
+def build_catalogue(names: dict[int, str], translations: dict) -> np.ndarray:
+    """Labels by class id, English names where a translation is missing."""
+    return np.array(
+        [translations.get(names[i], names[i]) for i in range(len(names))],
+        dtype=object,
+    )
+
+
+def load_catalogue(path: Path, names: dict[int, str]) -> np.ndarray | None:
+    """Cached catalogue, None when missing or built for other class names."""
+    try:
+        header, *labels = path.read_text(encoding="utf-8").split("\n")
+    except FileNotFoundError:
+        return None
+    if header != f"{HEADER} {names_digest(names)}" or len(labels) != len(names):
+        logger.info(f"Label catalogue {path.name} is stale, rebuilding it")
+        return None
+    return np.array(labels, dtype=object)
+
+
+def save_catalogue(path: Path, names: dict[int, str], catalogue: np.ndarray):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [f"{HEADER} {names_digest(names)}"]
+    lines += [" ".join(str(label).split()) for label in catalogue]
+    # written aside and renamed, a concurrent reader never sees half a file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text("\n".join(lines), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def pregenerate(languages: list[str], models: list[str] | None = None):
+    """Builds the catalogues of the models for every language."""
+    from app.models.detection_settings import YOLOSettings
+    from app.services.detection import DetectionService
+
+    service = DetectionService(YOLOSettings(workers=0, warmup_runs=0))
+    for model_name in models or sorted(service.available_models):
+        try:
+            await service.ensure_model(model_name)
+            for language in languages:
+                await service.ensure_labels(model_name, language)
+        except Exception as e:
+            logger.error(f"Label catalogues of {model_name} failed: {e}")
+            continue
+        logger.info(f"Label catalogues of {model_name} ready: {', '.join(languages)}")
+
+
+def main():
+    from app.models.detection_settings import YOLOSettings
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("languages", nargs="*", help="default: configured languages")
+    parser.add_argument("--model", action="append", help="default: every model")
+    args = parser.parse_args()
+    settings = YOLOSettings()
+    languages = args.languages or sorted({settings.language, *settings.label_languages})
+    asyncio.run(pregenerate(languages, args.model))
+
+
+if __name__ == "__main__":
+    main()
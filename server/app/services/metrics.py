@@ -0,0 +1,283 @@
+"""Hot-path instrumentation: Prometheus text metrics and Server-Timing headers.
+
+Metrics are hand-rolled (counters, gauges, histograms with labels) and rendered
+in the Prometheus text exposition format by /metrics. `stage()` times a block,
+feeds the `pepper_stage_seconds` histogram and, when called inside an HTTP
+request, adds the stage to that response's Server-Timing header.
+"""
+
+from bisect import bisect_left
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+
+# seconds, tuned for a ~1-500 ms inference path
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: tuple = ()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _samples(name: str, values: dict, collect: Callable | None) -> list[str]:
+    if collect is not None:
+        collected = collect()
+        if isinstance(collected, dict):
+            values.update({_labels(dict(k)): v for k, v in collected.items()})
+        else:
+            values[()] = collected
+    return [f"{name}{_format_labels(k)} {_format_value(v)}" for k, v in values.items()]
+
+
+class Counter:
+    """Incremented directly, or read at scrape time from a running total by
+    `collect`, which returns a number or a {labels dict as tuple: value} mapping."""
+
+    def __init__(self, name: str, help: str, collect: Callable | None = None):
+        self.name = name
+        self.help = help
+        self.type = "counter"
+        self.collect = collect
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return _samples(self.name, values, self.collect)
+
+
+class Gauge:
+    """Set directly, or computed at scrape time by `collect`.
+
+    `collect` returns a number or a {labels dict as tuple: value} mapping."""
+
+    def __init__(self, name: str, help: str, collect: Callable | None = None):
+        self.name = name
+        self.help = help
+        self.type = "gauge"
+        self.collect = collect
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return _samples(self.name, values, self.collect)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.type = "histogram"
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._counts: dict[Labels, list[int]] = {}
+        self._sums: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            series = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, collect: Callable | None = None) -> Counter:
+        return self.register(Counter(name, help, collect))
+
+    def gauge(self, name: str, help: str, collect: Callable | None = None) -> Gauge:
+        return self.register(Gauge(name, help, collect))
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "pepper_stage_seconds", "Time spent per hot-path stage"
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "pepper_request_seconds", "End-to-end HTTP request latency"
+)
+REQUESTS = REGISTRY.counter("pepper_requests_total", "HTTP requests by status")
+BATCH_SIZE = REGISTRY.histogram(
+    "pepper_batch_size",
+    "Images per predict call",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "pepper_model_load_seconds", "Duration of the last load of each model"
+)
+DASHBOARD_DROPPED = REGISTRY.counter(
+    "pepper_dashboard_dropped_total",
+    "Dashboard messages dropped because a client could not keep up",
+)
+
+# stage name -> seconds, for the Server-Timing header of the current request
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def server_timing(timings: dict[str, float], total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def route_path(scope) -> str:
+    """Path template of the matched route including its router prefix, e.g.
+    /api/detect, so the label stays bounded whatever the path parameters."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    # routes of included routers may not carry the router prefix, it is the
+    # part of the request path in front of what the route matches
+    path = scope["path"]
+    regex = getattr(route, "path_regex", None)
+    for i, char in enumerate(path):
+        if char == "/" and regex is not None and regex.match(path[i:]):
+            return path[:i] + template
+    return template
+
+
+class ServerTimingMiddleware:
+    """Adds Server-Timing to every HTTP response and records request metrics.
+
+    Plain ASGI, so streaming responses and WebSockets pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(timings, time.perf_counter() - start)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode()),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            path = route_path(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, path=path)
+            REQUESTS.inc(path=path, status=status)
@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import contextmanager
+import itertools
+import logging
+from pathlib import Path
+import threading
+import time
+
+from app.services.metrics import MODEL_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def model_memory_bytes(model) -> int:
+    """Rough resident size of a loaded model (parameters + buffers)."""
+    module = getattr(model, "model", None)
+    if isinstance(module, str | Path):
+        # exported artefact, the runtime holds roughly its file size
+        path = Path(module)
+        files = path.rglob("*") if path.is_dir() else [path]
+        return sum(f.stat().st_size for f in files if f.is_file())
+    if not hasattr(module, "parameters"):
+        return 0
+    return sum(
+        t.numel() * t.element_size()
+        for t in itertools.chain(module.parameters(), module.buffers())
+    )
+
+
+class ModelPool:
+    """Keeps several detection models loaded at once.
+
+    Models are evicted least recently used first once their summed size exceeds
+    the memory budget; the active model and models leased by in-flight requests
+    are never evicted. Each model has its own load lock, so loading one model never
+    blocks requests served by another."""
+
+    def __init__(
+        self,
+        load: Callable[[str], object],
+        active_name: str,
+        memory_budget_mb: float = 4096,
+    ):
+        self._load = load
+        self.active_name = active_name
+        self.memory_budget = int(memory_budget_mb * 1024**2)
+        self._models: OrderedDict[str, object] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._leases: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+
+    @property
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return list(self._models)
+
+    @property
+    def memory_used(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    @property
+    def active(self):
+        return self.get(self.active_name)
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._models
+
+    def get(self, name: str):
+        """Returns a loaded model, loading it first if needed (blocking)."""
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name]
+            start = time.perf_counter()
+            model = self._load(name)
+            elapsed = time.perf_counter() - start
+            MODEL_LOAD_SECONDS.set(elapsed, model=name)
+            size = model_memory_bytes(model)
+            logger.info(
+                f"Model {name} loaded into pool in {elapsed:.2f}s "
+                f"({size / 1024**2:.1f} MB)"
+            )
+            with self._lock:
+                self._models[name] = model
+                self._sizes[name] = size
+                self._evict(keep=name)
+        return model
+
+    def acquire(self, name: str):
+        """Loads a model if needed and pins it, it is not evicted until `release`."""
+        with self._lock:
+            self._leases[name] = self._leases.get(name, 0) + 1
+        try:
+            return self.get(name)
+        except Exception:
+            self.release(name)
+            raise
+
+    def release(self, name: str):
+        with self._lock:
+            self._leases[name] -= 1
+            if not self._leases[name]:
+                del self._leases[name]
+                # a model swapped out while in use is released by its last user
+                self._evict(keep=self.active_name)
+
+    @contextmanager
+    def lease(self, name: str):
+        """Holds a model for the duration of a request."""
+        model = self.acquire(name)
+        try:
+            yield model
+        finally:
+            self.release(name)
+
+    def activate(self, name: str):
+        """Makes an already loaded model the default one (atomic pointer swap)."""
+        with self._lock:
+            if name not in self._models:
+                raise KeyError(f"Model {name} is not loaded")
+            self.active_name = name
+            self._evict(keep=name)
+        logger.info(f"Active model switched to {name}")
+
+    def _evict(self, keep: str):
+        for name in list(self._models):
+            if sum(self._sizes.values()) <= self.memory_budget:
+                break
+            if name in (keep, self.active_name) or name in self._leases:
+                continue
+            del self._models[name]
+            size = self._sizes.pop(name)
+            logger.info(f"Evicted model {name} from pool ({size / 1024**2:.1f} MB)")
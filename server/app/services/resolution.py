@@ -0,0 +1,66 @@
+from collections import deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODES = ("auto", "fast", "precise")
+
+
+class ResolutionController:
+    """Picks the inference resolution (imgsz) of each request.
+
+    "fast" requests run at the smallest step, "precise" ones at the full imgsz.
+    "auto" requests run at the current step: with `adaptive` on, it moves one
+    step down when the mean batch queue latency of the last `window` requests
+    exceeds `target_queue_ms`, and one step up when it drops below half of it.
+    The sample window restarts after every change, so one step settles before
+    the next."""
+
+    def __init__(
+        self,
+        imgsz: int,
+        steps: list[int],
+        target_queue_ms: float = 50.0,
+        adaptive: bool = False,
+        window: int = 16,
+    ):
+        self.steps = sorted({s for s in steps if s <= imgsz} | {imgsz})
+        self.target = target_queue_ms / 1000
+        self.adaptive = adaptive
+        self._index = len(self.steps) - 1
+        self._samples: deque[float] = deque(maxlen=window)
+
+    @property
+    def current(self) -> int:
+        return self.steps[self._index]
+
+    def for_mode(self, mode: str | None) -> int:
+        if mode is None or mode == "auto":
+            return self.current
+        if mode == "fast":
+            return self.steps[0]
+        if mode == "precise":
+            return self.steps[-1]
+        raise ValueError(f"Mode must be one of {', '.join(MODES)}, got {mode}")
+
+    def observe(self, queue_seconds: float):
+        """Feeds the queue latency of one request, called by the batch scheduler."""
+        if not self.adaptive:
+            return
+        self._samples.append(queue_seconds)
+        if len(self._samples) < self._samples.maxlen:
+            return
+        mean = sum(self._samples) / len(self._samples)
+        if mean > self.target and self._index > 0:
+            self._step(-1, mean)
+        elif mean < self.target / 2 and self._index < len(self.steps) - 1:
+            self._step(1, mean)
+
+    def _step(self, direction: int, mean: float):
+        self._index += direction
+        self._samples.clear()
+        logger.info(
+            f"Queue latency {mean * 1000:.1f} ms (target {self.target * 1000:.0f} ms), "
+            f"auto resolution {'raised' if direction > 0 else 'lowered'} "
+            f"to {self.current}"
+        )
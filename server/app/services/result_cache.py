@@ -0,0 +1,111 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+from app.models.detection_result import Detections
+from app.models.detection_settings import DetectionOptions
+from app.services.frames import DecodedFrame
+
+logger = logging.getLogger(__name__)
+
+# (model name, imgsz, language, options, content digest or dhash)
+CacheKey = tuple[str, int, str, DetectionOptions, bytes | int]
+
+
+class ResultCache:
+    """Detection results keyed by image content and detection config.
+
+    In exact mode the key holds the upload digest, in perceptual mode the 64-bit
+    dHash of the frame and lookups also accept entries at most `max_distance`
+    bits away. Entries expire after `ttl_s` and the least recently used ones are
+    evicted beyond `max_size`."""
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl_s: float = 5.0,
+        perceptual: bool = False,
+        max_distance: int = 4,
+    ):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, tuple[float, Detections]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "mode": "perceptual" if self.perceptual else "exact",
+            }
+
+    def key(
+        self,
+        frame: DecodedFrame,
+        model_name: str,
+        imgsz: int,
+        language: str,
+        options: DetectionOptions,
+    ) -> CacheKey:
+        content = frame.dhash if self.perceptual else frame.digest
+        return model_name, imgsz, language, options, content
+
+    def get(self, key: CacheKey) -> Detections | None:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            match = key if key in self._entries else self._near_duplicate(key)
+            if match is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(match)
+            self.hits += 1
+            return self._entries[match][1]
+
+    def put(self, key: CacheKey, detections: Detections):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, detections)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                logger.info(f"Result cache invalidated ({len(self._entries)} entries)")
+            self._entries.clear()
+
+    def _expire(self, now: float):
+        expired = [k for k, (expires, _) in self._entries.items() if expires <= now]
+        for k in expired:
+            del self._entries[k]
+
+    def _near_duplicate(self, key: CacheKey) -> CacheKey | None:
+        if not self.perceptual:
+            return None
+        *config, dhash = key
+        for candidate in reversed(self._entries):
+            if (
+                list(candidate[:-1]) == config
+                and (candidate[-1] ^ dhash).bit_count() <= self.max_distance
+            ):
+                return candidate
+        return None
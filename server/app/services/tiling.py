@@ -0,0 +1,83 @@
+"""Sliced inference for high-resolution frames with small objects.
+
+A frame is covered by overlapping tiles which, together with the full frame,
+run as one predict batch. Tile boxes are shifted back to frame coordinates and
+merged with a class-aware NMS. The grid comes from a simple cost model: every
+extra tile costs one more image of inference, so a frame is only sliced as far
+as needed for no tile to be downscaled more than `max_scale` times to imgsz.
+"""
+
+import math
+
+import numpy as np
+
+
+def tile_grid(
+    width: int,
+    height: int,
+    imgsz: int,
+    max_scale: float = 1.5,
+    overlap: float = 0.2,
+    max_tiles: int = 8,
+) -> tuple[int, int]:
+    """Smallest (columns, rows) grid whose tiles are at most `max_scale` * imgsz.
+
+    (1, 1) means the full frame alone is enough. Grids over `max_tiles` are
+    coarsened along the axis with the smaller tiles, keeping tiles close to
+    square and trading small-object recall for time."""
+
+    def count(side: int) -> int:
+        limit = imgsz * max_scale
+        if side <= limit:
+            return 1
+        # n tiles of size t overlapping by overlap * t cover n*t - (n-1)*overlap*t
+        return math.ceil((side / limit - overlap) / (1 - overlap))
+
+    def size(side: int, n: int) -> float:
+        return side / (n - (n - 1) * overlap)
+
+    columns, rows = count(width), count(height)
+    while columns * rows > max_tiles:
+        if rows == 1 or (columns > 1 and size(width, columns) <= size(height, rows)):
+            columns -= 1
+        else:
+            rows -= 1
+    return columns, rows
+
+
+def tile_boxes(
+    width: int, height: int, columns: int, rows: int, overlap: float = 0.2
+) -> np.ndarray:
+    """(columns * rows, 4) int xyxy tiles, evenly spread and overlapping."""
+
+    def spans(side: int, n: int) -> np.ndarray:
+        size = math.ceil(side / (n - (n - 1) * overlap))
+        starts = np.linspace(0, side - size, n).round().astype(np.int64)
+        return np.stack([starts, starts + size], axis=1)
+
+    xs, ys = spans(width, columns), spans(height, rows)
+    x = np.repeat(xs, rows, axis=0)
+    y = np.tile(ys, (columns, 1))
+    return np.stack([x[:, 0], y[:, 0], x[:, 1], y[:, 1]], axis=1)
+
+
+def merge(data: np.ndarray, threshold: float = 0.6, max_det: int = 300) -> np.ndarray:
+    """Class-aware NMS over (N, 6) xyxy/conf/class rows from several tiles.
+
+    Overlap is intersection over the smaller box, so a box cut at a tile edge is
+    matched with the full box of the neighbouring tile. Fully vectorised Fast
+    NMS: a box is dropped if any higher scoring box of its class overlaps it."""
+    if len(data) < 2:
+        return data
+    data = data[np.argsort(-data[:, 4], kind="stable")][: max_det * 4]
+    boxes = data[:, :4]
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    top_left = np.maximum(boxes[:, None, :2], boxes[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    smaller = np.minimum(areas[:, None], areas[None, :])
+    overlaps = intersection > threshold * np.maximum(smaller, 1e-9)
+    overlaps &= data[:, None, 5] == data[None, :, 5]
+    # only higher scoring boxes (earlier rows) suppress
+    suppressed = np.triu(overlaps, k=1).any(axis=0)
+    return data[~suppressed][:max_det]
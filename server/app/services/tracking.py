@@ -0,0 +1,202 @@
+"""Multi-object tracking across the frames of one robot session.
+
+Every session owns an ultralytics ByteTrack or BoT-SORT tracker fed with the
+detections of its frames, objects keep a stable `track_id` for as long as the
+tracker follows them. As in ultralytics track mode, the returned objects are the
+confirmed tracks: an object appearing mid-session is reported from its second
+frame on. With `skip_frames` > 0, up to that many frames in a row skip the
+detector and the tracks are moved by their Kalman motion model instead.
+
+Session frames are detected down to the tracker's `track_low_thresh`: its second
+association keeps a track alive on a weak box, e.g. a partly occluded object.
+The request's threshold applies to the returned tracks instead.
+
+Sessions are kept in LRU order, idle ones expire after `ttl_s` and the least
+recently used ones are dropped beyond `max_sessions`, so tracker state stays
+bounded whatever the robots do.
+"""
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+import logging
+import time
+
+import numpy as np
+
+from app.models.detection_result import Detections
+from app.models.detection_settings import DetectionOptions
+from app.services.frames import DecodedFrame
+
+logger = logging.getLogger(__name__)
+
+# ultralytics predict default, used when a request sets no threshold
+DEFAULT_CONF = 0.25
+
+
+@dataclass
+class TrackingSession:
+    tracker: object  # ultralytics BYTETracker or BOTSORT
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    labels: dict[int, str] = field(default_factory=dict)  # class id -> label
+    imgsz: int | None = None
+    skipped: int = 0  # frames propagated since the last detection
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class TrackingService:
+    """Tracker state of the robot sessions, keyed by session id."""
+
+    def __init__(
+        self,
+        tracker: str = "bytetrack.yaml",
+        max_sessions: int = 64,
+        ttl_s: float = 60.0,
+        skip_frames: int = 0,
+    ):
+        self.tracker = tracker
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self.skip_frames = skip_frames
+        self.propagated = 0
+        self._config = None
+        self._sessions: OrderedDict[str, TrackingSession] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def session(self, session_id: str) -> TrackingSession:
+        """Session of the id, created on first use."""
+        now = time.monotonic()
+        self._expire(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = TrackingSession(tracker=self._new_tracker())
+            self._sessions[session_id] = session
+            logger.info(f"Tracking session {session_id} started")
+            while len(self._sessions) > self.max_sessions:
+                dropped, _ = self._sessions.popitem(last=False)
+                logger.info(f"Tracking session {dropped} dropped, too many sessions")
+        self._sessions.move_to_end(session_id)
+        session.last_used = now
+        return session
+
+    def close(self, session_id: str):
+        if self._sessions.pop(session_id, None) is not None:
+            logger.info(f"Tracking session {session_id} closed")
+
+    def detection_options(self, options: DetectionOptions) -> DetectionOptions:
+        """Options to detect a session frame with, see module doc."""
+        low = self._tracker_config().track_low_thresh
+        if _threshold(options) <= low:
+            return options
+        return replace(options, confidence_threshold=low)
+
+    def update(
+        self,
+        session: TrackingSession,
+        frame: DecodedFrame,
+        detections: Detections,
+        options: DetectionOptions | None = None,
+    ) -> Detections:
+        """Feeds the detections of a frame, returns the tracked objects above the
+        threshold of `options`."""
+        from ultralytics.engine.results import Boxes
+
+        session.labels.update(
+            zip(detections.class_ids.tolist(), detections.labels.tolist(), strict=True)
+        )
+        session.imgsz = detections.imgsz
+        session.skipped = 0
+        data = np.concatenate(
+            [
+                detections.boxes,
+                detections.confidences[:, None],
+                detections.class_ids[:, None],
+            ],
+            axis=1,
+        ).astype(np.float32)
+        boxes = Boxes(data, (frame.height, frame.width))
+        # BoT-SORT compensates camera motion on the grayscale frame, ByteTrack
+        # ignores it; rgb is contiguous for OpenCV and the channel order is moot
+        tracks = session.tracker.update(boxes, frame.rgb)
+        return self._detections(session, tracks, options)
+
+    def propagate(
+        self, session: TrackingSession, options: DetectionOptions | None = None
+    ) -> Detections | None:
+        """Tracked objects moved by the motion model, None when the frame needs
+        the detector: skipping is off, used up or there is nothing to track."""
+        if session.skipped >= self.skip_frames:
+            return None
+        tracker = session.tracker
+        tracks = [t for t in tracker.tracked_stracks if t.is_activated]
+        if not tracks:
+            return None
+        session.skipped += 1
+        self.propagated += 1
+        # keeps track ages in frames, the next update predicts one more step
+        tracker.frame_id += 1
+        tracker.multi_predict(tracks)
+        return self._detections(session, np.array([t.result for t in tracks]), options)
+
+    def _detections(
+        self,
+        session: TrackingSession,
+        tracks: np.ndarray,
+        options: DetectionOptions | None,
+    ) -> Detections:
+        # rows of x1, y1, x2, y2, track id, score, class, detection index
+        tracks = np.asarray(tracks, dtype=np.float32).reshape(-1, 8)
+        if options is not None:
+            tracks = tracks[tracks[:, 5] >= _threshold(options)]
+        class_ids = tracks[:, 6].astype(np.int64)
+        return Detections(
+            boxes=tracks[:, :4],
+            confidences=tracks[:, 5],
+            class_ids=class_ids,
+            labels=np.array(
+                [session.labels[c] for c in class_ids.tolist()], dtype=object
+            ),
+            imgsz=session.imgsz,
+            track_ids=tracks[:, 4].astype(np.int64),
+        )
+
+    def _new_tracker(self):
+        from ultralytics.trackers.track import TRACKER_MAP
+
+        config = self._tracker_config()
+        return TRACKER_MAP[config.tracker_type](args=config)
+
+    def _tracker_config(self):
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import YAML
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+
+        if self._config is None:
+            self._config = IterableSimpleNamespace(
+                **YAML.load(check_yaml(self.tracker))
+            )
+            if self._config.tracker_type not in TRACKER_MAP:
+                raise ValueError(
+                    f"Tracker must be one of {list(TRACKER_MAP)}, "
+                    f"got {self._config.tracker_type}"
+                )
+        return self._config
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl_s:
+                break
+            del self._sessions[session_id]
+            logger.info(f"Tracking session {session_id} expired")
+
+
+def _threshold(options: DetectionOptions) -> float:
+    if options.confidence_threshold is None:
+        return DEFAULT_CONF
+    return options.confidence_threshold
@@ -0,0 +1,264 @@
+"""Label translation behind a persistent cache.
+
+Labels are looked up in a cache keyed by (English label, language), shared by
+every model, in detection_models/.cache/translations.sqlite. Cache misses go to
+the backends in configured order, each one only gets the labels the previous
+ones did not know:
+
+    dictionary  offline JSON dictionaries, <dictionary dir>/<language>.json
+                mapping English labels to translations
+    google      googletrans, one shared client, a batch of labels per request
+
+Batches run at most `max_concurrency` at a time and failed ones are retried
+with exponential backoff. Labels no backend knows stay in English and are not
+cached, so a later attempt can still translate them. A DictionaryBackend built
+from an in-memory dict is the offline stand-in for tests and benchmarks.
+"""
+
+from abc import ABC
+from abc import abstractmethod
+import asyncio
+import json
+import logging
+from pathlib import Path
+import random
+import sqlite3
+import threading
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.models.detection_settings import YOLOSettings
+from app.services.export import FUSED_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("dictionary", "google")
+
+
+class TranslationBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def translate_batch(self, labels: list[str], language: str) -> list:
+        """Translations in label order, None for labels the backend does not know."""
+
+
+class DictionaryBackend(TranslationBackend):
+    """Offline translations, {language: {label: translation}} or JSON files."""
+
+    name = "dictionary"
+
+    def __init__(self, translations: dict | None = None, path: Path | None = None):
+        self.path = path
+        self._dictionaries: dict[str, dict] = dict(translations or {})
+
+    def dictionary(self, language: str) -> dict:
+        if language not in self._dictionaries:
+            file = self.path / f"{language}.json" if self.path is not None else None
+            if file is not None and file.exists():
+                with open(file, encoding="utf-8") as f:
+                    self._dictionaries[language] = json.load(f)
+            else:
+                self._dictionaries[language] = {}
+        return self._dictionaries[language]
+
+    async def translate_batch(self, labels: list[str], language: str) -> list:
+        # a first call reads the JSON file, off the event loop
+        dictionary = await run_in_threadpool(self.dictionary, language)
+        return [dictionary.get(label) for label in labels]
+
+
+class GoogleBackend(TranslationBackend):
+    """googletrans with one client for the process lifetime. A batch is sent as
+    one newline separated text, labels are translated one by one only if the
+    service does not keep the lines apart."""
+
+    name = "google"
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+        self._translator = None
+
+    async def translate_batch(self, labels: list[str], language: str) -> list:
+        if self._translator is None:
+            from googletrans import Translator
+
+            self._translator = Translator(timeout=self.timeout)
+        result = await self._translator.translate(
+            "\n".join(labels), src="en", dest=language
+        )
+        lines = result.text.split("\n")
+        if len(lines) != len(labels):
+            lines = [
+                (await self._translator.translate(label, src="en", dest=language)).text
+                for label in labels
+            ]
+        return [line.strip() or None for line in lines]
+
+
+class TranslationCache:
+    """Translations keyed by (English label, language), shared by every model."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "label TEXT, language TEXT, text TEXT, PRIMARY KEY (label, language))"
+            )
+        return self._db
+
+    def get_many(self, labels: list[str], language: str) -> dict[str, str]:
+        found = {}
+        with self._lock:
+            db = self._connect()
+            # stays under SQLite's limit of bound parameters
+            for i in range(0, len(labels), 500):
+                chunk = labels[i : i + 500]
+                rows = db.execute(
+                    "SELECT label, text FROM translations WHERE language = ? "
+                    f"AND label IN ({', '.join('?' * len(chunk))})",
+                    [language, *chunk],
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, translations: dict[str, str], language: str):
+        if not translations:
+            return
+        with self._lock:
+            db = self._connect()
+            db.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?)",
+                [(label, language, text) for label, text in translations.items()],
+            )
+            db.commit()
+
+    def import_json(self, path: Path, language: str):
+        """Adds a {label: translation} JSON file, e.g. a per-model file of earlier
+        versions."""
+        with open(path, encoding="utf-8") as f:
+            self.put_many(json.load(f), language)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return (
+                self._connect()
+                .execute("SELECT COUNT(*) FROM translations")
+                .fetchone()[0]
+            )
+
+
+class LabelTranslator:
+    """Translates labels through the cache and the backends, see module doc."""
+
+    def __init__(
+        self,
+        backends: list[TranslationBackend],
+        cache: TranslationCache,
+        batch_size: int = 50,
+        max_concurrency: int = 2,
+        retries: int = 3,
+        backoff_s: float = 1.0,
+    ):
+        self.backends = backends
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._slots: asyncio.Semaphore | None = None
+
+    async def translate(self, labels: list[str], language: str) -> dict[str, str]:
+        """{label: translation} of the labels known to the cache or a backend."""
+        if language == "en":
+            return {}
+        labels = list(dict.fromkeys(labels))
+        # sqlite off the event loop, a slow disk must not stall other requests
+        translations = await run_in_threadpool(self.cache.get_many, labels, language)
+        missing = [label for label in labels if label not in translations]
+        error = None
+        for backend in self.backends:
+            if not missing:
+                break
+            batches = [
+                missing[i : i + self.batch_size]
+                for i in range(0, len(missing), self.batch_size)
+            ]
+            results = await asyncio.gather(
+                *(self._translate_batch(backend, batch, language) for batch in batches),
+                return_exceptions=True,
+            )
+            found = {}
+            for batch, texts in zip(batches, results, strict=True):
+                if isinstance(texts, Exception):
+                    # the next backend gets a go at these labels
+                    logger.error(f"{backend.name} translation failed: {texts}")
+                    error = texts
+                    continue
+                found.update(
+                    (label, text)
+                    for label, text in zip(batch, texts, strict=True)
+                    if text is not None
+                )
+            logger.info(
+                f"{backend.name} translated {len(found)} of {len(missing)} "
+                f"label(s) to {language}"
+            )
+            # kept even if other batches failed, a retry only asks for the rest
+            await run_in_threadpool(self.cache.put_many, found, language)
+            translations.update(found)
+            missing = [label for label in missing if label not in found]
+        if missing and error is not None:
+            raise error
+        if missing:
+            logger.warning(f"No translation to {language} for: {', '.join(missing)}")
+        return translations
+
+    async def _translate_batch(
+        self, backend: TranslationBackend, batch: list[str], language: str
+    ) -> list:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                try:
+                    return await backend.translate_batch(batch, language)
+                except ValueError:
+                    raise  # unsupported language, retrying will not help
+                except Exception as e:
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff_s * 2**attempt * random.uniform(1, 1.5)
+                    logger.warning(
+                        f"{backend.name} translation failed ({e}), "
+                        f"retrying in {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+
+
+def create_translator(settings: YOLOSettings, models_dir: Path) -> LabelTranslator:
+    backends = []
+    for name in settings.translation_backends:
+        if name == "dictionary":
+            path = settings.translation_dictionary_dir or models_dir / "translations"
+            backends.append(DictionaryBackend(path=Path(path)))
+        elif name == "google":
+            backends.append(GoogleBackend(timeout=settings.translation_timeout_s))
+        else:
+            raise ValueError(
+                f"Translation backend must be one of {BACKENDS}, got {name}"
+            )
+    return LabelTranslator(
+        backends,
+        TranslationCache(models_dir / FUSED_CACHE_DIR / "translations.sqlite"),
+        batch_size=settings.translation_batch_size,
+        max_concurrency=settings.translation_concurrency,
+        retries=settings.translation_retries,
+    )
@@ -0,0 +1,300 @@
+"""Inference worker processes for saturating many-core CPU boxes.
+
+With PEPPER_WORKERS=N the web process keeps the result cache, labels and
+batching, while predict runs in N spawned processes, each with its own model
+copy and optionally its own device. Frames are handed over through one
+multiprocessing.shared_memory block per job instead of pickled bytes, only the
+small (N, 6) result arrays travel back through a pipe per worker. Every job goes
+to the worker with the fewest jobs in flight. A worker found dead is respawned
+with the models of the pool, the jobs it held fail.
+"""
+
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import cached_property
+import itertools
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from multiprocessing.connection import wait
+import os
+import threading
+
+import numpy as np
+
+from app.models.detection_settings import YOLOSettings
+from app.services.frames import DecodedFrame
+
+logger = logging.getLogger(__name__)
+
+# (height, width, byte offset) of each RGB frame in a job's shared memory block
+FrameLayout = list[tuple[int, int, int]]
+
+
+@dataclass(frozen=True)
+class RemoteModel:
+    """Web-process stand-in for a model that lives in the workers."""
+
+    name: str
+    names: dict[int, str]
+
+
+class WorkerPool:
+    def __init__(self, settings: YOLOSettings):
+        self.settings = settings
+        self.size = settings.workers
+        self.in_flight = [0] * self.size
+        self._context = mp.get_context("spawn")
+        self._requests = [self._context.Queue() for _ in range(self.size)]
+        # a pipe per worker, one killed mid-send cannot lock up the others
+        self._responses: list[Connection | None] = [None] * self.size
+        self._processes: list[mp.Process] = []
+        # job id -> (worker index, result)
+        self._futures: dict[int, tuple[int, Future]] = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._respawn_lock = threading.Lock()
+        self._models: list[str] = []  # loaded in every worker, reloaded on respawn
+        self._reader: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    @cached_property
+    def devices(self) -> list[str]:
+        # resolved on first use, so building the pool does not import torch
+        devices = self.settings.worker_devices or [self.settings.device_actual]
+        return [devices[i % len(devices)] for i in range(self.size)]
+
+    @cached_property
+    def threads(self) -> int:
+        # split the cores, torch would otherwise start a full thread pool per worker
+        return self.settings.torch_threads or max(1, (os.cpu_count() or 1) // self.size)
+
+    def start(self):
+        if self._processes:
+            return
+        self._stopping.clear()
+        self._processes = [self._spawn(index) for index in range(self.size)]
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+        logger.info(
+            f"Started {self.size} inference workers on {self.devices} "
+            f"({self.threads} threads each)"
+        )
+
+    def _spawn(self, index: int) -> mp.Process:
+        worker_settings = self.settings.model_copy(
+            update={
+                "workers": 0,
+                "device": self.devices[index],
+                "result_cache_size": 0,
+                "torch_threads": self.threads,
+            }
+        )
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_settings, self._requests[index], sender),
+            name=f"inference-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        # the worker holds the only write end, its death reads as EOF
+        sender.close()
+        self._responses[index] = receiver
+        return process
+
+    def respawn(self, index: int):
+        """Replaces a dead worker. Its queued jobs fail, the new one loads the
+        models of the pool before it takes any other job."""
+        with self._respawn_lock:
+            if self._processes[index].is_alive():
+                return
+            logger.error(f"Inference worker {index} died, respawning it")
+            with self._lock:
+                lost = [job for job, (i, _) in self._futures.items() if i == index]
+                futures = [self._futures.pop(job)[1] for job in lost]
+                models = list(self._models)
+            # jobs still queued for the dead worker are dropped with its queue
+            self._requests[index] = self._context.Queue()
+            self._responses[index].close()
+            self._processes[index] = self._spawn(index)
+            for future in futures:
+                future.set_exception(RuntimeError(f"Inference worker {index} died"))
+            for model_name in models:
+                _, future = self._submit(index, ("load", model_name))
+                future.add_done_callback(_log_failed_load)
+
+    def stop(self):
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._stopping.set()
+        if self._reader is not None:
+            self._reader.join(timeout=5)
+            self._reader = None
+        for receiver in self._responses:
+            receiver.close()
+        logger.info("Inference workers stopped")
+
+    def load(self, model_name: str) -> RemoteModel:
+        """Loads a model in every worker, so any of them can serve it."""
+        self._respawn_dead()
+        jobs = [self._submit(index, ("load", model_name)) for index in range(self.size)]
+        # a first load may export and warm up the model, far slower than predict
+        names = [
+            self._wait(index, job, self.settings.worker_load_timeout_s)
+            for index, job in enumerate(jobs)
+        ]
+        with self._lock:
+            if model_name not in self._models:
+                self._models.append(model_name)
+        return RemoteModel(model_name, names[0])
+
+    def predict(
+        self, model_name: str, frames: list[DecodedFrame], predict_args: dict
+    ) -> list[np.ndarray]:
+        """Runs predict on the least loaded worker, one (N, 6) array per frame."""
+        layout: FrameLayout = []
+        offset = 0
+        for frame in frames:
+            layout.append((frame.height, frame.width, offset))
+            offset += frame.rgb.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        try:
+            for frame, (height, width, start) in zip(frames, layout, strict=True):
+                np.ndarray(
+                    (height, width, 3), dtype=np.uint8, buffer=shm.buf, offset=start
+                )[:] = frame.rgb
+            self._respawn_dead()
+            with self._lock:
+                index = self.in_flight.index(min(self.in_flight))
+                self.in_flight[index] += 1
+            try:
+                job = self._submit(
+                    index, ("predict", model_name, shm.name, layout, predict_args)
+                )
+                # a worker picking the job up after a timeout finds the segment
+                # unlinked and fails the job, one already reading keeps its mapping
+                return self._wait(index, job, self.settings.worker_timeout_s)
+            finally:
+                with self._lock:
+                    self.in_flight[index] -= 1
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _respawn_dead(self):
+        for index, process in enumerate(self._processes):
+            if not process.is_alive():
+                self.respawn(index)
+
+    def _submit(self, index: int, job: tuple) -> tuple[int, Future]:
+        future = Future()
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._futures[job_id] = (index, future)
+        self._requests[index].put((job_id, *job))
+        return job_id, future
+
+    def _wait(self, index: int, job: tuple[int, Future], timeout: float):
+        job_id, future = job
+        # poll, so a crashed worker fails the request instead of hanging it
+        waited = 0.0
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except TimeoutError:
+                waited += 1.0
+                if not self._processes[index].is_alive():
+                    self.respawn(index)
+                    return future.result(timeout=0)
+                if waited >= timeout:
+                    # the late result is dropped by the reader
+                    with self._lock:
+                        self._futures.pop(job_id, None)
+                    raise TimeoutError(
+                        f"Inference worker {index} did not answer in {timeout:.0f}s"
+                    ) from None
+
+    def _read_responses(self):
+        while not self._stopping.is_set():
+            receivers = [r for r in self._responses if r is not None and not r.closed]
+            try:
+                ready = wait(receivers, timeout=1.0)
+            except OSError:
+                continue  # closed by respawn meanwhile
+            for receiver in ready:
+                try:
+                    self._resolve(*receiver.recv())
+                except (EOFError, OSError):
+                    # the worker died, respawn gives the next one a new pipe
+                    receiver.close()
+
+    def _resolve(self, job_id: int, ok: bool, value):
+        with self._lock:
+            _, future = self._futures.pop(job_id, (None, None))
+        if future is None:
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(RuntimeError(value))
+
+
+def _log_failed_load(future: Future):
+    if future.exception() is not None:
+        logger.error(
+            f"Reloading a model in a respawned worker failed: {future.exception()}"
+        )
+
+
+def _worker_main(settings: YOLOSettings, requests: mp.Queue, responses: Connection):
+    """Worker process loop: ("load", name) and ("predict", ...) jobs."""
+    from app.services.acceleration import configure_torch
+    from app.services.detection import DetectionService
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(processName)s %(name)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    configure_torch(settings, [settings.device])
+    service = DetectionService(settings)
+    while True:
+        job = requests.get()
+        if job is None:
+            return
+        job_id, kind, model_name, *args = job
+        try:
+            model = service.pool.get(model_name)
+            if kind == "load":
+                service.warm_up(model_name)
+                responses.send((job_id, True, model.names))
+                continue
+            shm_name, layout, predict_args = args
+            try:
+                shm = shared_memory.SharedMemory(name=shm_name)
+            except FileNotFoundError:
+                # the web process timed out and freed the frames meanwhile
+                responses.send((job_id, False, "Job abandoned, frames released"))
+                continue
+            try:
+                imgs = [
+                    # BGR view of the RGB frame, like DecodedFrame.bgr
+                    np.ndarray(
+                        (height, width, 3), dtype=np.uint8, buffer=shm.buf, offset=start
+                    )[..., ::-1]
+                    for height, width, start in layout
+                ]
+                result = service.predict_arrays(model, imgs, predict_args)
+                del imgs
+            finally:
+                shm.close()
+            responses.send((job_id, True, result))
+        except Exception as e:
+            responses.send((job_id, False, f"{type(e).__name__}: {e}"))
@@ -1,22 +1,94 @@
+import asyncio
+import contextlib
 import json
+import logging
 
 from fastapi import WebSocket
 
+from app.services.metrics import DASHBOARD_DROPPED
+from app.services.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# (json text frame, optional binary frame sent right after it)
+Message = tuple[str, bytes | None]
+
+
+class ClientConnection:
+    """One dashboard socket with its own bounded send queue and sender task.
+
+    When the client cannot keep up, the oldest queued message is dropped so the
+    client always catches up to the newest state."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, send_timeout: float):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.queue: asyncio.Queue[Message] = asyncio.Queue(maxsize=max_queue)
+        self.sender: asyncio.Task | None = None
+
+    def enqueue(self, message: Message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            DASHBOARD_DROPPED.inc()
+        self.queue.put_nowait(message)
+
+    async def send_forever(self):
+        while True:
+            text, binary = await self.queue.get()
+            async with asyncio.timeout(self.send_timeout):
+                await self.websocket.send_text(text)
+                if binary is not None:
+                    await self.websocket.send_bytes(binary)
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+    def __init__(self, max_queue: int = 4, send_timeout: float = 5.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self.max_queue, self.send_timeout)
+        client.sender = asyncio.create_task(self._serve(client))
+        self.active_connections[websocket] = client
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is None:
+            return
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        logger.info(
+            f"Dashboard client disconnected ({client.dropped} messages dropped)"
+        )
+
+    async def broadcast(self, message: dict, image: bytes | None = None):
+        """Serialises the message once and queues it for every client.
+
+        The optional image is sent as a binary frame right after the JSON one,
+        instead of being base64 encoded inside it. Never waits for slow clients."""
+        if not self.active_connections:
+            return
+        with stage("broadcast"):
+            if image is not None:
+                message = {**message, "has_image": True}
+            frame = (json.dumps(message), image)
+            for client in list(self.active_connections.values()):
+                client.enqueue(frame)
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_text(json.dumps(message))
+    async def _serve(self, client: ClientConnection):
+        try:
+            await client.send_forever()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Dropping dashboard client after failed send: {e!r}")
+        self.disconnect(client.websocket)
+        with contextlib.suppress(Exception):
+            await client.websocket.close()
 
 
 ws_manager = ConnectionManager()
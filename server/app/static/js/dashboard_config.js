@@ -23,6 +23,41 @@ input.addEventListener("change", () => {
     slider.value = val.toFixed(2);
     update_conf_threshold(val.toFixed(2));
 });
+// class filter and max detections
+const classesInput = document.getElementById("classes-input");
+const excludeClassesInput = document.getElementById("exclude-classes-input");
+const maxDetectionsInput = document.getElementById("max-detections-input");
+const changeFilterButton = document.getElementById("change-filter");
+
+function parseClassList(value) {
+    return value.split(",").map(c => c.trim()).filter(c => c.length > 0);
+}
+
+changeFilterButton.addEventListener("click", async () => {
+    const classes = parseClassList(classesInput.value);
+    const maxDetections = parseInt(maxDetectionsInput.value);
+    try {
+        const res = await fetch("/api/config/filter", {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({
+                classes: classes.length > 0 ? classes : null,
+                exclude_classes: parseClassList(excludeClassesInput.value),
+                max_detections: isNaN(maxDetections) ? null : maxDetections
+            })
+        });
+        const data = await res.json();
+        if (data.ok) {
+            showStatusMessage("Class filter updated");
+        } else {
+            showStatusMessage(`Failed to update class filter: ${data.error}`, false);
+        }
+    } catch(err) {
+        console.error("Error updating class filter:", err);
+        showStatusMessage("Error updating class filter", false);
+    }
+});
+
 const modelSelect = document.getElementById("model-select");
 const changeModelButton = document.getElementById("change-model");
 
@@ -55,9 +90,9 @@ changeModelButton.addEventListener("click", async () => {
             body: JSON.stringify({model: selectedModel})
         });
         const data = await res.json();
-        // this will pop up window, maybe add progress bar?
+        // the switch runs in the background, progress arrives as model_status events
         if (data.ok) {
-            showStatusMessage(`Model changed to: ${data.selected_model}`);
+            showStatusMessage(`Switching model to: ${data.selected_model}`);
         } else {
             showStatusMessage(`Failed to change model: ${data.error}`, false);
         }
@@ -86,6 +121,8 @@ changeLanguageButton.addEventListener("click", async () => {
         const data = await res.json();
         if (data.ok) {
             showStatusMessage(`Language changed to: ${data.language}`);
+        } else if (data.pending) {
+            showStatusMessage(data.error);
         } else {
             showStatusMessage(`Failed to change language: ${data.error || "unknown error"}`, false);
         }
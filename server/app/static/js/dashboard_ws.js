@@ -2,8 +2,35 @@ const ws = new WebSocket(`ws://${location.host}/dashboard/events`);
 
 const detectionsContainer = document.getElementById("detections-content");
 const annotatedImage = document.getElementById("annotated-image");
+let annotatedImageUrl = null;
+
+function displayAnnotatedImage(blob) {
+    // annotated JPEG arrives as a binary frame right after its detection message
+    if (annotatedImageUrl) URL.revokeObjectURL(annotatedImageUrl);
+    annotatedImageUrl = URL.createObjectURL(blob);
+    annotatedImage.src = annotatedImageUrl;
+}
+
+const MODEL_STATES = {
+    loading: "Loading model",
+    warming_up: "Warming up model",
+    ready: "Model changed to",
+    failed: "Failed to change model to",
+};
+
+function displayModelStatus(status) {
+    const text = `${MODEL_STATES[status.state] || status.state}: ${status.model}`;
+    showStatusMessage(
+        status.error ? `${text} (${status.error})` : text,
+        status.state !== "failed"
+    );
+}
 
 ws.onmessage = function(event) {
+    if (event.data instanceof Blob) {
+        displayAnnotatedImage(event.data);
+        return;
+    }
     const data = JSON.parse(event.data);
 
     if (data.type === "sentence") {
@@ -11,6 +38,11 @@ ws.onmessage = function(event) {
         return;
     }
 
+    if (data.type === "model_status") {
+        displayModelStatus(data);
+        return;
+    }
+
     // Clear previous data
     detectionsContainer.innerHTML = "";
     if (data.objects && data.objects.length > 0) {
@@ -32,12 +64,4 @@ ws.onmessage = function(event) {
     } else {
         detectionsContainer.innerHTML = `<p class="text-gray-500">No objects detected</p>`;
     }
-    // image
-    if (data.image) {
-        annotatedImage.src = `data:image/jpeg;base64,${data.image}`;
-        //annotatedImage.classList.remove("hidden");
-    }
-    //else {
-    //    annotatedImage.classList.add("hidden");
-    //}
 };
@@ -0,0 +1,98 @@
+"""Inference latency of one .pt model under each acceleration option.
+
+Every variant is a "+" joined list of options applied on top of the server
+settings: fp16, bf16, compile[=mode], channels_last, threads=N. The variant is
+validated like at server startup (an unsupported one is reported and skipped),
+loaded, warmed up and timed on identical frames. The detection count column
+is a quick check that reduced precision still finds what fp32 finds.
+
+Run from the server directory:
+    python -m benchmarks.acceleration yolov8n.pt fp32 bf16 channels_last threads=4
+    python -m benchmarks.acceleration yolov8n.pt fp32 fp16 compile fp16+compile
+"""
+
+import argparse
+from pathlib import Path
+import time
+
+import numpy as np
+import torch
+
+from app.models.detection_settings import DetectionOptions
+from app.models.detection_settings import YOLOSettings
+from app.services.acceleration import validate
+from app.services.detection import DetectionService
+from benchmarks.backends import load_frames
+
+
+def parse_variant(spec: str) -> dict:
+    """Settings updates of a variant, e.g. "bf16+threads=4"."""
+    update = {}
+    for option in spec.split("+"):
+        name, _, value = option.partition("=")
+        if name in ("fp32", "fp16", "bf16"):
+            update["precision"] = name
+        elif name == "compile":
+            update["compile"] = value or True
+        elif name == "channels_last":
+            update["channels_last"] = True
+        elif name == "threads":
+            update["torch_threads"] = int(value)
+        else:
+            raise SystemExit(f"Unknown option {option!r} in {spec!r}")
+    return update
+
+
+def run(service: DetectionService, model, frames, predict_args: dict):
+    """Per-image latencies in milliseconds and detection counts."""
+    times, counts = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        (data,) = service.predict_arrays(model, [frame.bgr], predict_args)
+        times.append((time.perf_counter() - start) * 1000)
+        counts.append(len(data))
+    return np.array(times), np.array(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model", help=".pt model in detection_models/")
+    parser.add_argument(
+        "variants", nargs="+", help="fp32, fp16, bf16, compile, channels_last..."
+    )
+    parser.add_argument("--images", type=Path, help="directory of .jpg/.png frames")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    args = parser.parse_args()
+
+    base = YOLOSettings(model_name=args.model, workers=0, result_cache_size=0)
+    frames = load_frames(args.images, args.count)
+    # thread count is process wide, variants without threads= use the default
+    default_threads = torch.get_num_threads()
+    print(f"{len(frames)} frames, imgsz {base.imgsz}, {base.device_actual}")
+    print(f"{'variant':<24}{'p50 ms':>10}{'p95 ms':>10}{'img/s':>10}{'detections':>12}")
+    for spec in args.variants:
+        settings = base.model_copy(update=parse_variant(spec))
+        try:
+            validate(settings, settings.device_actual)
+        except ValueError as e:
+            print(f"{spec:<24}skipped: {e}")
+            continue
+        torch.set_num_threads(settings.torch_threads or default_threads)
+        service = DetectionService(settings)
+        model = service.load_model(args.model)
+        names = model.names
+        predict_args = service.predict_args(
+            DetectionOptions(), names, service.label_table(args.model, names)
+        )
+        run(service, model, frames[: args.warmup], predict_args)
+        times, counts = run(service, model, frames, predict_args)
+        print(
+            f"{spec:<24}{np.percentile(times, 50):>10.1f}"
+            f"{np.percentile(times, 95):>10.1f}{1000 / times.mean():>10.1f}"
+            f"{counts.mean():>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Inference latency of one model across exported backends, on the same images.
+
+Each backend is exported (or taken from the cache next to the model), warmed up
+and timed on identical frames. The detection count column is a quick sanity check
+that quantised backends still find roughly what the .pt model finds.
+
+Run from the server directory:
+    python -m benchmarks.backends yolov8n.pt pytorch onnx onnx-int8 openvino-int8
+    python -m benchmarks.backends yolov8n.pt pytorch torchscript --images ~/frames
+"""
+
+import argparse
+from pathlib import Path
+import time
+
+import numpy as np
+
+from app.models.detection_settings import YOLOSettings
+from app.services.export import export_model
+from app.services.export import load_yolo
+from app.services.export import parse_backend
+from app.services.frames import DecodedFrame
+from benchmarks.decode import make_jpeg
+
+
+def load_frames(images: Path | None, count: int) -> list[DecodedFrame]:
+    if images is None:
+        return [DecodedFrame.from_bytes(make_jpeg(640, 480)) for _ in range(count)]
+    paths = sorted(p for p in images.iterdir() if p.suffix.lower() in (".jpg", ".png"))
+    return [DecodedFrame.from_bytes(p.read_bytes()) for p in paths[:count]]
+
+
+def model_path(settings: YOLOSettings, model_name: str, spec: str) -> Path:
+    models_dir = settings.model_path.parent
+    if spec == "pytorch":
+        return models_dir / model_name
+    backend, precision = parse_backend(spec)
+    return export_model(
+        models_dir,
+        model_name,
+        backend,
+        precision,
+        imgsz=settings.imgsz,
+        device=settings.device_actual,
+        batch=settings.max_batch_size,
+        data=settings.export_calibration_data,
+    )
+
+
+def run(model, frames: list[DecodedFrame], settings: YOLOSettings, conf: float):
+    """Per-image latencies in milliseconds and detection counts."""
+    times, counts = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        (r,) = model.predict(
+            frame.bgr,
+            device=settings.device_actual,
+            imgsz=settings.imgsz,
+            conf=conf,
+            verbose=False,
+        )
+        times.append((time.perf_counter() - start) * 1000)
+        counts.append(len(r.boxes))
+    return np.array(times), np.array(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "model", help="model file in detection_models/, e.g. yolov8n.pt"
+    )
+    parser.add_argument(
+        "backends",
+        nargs="+",
+        help="pytorch, onnx, openvino or torchscript, optionally with -fp16/-int8",
+    )
+    parser.add_argument("--images", type=Path, help="directory of .jpg/.png frames")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--conf", type=float, default=0.25)
+    args = parser.parse_args()
+
+    settings = YOLOSettings()
+    frames = load_frames(args.images, args.count)
+    print(f"{len(frames)} frames, imgsz {settings.imgsz}, {settings.device_actual}")
+    print(f"{'backend':<18}{'p50 ms':>10}{'p95 ms':>10}{'img/s':>10}{'detections':>12}")
+    for spec in args.backends:
+        model = load_yolo(model_path(settings, args.model, spec))
+        run(model, frames[: args.warmup], settings, args.conf)
+        times, counts = run(model, frames, settings, args.conf)
+        print(
+            f"{spec:<18}{np.percentile(times, 50):>10.1f}"
+            f"{np.percentile(times, 95):>10.1f}{1000 / times.mean():>10.1f}"
+            f"{counts.mean():>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
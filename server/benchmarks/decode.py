@@ -0,0 +1,74 @@
+"""Decode cost of a detect request, before and after the shared DecodedFrame.
+
+Before, /api/detect decoded the upload once for inference and once more for
+annotation. Now the frame is decoded once and annotation copies the decoded view.
+
+Run from the server directory: python -m benchmarks.decode
+"""
+
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.services.frames import DecodedFrame
+
+RESOLUTIONS = {"640x480": (640, 480), "1080p": (1920, 1080)}
+
+
+def make_jpeg(width: int, height: int, quality: int = 90, seed: int = 0) -> bytes:
+    """Noisy gradient, so the JPEG is not trivially compressible."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 20, base.shape), 0, 255).astype(np.uint8)
+    buffered = io.BytesIO()
+    Image.fromarray(pixels).save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+def timeit(fn, repeats: int) -> float:
+    """Median wall time of fn in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def old_path(img_bytes: bytes):
+    # inference decode + annotation decode
+    Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    Image.open(io.BytesIO(img_bytes)).convert("RGB")
+
+
+def new_path(img_bytes: bytes):
+    frame = DecodedFrame.from_bytes(img_bytes)
+    _ = frame.bgr
+    frame.pil.copy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'input':<10}{'jpeg KB':>10}{'before ms':>12}{'after ms':>12}{'saved ms':>12}"
+    )
+    for name, (width, height) in RESOLUTIONS.items():
+        img_bytes = make_jpeg(width, height)
+        before = timeit(lambda b=img_bytes: old_path(b), args.repeats)
+        after = timeit(lambda b=img_bytes: new_path(b), args.repeats)
+        print(
+            f"{name:<10}{len(img_bytes) / 1024:>10.0f}{before:>12.2f}"
+            f"{after:>12.2f}{before - after:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
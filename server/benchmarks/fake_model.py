@@ -0,0 +1,69 @@
+"""Stand-in for an ultralytics model, so benchmarks run without weights or a GPU.
+
+predict sleeps for a fixed per-batch plus per-image time (sleeping releases the
+GIL like a real GPU call) and returns deterministic random COCO boxes, honouring
+conf, classes and max_det like the real predictor.
+"""
+
+import time
+import zlib
+
+import numpy as np
+import torch
+from ultralytics.utils import ROOT
+import yaml
+
+from app.services.detection import DetectionService
+
+
+class FakeBoxes:
+    def __init__(self, data: torch.Tensor):
+        self.data = data
+
+
+class FakeResult:
+    def __init__(self, data: torch.Tensor):
+        self.boxes = FakeBoxes(data)
+
+
+class FakeModel:
+    def __init__(self, batch_ms: float = 20.0, image_ms: float = 5.0, boxes: int = 12):
+        self.batch_ms = batch_ms
+        self.image_ms = image_ms
+        self.boxes = boxes
+        with open(ROOT / "cfg" / "datasets" / "coco.yaml") as f:
+            self.names = yaml.safe_load(f)["names"]
+
+    def predict(self, imgs, conf=0.25, classes=None, max_det=300, **kwargs):
+        time.sleep((self.batch_ms + self.image_ms * len(imgs)) / 1000)
+        return [self._result(img, conf, classes, max_det) for img in imgs]
+
+    def _result(self, img: np.ndarray, conf, classes, max_det) -> FakeResult:
+        # same image, same boxes, so cache and tracking behave like with a real model
+        rng = np.random.default_rng(zlib.crc32(img[::16, ::16].tobytes()))
+        height, width = img.shape[:2]
+        xy = rng.uniform(0, 1, (self.boxes, 2)) * [width, height]
+        wh = rng.uniform(0.05, 0.4, (self.boxes, 2)) * [width, height]
+        boxes = np.concatenate([xy, np.minimum(xy + wh, [width, height])], axis=1)
+        confidences = rng.uniform(0, 1, self.boxes)
+        class_ids = rng.integers(0, len(self.names), self.boxes)
+        keep = confidences > conf
+        if classes is not None:
+            keep &= np.isin(class_ids, classes)
+        order = np.argsort(-confidences[keep])[:max_det]
+        data = np.column_stack(
+            [boxes[keep], confidences[keep], class_ids[keep]]
+        ).astype(np.float32)[order]
+        return FakeResult(torch.from_numpy(data))
+
+
+def install(batch_ms: float = 20.0, image_ms: float = 5.0):
+    """Makes every DetectionService load a FakeModel instead of real weights.
+
+    Call before app.main is imported, the detect routes create their service on
+    import."""
+
+    def load_fake_model(service: DetectionService, model_name: str) -> FakeModel:
+        return FakeModel(batch_ms=batch_ms, image_ms=image_ms)
+
+    DetectionService.load_model = load_fake_model
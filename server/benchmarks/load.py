@@ -0,0 +1,360 @@
+"""Load generator and latency benchmark for the detect API.
+
+Replays a directory of images (or synthetic frames) at a given concurrency and
+optional request rate, either against /api/detect (in-process or on a running
+server given by --url) or against DetectionService directly, where every request
+is split into decode, predict, post-process, annotate and broadcast stages. In
+api mode the stages come from the server's Server-Timing response header.
+--fake swaps the model for benchmarks.fake_model, so it runs without a GPU.
+--json writes the results for comparing commits and models.
+
+Run from the server directory:
+    pepper-bench --mode service --fake --concurrency 8 --requests 200
+    python -m benchmarks --mode api --fake --rate 50 --json before.json
+    python -m benchmarks --mode api --url http://gpu-box:8000 --images ~/frames
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from collections.abc import Awaitable
+from collections.abc import Callable
+import json
+import logging
+import os
+from pathlib import Path
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.decode import make_jpeg
+
+STAGES = (
+    "decode",
+    "queue",
+    "inference",
+    "cache_lookup",
+    "predict",
+    "postprocess",
+    "track",
+    "serialize",
+    "annotate",
+    "broadcast",
+)
+
+
+def load_images(images: Path | None, distinct: int) -> list[bytes]:
+    if images is None:
+        return [make_jpeg(640, 480, seed=seed) for seed in range(distinct)]
+    paths = sorted(p for p in images.iterdir() if p.suffix.lower() in (".jpg", ".png"))
+    if not paths:
+        raise SystemExit(f"No .jpg/.png images in {images}")
+    return [p.read_bytes() for p in paths]
+
+
+def summarize(values_ms: list[float]) -> dict:
+    if not values_ms:
+        return {}
+    values = np.asarray(values_ms)
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """{stage: ms} from a Server-Timing header, e.g. "decode;dur=1.20, total;dur=9.8"."""
+    timings = {}
+    for entry in header.split(","):
+        name, *params = (part.strip() for part in entry.split(";"))
+        for param in params:
+            if param.startswith("dur=") and name in STAGES:
+                timings[name] = float(param[4:])
+    return timings
+
+
+class StageTimer:
+    """Milliseconds spent in each stage, measured between consecutive marks."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.timings[stage] = (now - self._last) * 1000
+        self._last = now
+
+
+class NullWebSocket:
+    """Dashboard client that accepts everything, so broadcast does real work."""
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        pass
+
+    async def send_bytes(self, data: bytes):
+        pass
+
+    async def close(self):
+        pass
+
+
+async def drive(
+    request: Callable[[bytes], Awaitable[dict[str, float]]],
+    images: list[bytes],
+    total: int,
+    concurrency: int,
+    rate: float,
+) -> tuple[list[float], dict[str, list[float]], int, float]:
+    """Sends `total` requests, at most `concurrency` in flight.
+
+    With `rate` > 0 requests start on a fixed schedule (open loop), otherwise
+    each finished request starts the next one (closed loop). Returns latencies,
+    stage timings, error count and elapsed seconds."""
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    stages: dict[str, list[float]] = defaultdict(list)
+    errors = 0
+
+    async def one(img_bytes: bytes):
+        nonlocal errors
+        try:
+            start = time.perf_counter()
+            timings = await request(img_bytes)
+            latencies.append((time.perf_counter() - start) * 1000)
+            for stage, ms in timings.items():
+                stages[stage].append(ms)
+        except Exception as e:
+            errors += 1
+            print(f"request failed: {e!r}")
+        finally:
+            slots.release()
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(total):
+        if rate > 0:
+            await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+        await slots.acquire()
+        tasks.append(asyncio.create_task(one(images[i % len(images)])))
+    await asyncio.gather(*tasks)
+    return latencies, stages, errors, time.perf_counter() - start
+
+
+async def run_api(args, images: list[bytes]):
+    import httpx
+
+    form = {"model": args.model} if args.model else {}
+
+    async def request(client: httpx.AsyncClient, img_bytes: bytes) -> dict:
+        files = {"image": ("frame.jpg", img_bytes, "image/jpeg")}
+        response = await client.post("/api/detect", files=files, data=form)
+        response.raise_for_status()
+        body = response.json()
+        if "error" in body:
+            raise RuntimeError(body)
+        return parse_server_timing(response.headers.get("server-timing", ""))
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await drive(
+                lambda b: request(client, b),
+                images,
+                args.requests,
+                args.concurrency,
+                args.rate,
+            )
+
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=60
+        ) as client,
+    ):
+        return await drive(
+            lambda b: request(client, b),
+            images,
+            args.requests,
+            args.concurrency,
+            args.rate,
+        )
+
+
+async def run_service(args, images: list[bytes]):
+    from fastapi.concurrency import run_in_threadpool
+
+    from app.models.detection_settings import DetectionOptions
+    from app.models.detection_settings import YOLOSettings
+    from app.services.annotation import annotate_image
+    from app.services.annotation import get_color_encoding
+    from app.services.detection import DetectionService
+    from app.services.frames import DecodedFrame
+    from app.services.ws_manager import ConnectionManager
+
+    settings = YOLOSettings(result_cache_size=0, workers=0)
+    if args.model:
+        settings = settings.model_copy(update={"model_name": args.model})
+    service = DetectionService(settings)
+    await service.start()
+    model_name = service.model_name
+    manager = ConnectionManager()
+    await manager.connect(NullWebSocket())
+    options = DetectionOptions()
+    # the predictor is not thread safe, the server serialises it via the scheduler
+    predict_lock = threading.Lock()
+
+    def predict(model, frame: DecodedFrame, predict_args: dict):
+        with predict_lock:
+            return service.predict_arrays(model, [frame.bgr], predict_args)[0]
+
+    async def request(img_bytes: bytes) -> dict:
+        timer = StageTimer()
+        frame = await run_in_threadpool(DecodedFrame.from_bytes, img_bytes)
+        timer.mark("decode")
+
+        model = service.pool.get(model_name)
+        labels = service.label_table(model_name, model.names)
+        predict_args = service.predict_args(options, model.names, labels)
+        data = await run_in_threadpool(predict, model, frame, predict_args)
+        timer.mark("predict")
+
+        detections = service._to_detections(data, labels)
+        detections.to_json()
+        timer.mark("postprocess")
+
+        objects = detections.to_objects()
+        colors = get_color_encoding(objects)
+        jpeg = await run_in_threadpool(annotate_image, frame, objects, colors)
+        timer.mark("annotate")
+
+        message = {"type": "detection", "objects": objects, "colors": colors}
+        await manager.broadcast(message, image=jpeg)
+        timer.mark("broadcast")
+        return timer.timings
+
+    try:
+        return await drive(request, images, args.requests, args.concurrency, args.rate)
+    finally:
+        for websocket in list(manager.active_connections):
+            manager.disconnect(websocket)
+        service.close()
+
+
+def report(args, latencies, stages, errors, elapsed) -> dict:
+    return {
+        "commit": git_commit(),
+        "mode": args.mode,
+        "target": args.url or "in-process",
+        "model": args.model or os.environ.get("PEPPER_MODEL_NAME", "default"),
+        "fake_model": args.fake,
+        "images": str(args.images) if args.images else "synthetic",
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "requests": args.requests,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {
+            stage: summarize(stages[stage]) for stage in STAGES if stage in stages
+        },
+    }
+
+
+def print_report(result: dict):
+    print(
+        f"{result['mode']} {result['target']} model={result['model']} "
+        f"fake={result['fake_model']} concurrency={result['concurrency']} "
+        f"rate={result['rate'] or 'max'}"
+    )
+    print(
+        f"{result['requests']} requests, {result['errors']} errors in "
+        f"{result['elapsed_s']:.2f}s -> {result['throughput_rps']:.1f} req/s"
+    )
+    print(f"{'':<14}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    rows = {"latency": result["latency_ms"], **result["stages_ms"]}
+    for name, stats in rows.items():
+        if stats:
+            print(
+                f"{name:<14}"
+                + "".join(f"{stats[k]:>9.1f}" for k in ("mean", "p50", "p95", "p99"))
+                + f"{stats['max']:>9.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("api", "service"), default="api")
+    parser.add_argument("--url", help="running server, e.g. http://localhost:8000")
+    parser.add_argument("--images", type=Path, help="directory of .jpg/.png frames")
+    parser.add_argument(
+        "--distinct", type=int, default=16, help="synthetic frames without --images"
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="requests per second, 0 = closed loop"
+    )
+    parser.add_argument("--model", help="model name, default model otherwise")
+    parser.add_argument("--fake", action="store_true", help="use the fake model")
+    parser.add_argument("--fake-batch-ms", type=float, default=20.0)
+    parser.add_argument("--fake-image-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--cache", action="store_true", help="keep the result cache enabled"
+    )
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep server logs")
+    args = parser.parse_args()
+
+    if args.url and args.mode == "service":
+        parser.error("--url only works with --mode api")
+    if not args.url:
+        # in-process server, configured before app modules are imported
+        if args.fake:
+            # workers load real weights in their own processes
+            os.environ["PEPPER_WORKERS"] = "0"
+        if not args.cache:
+            os.environ["PEPPER_RESULT_CACHE_SIZE"] = "0"
+        if args.fake:
+            from benchmarks import fake_model
+
+            fake_model.install(args.fake_batch_ms, args.fake_image_ms)
+
+    images = load_images(args.images, args.distinct)
+    if not args.verbose:
+        # app.main configures INFO logging on import, per-request lines drown the report
+        logging.disable(logging.INFO)
+    run = run_api if args.mode == "api" else run_service
+    latencies, stages, errors, elapsed = asyncio.run(run(args, images))
+    result = report(args, latencies, stages, errors, elapsed)
+    print_report(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
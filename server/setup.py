@@ -9,5 +9,6 @@ setup(
     version="0.1.0",
     packages=find_packages(),
     install_requires=requirements,
+    entry_points={"console_scripts": ["pepper-bench=benchmarks.load:main"]},
     python_requires=">=3.12",
 )
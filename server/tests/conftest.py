@@ -0,0 +1,42 @@
+from benchmarks.fake_model import FakeModel
+import numpy as np
+import pytest
+
+from app.models.detection_settings import YOLOSettings
+from app.services.detection import DetectionService
+from app.services.frames import DecodedFrame
+from app.services.translation import create_translator
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path) -> DetectionService:
+    """DetectionService serving FakeModel, no weights and no sleeping. Caches
+    and offline dictionaries (translations/<language>.json) live in tmp_path."""
+    monkeypatch.setattr(
+        DetectionService,
+        "load_model",
+        lambda self, model_name: FakeModel(batch_ms=0, image_ms=0),
+    )
+    settings = YOLOSettings(
+        model_name="fake.pt",
+        device="cpu",
+        workers=0,
+        warmup_runs=0,
+        translation_backends=["dictionary"],
+    )
+    service = DetectionService(settings)
+    service.models_dir = tmp_path
+    service.translator = create_translator(settings, tmp_path)
+    return service
+
+
+@pytest.fixture
+def make_frame():
+    """Random RGB frame, equal seeds give equal frames."""
+
+    def make(seed: int, width: int = 64, height: int = 48) -> DecodedFrame:
+        rng = np.random.default_rng(seed)
+        rgb = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        return DecodedFrame(rgb=rgb)
+
+    return make
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+import torch
+
+from app.models.detection_settings import YOLOSettings
+from app.services.acceleration import prepare_model
+
+
+def test_channels_last_converts_weights_and_input():
+    model = SimpleNamespace(model=torch.nn.Sequential(torch.nn.Conv2d(3, 4, 3)))
+    prepare_model(model, YOLOSettings(channels_last=True))
+    conv = model.model[0]
+    assert conv.weight.is_contiguous(memory_format=torch.channels_last)
+    seen = []
+    conv.register_forward_pre_hook(lambda module, args: seen.append(args[0]))
+    model.model(torch.zeros(2, 3, 8, 8))
+    assert seen[0].is_contiguous(memory_format=torch.channels_last)
+
+
+def test_default_layout_is_left_alone():
+    model = SimpleNamespace(model=torch.nn.Sequential(torch.nn.Conv2d(3, 4, 3)))
+    prepare_model(model, YOLOSettings())
+    seen = []
+    model.model[0].register_forward_pre_hook(lambda module, args: seen.append(args[0]))
+    model.model(torch.zeros(2, 3, 8, 8))
+    assert not seen[0].is_contiguous(memory_format=torch.channels_last)
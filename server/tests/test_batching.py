@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.models.detection_settings import DetectionOptions
+from app.services.batching import BatchScheduler
+
+
+class Recorder:
+    """detect_batch stand-in remembering the batches it was called with."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, frames, model_name, options):
+        self.batches.append((list(frames), model_name, options))
+        return [f"{frame}@{model_name}" for frame in frames]
+
+
+async def submit_all(scheduler: BatchScheduler, jobs: list[tuple]) -> list:
+    try:
+        return await asyncio.gather(*(scheduler.submit(*job) for job in jobs))
+    finally:
+        await scheduler.stop()
+
+
+def test_concurrent_requests_share_a_batch():
+    recorder = Recorder()
+    scheduler = BatchScheduler(recorder, max_batch_size=8, max_wait_ms=20)
+    results = asyncio.run(submit_all(scheduler, [(f"f{i}",) for i in range(5)]))
+    assert results == [f"f{i}@None" for i in range(5)]
+    assert [len(frames) for frames, *_ in recorder.batches] == [5]
+
+
+def test_batches_are_split_by_size_and_group():
+    recorder = Recorder()
+    scheduler = BatchScheduler(recorder, max_batch_size=2, max_wait_ms=20)
+    fast = DetectionOptions(imgsz=320)
+    jobs = [("a", "m1"), ("b", "m1"), ("c", "m1"), ("d", "m2"), ("e", "m1", fast)]
+    results = asyncio.run(submit_all(scheduler, jobs))
+    assert results == ["a@m1", "b@m1", "c@m1", "d@m2", "e@m1"]
+    batches = sorted(
+        (frames, model_name, options)
+        for frames, model_name, options in recorder.batches
+    )
+    # the first batch of two holds a and b, c waits for the next one
+    assert batches == [
+        (["a", "b"], "m1", None),
+        (["c"], "m1", None),
+        (["d"], "m2", None),
+        (["e"], "m1", fast),
+    ]
+
+
+def test_weighted_fair_order_across_clients():
+    recorder = Recorder()
+    # one frame per batch, so the batches show the dispatch order
+    scheduler = BatchScheduler(recorder, max_batch_size=1, max_wait_ms=0)
+    flood = [(f"a{i}", None, None, "a", 1.0) for i in range(6)]
+    heavy = [(f"b{i}", None, None, "b", 2.0) for i in range(6)]
+    asyncio.run(submit_all(scheduler, flood + heavy))
+    order = [frames[0] for frames, *_ in recorder.batches]
+    # b has twice the weight, it gets two frames for every one of a
+    assert order[:9] == ["b0", "a0", "b1", "b2", "a1", "b3", "b4", "a2", "b5"]
+
+
+def test_failed_batch_fails_its_requests():
+    def failing(frames, model_name, options):
+        raise RuntimeError("boom")
+
+    scheduler = BatchScheduler(failing, max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(submit_all(scheduler, [("f",)]))
+
+
+def test_batch_returns_one_result_per_frame(service, make_frame):
+    frames = [make_frame(i) for i in range(3)]
+    results = service.detect_batch(frames, options=DetectionOptions())
+    assert len(results) == 3
+    names = service.pool.get(service.model_name).names
+    for result in results:
+        assert (result.confidences > 0.25).all()
+        assert result.labels.tolist() == [names[c] for c in result.class_ids.tolist()]
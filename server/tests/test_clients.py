@@ -0,0 +1,70 @@
+import pytest
+
+from app.services import clients
+from app.services.clients import ClientRegistry
+from app.services.clients import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(clients.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_allows_a_burst_then_the_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3.0)
+    assert [bucket.allow() for _ in range(4)] == [True, True, True, False]
+    clock[0] += 0.5
+    assert bucket.allow()
+    assert not bucket.allow()
+    clock[0] += 10
+    # refills up to the burst only
+    assert [bucket.allow() for _ in range(4)] == [True, True, True, False]
+
+
+def test_zero_rate_is_unlimited(clock):
+    bucket = TokenBucket(rate=0.0, burst=1.0)
+    assert all(bucket.allow() for _ in range(100))
+
+
+def test_rate_limited_frames_are_counted(clock):
+    registry = ClientRegistry(rate_limit=1.0, burst=1.0)
+    client = registry.get("robot")
+    assert client.admit()
+    assert not client.admit()
+    assert client.stats["rate_limited"] == 1
+
+
+def test_configured_clients_are_never_evicted(clock):
+    registry = ClientRegistry(max_clients=2)
+    registry.configure("robot", {"language": "cs"})
+    for i in range(5):
+        registry.get(f"anonymous-{i}")
+    assert registry.find("robot").config == {"language": "cs"}
+    assert registry.find("anonymous-3") is None
+    assert len(registry) == 2
+
+
+def test_idle_clients_without_config_expire(clock):
+    registry = ClientRegistry(ttl_s=60)
+    registry.get("idle")
+    registry.configure("robot", {"weight": 2.0})
+    clock[0] += 61
+    registry.get("other")
+    assert registry.find("idle") is None
+    assert registry.find("robot").weight == 2.0
+
+
+def test_find_has_no_side_effects(clock):
+    registry = ClientRegistry()
+    assert registry.find("ghost") is None
+    assert len(registry) == 0
+
+
+def test_none_restores_the_default(clock):
+    registry = ClientRegistry(rate_limit=0.0)
+    registry.configure("robot", {"rate_limit": 1.0, "mode": "fast"})
+    client = registry.configure("robot", {"rate_limit": None})
+    assert client.config == {"mode": "fast"}
+    assert all(client.admit() for _ in range(20))
@@ -0,0 +1,33 @@
+import pytest
+
+from app.models.detection_settings import DetectionOptions
+from app.services.detection import UnknownClassesError
+
+
+def test_filters_run_inside_the_model(service, make_frame):
+    options = DetectionOptions(
+        confidence_threshold=0.1, classes=("person", "2"), max_detections=2
+    )
+    for result in service.detect_batch(
+        [make_frame(i) for i in range(5)], None, options
+    ):
+        assert len(result) <= 2
+        assert set(result.class_ids.tolist()) <= {0, 2}
+        assert (result.confidences > 0.1).all()
+
+
+def test_excluded_classes_are_dropped(service, make_frame):
+    frame = make_frame(0)
+    everything = service.detect(frame, options=DetectionOptions(confidence_threshold=0))
+    excluded = int(everything.class_ids[0])
+    options = DetectionOptions(confidence_threshold=0, exclude_classes=(str(excluded),))
+    result = service.detect(make_frame(0), options=options)
+    assert excluded not in result.class_ids.tolist()
+    assert len(result) == (everything.class_ids != excluded).sum()
+
+
+def test_unknown_classes_are_rejected(service, make_frame):
+    options = DetectionOptions(classes=("person", "persn"), exclude_classes=("cat",))
+    with pytest.raises(UnknownClassesError) as error:
+        service.detect(make_frame(0), options=options)
+    assert error.value.classes == ["persn"]
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from app.services.labels import build_catalogue
+from app.services.labels import load_catalogue
+from app.services.labels import save_catalogue
+
+NAMES = {0: "person", 1: "cup", 2: "dining table"}
+
+
+def test_catalogue_is_indexed_by_class_id():
+    catalogue = build_catalogue(NAMES, {"cup": "hrnek", "person": "osoba"})
+    assert catalogue.tolist() == ["osoba", "hrnek", "dining table"]
+    assert catalogue[[2, 1, 1]].tolist() == ["dining table", "hrnek", "hrnek"]
+
+
+def test_saved_catalogue_loads_back(tmp_path):
+    path = tmp_path / "labels" / "m.pt.cs.txt"
+    catalogue = build_catalogue(NAMES, {"dining table": "jídelní stůl"})
+    save_catalogue(path, NAMES, catalogue)
+    assert load_catalogue(path, NAMES).tolist() == catalogue.tolist()
+
+
+def test_missing_catalogue_loads_as_none(tmp_path):
+    assert load_catalogue(tmp_path / "m.pt.cs.txt", NAMES) is None
+
+
+def test_catalogue_of_other_class_names_is_stale(tmp_path):
+    path = tmp_path / "m.pt.cs.txt"
+    save_catalogue(path, NAMES, build_catalogue(NAMES, {}))
+    renamed = {**NAMES, 1: "mug"}
+    assert load_catalogue(path, renamed) is None
+    assert load_catalogue(path, {0: "person", 1: "cup"}) is None
+
+
+def test_relabel_uses_the_catalogue_of_the_language(service, make_frame):
+    names = service.pool.get(service.model_name).names
+    dictionaries = service.models_dir / "translations"
+    dictionaries.mkdir()
+    translations = {name: name.upper() for name in names.values()}
+    (dictionaries / "cs.json").write_text(json.dumps(translations))
+    asyncio.run(service.ensure_labels(service.model_name, "cs"))
+    detections = service.detect(make_frame(0))
+    assert len(detections)
+    relabelled = service.relabel(detections, service.model_name, "cs")
+    assert relabelled.labels.tolist() == [
+        names[c].upper() for c in detections.class_ids.tolist()
+    ]
+    assert list(service.models_dir.glob(".cache/labels/fake.pt.cs.txt"))
+
+
+def test_incomplete_catalogue_is_served_but_not_saved(service):
+    dictionaries = service.models_dir / "translations"
+    dictionaries.mkdir()
+    (dictionaries / "cs.json").write_text(json.dumps({"person": "osoba"}))
+    asyncio.run(service.ensure_labels(service.model_name, "cs"))
+    table = service.label_tables[(service.model_name, "cs")]
+    assert table[0] == "osoba"
+    assert table[1] == "bicycle"
+    assert not list(service.models_dir.glob(".cache/labels/*.cs.txt"))
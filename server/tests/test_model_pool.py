@@ -0,0 +1,71 @@
+from benchmarks.fake_model import FakeModel
+import pytest
+
+from app.services import model_pool
+from app.services.model_pool import ModelPool
+
+MB = 1024**2
+
+
+@pytest.fixture
+def pool(monkeypatch) -> ModelPool:
+    """Pool of 1 MB fake models with room for two of them."""
+    monkeypatch.setattr(model_pool, "model_memory_bytes", lambda model: MB)
+    loads = []
+
+    def load(name: str) -> FakeModel:
+        loads.append(name)
+        return FakeModel(batch_ms=0, image_ms=0)
+
+    pool = ModelPool(load, active_name="a.pt", memory_budget_mb=2.5)
+    pool.loads = loads
+    return pool
+
+
+def test_loaded_model_is_reused(pool):
+    assert pool.get("b.pt") is pool.get("b.pt")
+    assert pool.loads == ["b.pt"]
+
+
+def test_least_recently_used_model_is_evicted(pool):
+    pool.get("a.pt")
+    pool.get("b.pt")
+    pool.get("c.pt")
+    assert pool.loaded == ["a.pt", "c.pt"]
+    pool.get("d.pt")
+    assert pool.loaded == ["a.pt", "d.pt"]
+    assert pool.memory_used <= pool.memory_budget
+
+
+def test_recent_use_protects_a_model(pool):
+    pool.get("b.pt")
+    pool.get("c.pt")
+    pool.get("b.pt")  # c.pt is now the least recently used
+    pool.get("d.pt")
+    assert set(pool.loaded) == {"b.pt", "d.pt"}
+
+
+def test_leased_model_is_never_evicted(pool):
+    pool.get("a.pt")
+    with pool.lease("b.pt"):
+        pool.get("c.pt")
+        pool.get("d.pt")
+        assert pool.loaded == ["a.pt", "b.pt", "d.pt"]
+    # the last user of a model over budget releases it
+    assert pool.loaded == ["a.pt", "d.pt"]
+
+
+def test_pool_may_exceed_the_budget_while_models_are_leased(pool):
+    pool.get("a.pt")
+    with pool.lease("b.pt"), pool.lease("c.pt"):
+        assert pool.memory_used > pool.memory_budget
+    assert pool.memory_used <= pool.memory_budget
+    assert pool.is_loaded("a.pt")
+
+
+def test_only_loaded_models_can_be_activated(pool):
+    with pytest.raises(KeyError):
+        pool.activate("b.pt")
+    pool.get("b.pt")
+    pool.activate("b.pt")
+    assert pool.active_name == "b.pt"
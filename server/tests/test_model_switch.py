@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+
+def test_switch_keeps_serving_the_old_model_until_warm(service, make_frame):
+    service.pool.get(service.model_name)
+    old = service.model
+    warmed = []
+    warming = threading.Event()
+
+    def warm_up(model_name):
+        warming.set()
+        time.sleep(0.05)
+        warmed.append(model_name)
+
+    service.warm_up = warm_up
+    states = []
+
+    async def progress(status):
+        # at every step some model is active and loaded
+        assert service.pool.is_loaded(service.model_name)
+        states.append((status["state"], status["active_model"]))
+
+    async def switch():
+        task = asyncio.create_task(service.reload_with_model("new.pt", progress))
+        served = 0
+        while not task.done():
+            if warming.is_set() and not warmed:
+                assert service.model_name == "fake.pt"
+                assert service.model is old
+                service.detect(make_frame(served))
+                served += 1
+            await asyncio.sleep(0.001)
+        await task
+        return served
+
+    served = asyncio.run(switch())
+    assert served > 0
+    assert warmed == ["new.pt"]
+    assert states == [
+        ("loading", "fake.pt"),
+        ("warming_up", "fake.pt"),
+        ("ready", "new.pt"),
+    ]
+    assert service.model_name == "new.pt"
+    assert service.model is not old
+    assert service.settings.model_name == "new.pt"
+
+
+def test_failed_switch_keeps_the_old_model(service):
+    service.pool.get(service.model_name)
+
+    def warm_up(model_name):
+        raise RuntimeError("out of memory")
+
+    service.warm_up = warm_up
+    with pytest.raises(RuntimeError, match="out of memory"):
+        asyncio.run(service.reload_with_model("new.pt"))
+    assert service.model_name == "fake.pt"
+    assert service.model_status["state"] == "failed"
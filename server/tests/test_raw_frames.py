@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+import lz4.frame
+import numpy as np
+import pytest
+import zstandard
+
+from app.main import app
+from app.services.frames import DecodedFrame
+
+WIDTH, HEIGHT = 8, 6
+PIXELS = np.arange(WIDTH * HEIGHT * 3, dtype=np.uint8).tobytes()
+
+
+def post_raw(body: bytes, **headers):
+    # no lifespan, the frame is rejected before the detection service is needed
+    client = TestClient(app)
+    headers = {
+        "X-Frame-Width": str(WIDTH),
+        "X-Frame-Height": str(HEIGHT),
+        **{f"X-Frame-{name.capitalize()}": value for name, value in headers.items()},
+    }
+    return client.post("/api/detect/raw", content=body, headers=headers)
+
+
+@pytest.mark.parametrize(
+    "compression, body",
+    [
+        ("lz4", lz4.frame.compress(PIXELS)),
+        ("zstd", zstandard.ZstdCompressor().compress(PIXELS)),
+    ],
+)
+def test_compressed_frame_decodes(compression, body):
+    frame = DecodedFrame.from_raw(body, WIDTH, HEIGHT, "rgb", compression)
+    assert frame.rgb.tobytes() == PIXELS
+
+
+def test_bgr_frame_is_flipped_to_rgb():
+    frame = DecodedFrame.from_raw(PIXELS, WIDTH, HEIGHT, "bgr", "none")
+    assert frame.rgb[0, 0].tolist() == [2, 1, 0]
+
+
+@pytest.mark.parametrize(
+    "body, headers",
+    [
+        (PIXELS[:-3], {}),
+        (PIXELS, {"compression": "brotli"}),
+        (PIXELS, {"colorspace": "yuv"}),
+        (b"not an lz4 frame", {"compression": "lz4"}),
+        (lz4.frame.compress(PIXELS)[:-9], {"compression": "lz4"}),
+        (b"not a zstd frame", {"compression": "zstd"}),
+        (zstandard.ZstdCompressor().compress(PIXELS[:-3]), {"compression": "zstd"}),
+    ],
+    ids=[
+        "short",
+        "unknown-compression",
+        "unknown-colorspace",
+        "corrupt-lz4",
+        "truncated-lz4",
+        "corrupt-zstd",
+        "short-zstd",
+    ],
+)
+def test_bad_raw_frame_is_rejected(body, headers):
+    response = post_raw(body, **headers)
+    assert response.status_code == 400
+    assert response.json()["error"] == "Invalid frame"
@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.resolution import ResolutionController
+
+
+def make_controller(**kwargs) -> ResolutionController:
+    return ResolutionController(
+        640, [320, 480, 800], target_queue_ms=50, adaptive=True, window=4, **kwargs
+    )
+
+
+def observe(controller: ResolutionController, queue_ms: float, count: int = 4):
+    for _ in range(count):
+        controller.observe(queue_ms / 1000)
+
+
+def test_steps_stop_at_the_full_resolution():
+    controller = make_controller()
+    assert controller.steps == [320, 480, 640]
+    assert controller.current == 640
+
+
+def test_steps_down_under_queue_load():
+    controller = make_controller()
+    observe(controller, 80, count=3)
+    assert controller.current == 640  # a window is not full yet
+    observe(controller, 80, count=1)
+    assert controller.current == 480
+    observe(controller, 80)
+    assert controller.current == 320
+    observe(controller, 80)
+    assert controller.current == 320
+
+
+def test_steps_back_up_on_recovery():
+    controller = make_controller()
+    observe(controller, 80, count=8)
+    assert controller.current == 320
+    observe(controller, 40)  # under target, above the half: hold
+    assert controller.current == 320
+    observe(controller, 10)
+    assert controller.current == 480
+    observe(controller, 10)
+    assert controller.current == 640
+    observe(controller, 10)
+    assert controller.current == 640
+
+
+def test_fixed_resolution_ignores_load():
+    controller = ResolutionController(640, [320, 480], adaptive=False, window=4)
+    observe(controller, 500)
+    assert controller.current == 640
+
+
+def test_modes_override_the_current_step():
+    controller = make_controller()
+    observe(controller, 80)
+    assert controller.for_mode(None) == controller.for_mode("auto") == 480
+    assert controller.for_mode("fast") == 320
+    assert controller.for_mode("precise") == 640
+    with pytest.raises(ValueError):
+        controller.for_mode("turbo")
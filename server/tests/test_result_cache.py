@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.models.detection_result import Detections
+from app.models.detection_settings import DetectionOptions
+from app.services import result_cache
+from app.services.result_cache import ResultCache
+
+OPTIONS = DetectionOptions()
+
+
+def detections(n: int) -> Detections:
+    return Detections(
+        boxes=np.zeros((n, 4), np.float32),
+        confidences=np.ones(n, np.float32),
+        class_ids=np.zeros(n, np.int64),
+        labels=np.array(["person"] * n, dtype=object),
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_hit_needs_same_content_and_config(make_frame):
+    cache = ResultCache()
+    frame = make_frame(0)
+    key = cache.key(frame, "m.pt", 640, "en", OPTIONS)
+    assert cache.get(key) is None
+    cache.put(key, detections(1))
+    assert len(cache.get(cache.key(make_frame(0), "m.pt", 640, "en", OPTIONS))) == 1
+    assert cache.get(cache.key(make_frame(1), "m.pt", 640, "en", OPTIONS)) is None
+    assert cache.get(cache.key(frame, "m.pt", 320, "en", OPTIONS)) is None
+    assert cache.get(cache.key(frame, "m.pt", 640, "cs", OPTIONS)) is None
+    strict = DetectionOptions(confidence_threshold=0.9)
+    assert cache.get(cache.key(frame, "m.pt", 640, "en", strict)) is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 5
+
+
+def test_entries_expire(make_frame, clock):
+    cache = ResultCache(ttl_s=5.0)
+    key = cache.key(make_frame(0), "m.pt", 640, "en", OPTIONS)
+    cache.put(key, detections(1))
+    clock[0] += 4.9
+    assert cache.get(key) is not None
+    clock[0] += 0.2
+    assert cache.get(key) is None
+    assert cache.stats["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(make_frame):
+    cache = ResultCache(max_size=2)
+    keys = [cache.key(make_frame(i), "m.pt", 640, "en", OPTIONS) for i in range(3)]
+    cache.put(keys[0], detections(0))
+    cache.put(keys[1], detections(1))
+    cache.get(keys[0])
+    cache.put(keys[2], detections(2))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+
+def test_disabled_cache_stores_nothing(make_frame):
+    cache = ResultCache(max_size=0)
+    key = cache.key(make_frame(0), "m.pt", 640, "en", OPTIONS)
+    cache.put(key, detections(1))
+    assert cache.get(key) is None
+    assert cache.stats["misses"] == 0
+
+
+def test_perceptual_mode_matches_near_duplicates(make_frame):
+    cache = ResultCache(perceptual=True, max_distance=4)
+    frame = make_frame(0, width=90, height=80)
+    cache.put(cache.key(frame, "m.pt", 640, "en", OPTIONS), detections(1))
+    # sensor noise of a still scene changes few dHash bits, if any
+    noisy = frame.rgb.astype(np.int16) + np.random.default_rng(1).integers(
+        -2, 3, frame.rgb.shape
+    )
+    near = type(frame)(rgb=np.clip(noisy, 0, 255).astype(np.uint8))
+    assert cache.get(cache.key(near, "m.pt", 640, "en", OPTIONS)) is not None
+    other = make_frame(2, width=90, height=80)
+    assert cache.get(cache.key(other, "m.pt", 640, "en", OPTIONS)) is None
+
+
+def test_clear_drops_every_entry(make_frame):
+    cache = ResultCache()
+    key = cache.key(make_frame(0), "m.pt", 640, "en", OPTIONS)
+    cache.put(key, detections(1))
+    cache.clear()
+    assert cache.get(key) is None
+
+
+def test_repeated_frames_are_answered_from_the_cache(service, make_frame):
+    first = service.detect(make_frame(0))
+    again = service.detect(make_frame(0))
+    assert again is first
+    assert service.cache.stats["hits"] == 1
@@ -0,0 +1,26 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+RAW_HEADER = {"type": "frame", "format": "raw", "width": 4, "height": 4}
+
+
+def test_malformed_messages_are_answered_and_the_stream_goes_on():
+    # no lifespan, every frame here is rejected before detection
+    with TestClient(app).websocket_connect("/api/stream") as websocket:
+        websocket.send_text("{not json")
+        assert websocket.receive_json()["error"] == "Invalid header"
+        websocket.send_text("[1, 2]")
+        assert websocket.receive_json()["error"] == "Invalid header"
+        websocket.send_bytes(b"\x00" * 48)
+        assert websocket.receive_json()["error"] == "Invalid header"
+        websocket.send_text(json.dumps(RAW_HEADER))
+        websocket.send_text("not a frame")
+        assert websocket.receive_json()["error"] == "Invalid frame"
+        websocket.send_text(json.dumps(RAW_HEADER))
+        websocket.send_bytes(b"\x00" * 47)
+        result = websocket.receive_json()
+        assert result["type"] == "result"
+        assert result["error"] == "Invalid frame"
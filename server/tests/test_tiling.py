@@ -0,0 +1,61 @@
+import numpy as np
+
+from app.services.tiling import merge
+from app.services.tiling import tile_boxes
+from app.services.tiling import tile_grid
+
+
+def test_small_frames_are_not_sliced():
+    assert tile_grid(640, 480, imgsz=640) == (1, 1)
+    assert tile_grid(960, 960, imgsz=640, max_scale=1.5) == (1, 1)
+
+
+def test_grid_keeps_tiles_under_max_scale():
+    columns, rows = tile_grid(3840, 2160, imgsz=640, max_scale=1.5, max_tiles=100)
+    boxes = tile_boxes(3840, 2160, columns, rows)
+    sizes = boxes[:, 2:] - boxes[:, :2]
+    assert (sizes <= 640 * 1.5 + 1).all()
+    # the grid is the smallest one: a column or row less would make tiles too big
+    fewer_columns = tile_boxes(3840, 2160, columns - 1, rows)
+    fewer_rows = tile_boxes(3840, 2160, columns, rows - 1)
+    assert (fewer_columns[:, 2] - fewer_columns[:, 0]).max() > 640 * 1.5
+    assert (fewer_rows[:, 3] - fewer_rows[:, 1]).max() > 640 * 1.5
+
+
+def test_grid_is_capped_at_max_tiles():
+    columns, rows = tile_grid(8000, 1000, imgsz=640, max_tiles=4)
+    assert columns * rows <= 4
+    assert columns >= rows
+
+
+def test_tiles_cover_the_frame_with_overlap():
+    boxes = tile_boxes(1000, 600, columns=3, rows=2, overlap=0.2)
+    assert boxes.shape == (6, 4)
+    assert boxes[:, [0, 1]].min() == 0
+    assert boxes[:, 2].max() == 1000
+    assert boxes[:, 3].max() == 600
+    xs = np.unique(boxes[:, [0, 2]], axis=0)
+    # neighbouring columns overlap
+    assert (xs[1:, 0] < xs[:-1, 1]).all()
+
+
+def test_merge_drops_lower_scoring_duplicates_of_a_class():
+    data = np.array(
+        [
+            [0, 0, 100, 100, 0.9, 1],
+            [0, 0, 60, 100, 0.8, 1],  # cut at a tile edge, inside the first box
+            [0, 0, 100, 100, 0.7, 2],  # same place, other class
+            [300, 300, 400, 400, 0.6, 1],
+        ],
+        dtype=np.float32,
+    )
+    merged = merge(data, threshold=0.6)
+    assert merged[:, 4].tolist() == np.float32([0.9, 0.7, 0.6]).tolist()
+
+
+def test_merge_keeps_max_det_best_boxes():
+    data = np.array(
+        [[i * 10, 0, i * 10 + 5, 5, i / 10, 0] for i in range(10)], dtype=np.float32
+    )
+    merged = merge(data, max_det=3)
+    assert merged[:, 4].tolist() == np.float32([0.9, 0.8, 0.7]).tolist()
@@ -0,0 +1,119 @@
+import numpy as np
+
+from app.models.detection_result import Detections
+from app.models.detection_settings import DetectionOptions
+from app.services.frames import DecodedFrame
+from app.services.tracking import TrackingService
+
+FRAME = DecodedFrame(rgb=np.zeros((240, 320, 3), dtype=np.uint8))
+
+
+def make_detections(objects: list[tuple[str, float, float, float]]) -> Detections:
+    """Detections of 40x40 boxes, one per (label, x, y, confidence)."""
+    names = {"cup": 41, "person": 0}
+    boxes = [(x, y, x + 40, y + 40) for _, x, y, _ in objects]
+    return Detections(
+        boxes=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        confidences=np.array([c for *_, c in objects], dtype=np.float32),
+        class_ids=np.array([names[label] for label, *_ in objects], dtype=np.int64),
+        labels=np.array([label for label, *_ in objects], dtype=object),
+        imgsz=320,
+    )
+
+
+def moving_cups(step: int) -> Detections:
+    # two cups side by side and a person, all moving right
+    return make_detections(
+        [
+            ("cup", 20 + 4 * step, 40, 0.9),
+            ("cup", 120 + 4 * step, 40, 0.8),
+            ("person", 20 + 4 * step, 150, 0.7),
+        ]
+    )
+
+
+def track_ids_by_label(detections: Detections) -> dict[str, list[int]]:
+    ids = {}
+    for label, track_id in zip(
+        detections.labels.tolist(), detections.track_ids.tolist(), strict=True
+    ):
+        ids.setdefault(label, []).append(track_id)
+    return {label: sorted(track_ids) for label, track_ids in ids.items()}
+
+
+def test_track_ids_are_stable_across_frames():
+    tracking = TrackingService()
+    session = tracking.session("robot")
+    frames = [tracking.update(session, FRAME, moving_cups(step)) for step in range(5)]
+    ids = [track_ids_by_label(tracked) for tracked in frames]
+    assert ids[0] == ids[-1]
+    assert all(frame_ids == ids[0] for frame_ids in ids)
+
+
+def test_objects_of_one_label_are_tracked_apart():
+    # the robot counts sightings per (label, track id), two cups are two objects
+    tracking = TrackingService()
+    session = tracking.session("robot")
+    for step in range(3):
+        tracked = tracking.update(session, FRAME, moving_cups(step))
+    ids = track_ids_by_label(tracked)
+    assert len(ids["cup"]) == 2
+    assert len(set(ids["cup"]) | set(ids["person"])) == 3
+
+
+def test_sessions_do_not_share_tracks():
+    tracking = TrackingService()
+    first, second = tracking.session("a"), tracking.session("b")
+    for step in range(3):
+        tracking.update(first, FRAME, moving_cups(step))
+    tracked = tracking.update(second, FRAME, make_detections([("cup", 20, 40, 0.9)]))
+    assert tracked.track_ids.tolist() == [1]
+
+
+def test_skipped_frames_move_the_tracks():
+    tracking = TrackingService(skip_frames=2)
+    session = tracking.session("robot")
+    for step in range(4):
+        tracked = tracking.update(session, FRAME, moving_cups(step))
+    first = tracking.propagate(session)
+    second = tracking.propagate(session)
+    assert tracking.propagate(session) is None  # skipping used up
+    assert tracking.propagated == 2
+    assert sorted(first.track_ids.tolist()) == sorted(tracked.track_ids.tolist())
+    # the cups keep moving right at the tracked speed
+    x = {t: box[0] for t, box in zip(tracked.track_ids, tracked.boxes, strict=True)}
+    for track_id, box in zip(second.track_ids, second.boxes, strict=True):
+        assert box[0] > x[track_id]
+    after = tracking.update(session, FRAME, moving_cups(6))
+    assert track_ids_by_label(after) == track_ids_by_label(tracked)
+
+
+def test_weak_detections_keep_tracks_but_are_not_returned():
+    tracking = TrackingService()
+    options = DetectionOptions(confidence_threshold=0.5)
+    assert tracking.detection_options(options).confidence_threshold == 0.1
+    low = DetectionOptions(confidence_threshold=0.05)
+    assert tracking.detection_options(low) == low
+    session = tracking.session("robot")
+    for step in range(3):
+        tracked = tracking.update(
+            session, FRAME, make_detections([("cup", 20 + 4 * step, 40, 0.9)]), options
+        )
+    [track_id] = tracked.track_ids.tolist()
+    # occluded: a weak box holds the track, below the request threshold
+    weak = make_detections([("cup", 32, 40, 0.2)])
+    assert len(tracking.update(session, FRAME, weak, options)) == 0
+    assert len(tracking.update(session, FRAME, weak)) == 1
+    back = make_detections([("cup", 36, 40, 0.9)])
+    assert tracking.update(session, FRAME, back, options).track_ids.tolist() == [
+        track_id
+    ]
+
+
+def test_sessions_are_bounded():
+    tracking = TrackingService(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        tracking.session(session_id)
+    assert len(tracking) == 2
+    tracking.close("c")
+    assert len(tracking) == 1
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.translation import DictionaryBackend
+from app.services.translation import LabelTranslator
+from app.services.translation import TranslationBackend
+from app.services.translation import TranslationCache
+
+
+class FlakyBackend(TranslationBackend):
+    """Fails the first `failures` calls, then translates to upper case."""
+
+    name = "flaky"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls: list[list[str]] = []
+
+    async def translate_batch(self, labels: list[str], language: str) -> list:
+        self.calls.append(labels)
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("service unavailable")
+        return [label.upper() for label in labels]
+
+
+def make_translator(tmp_path, *backends, retries: int = 2) -> LabelTranslator:
+    cache = TranslationCache(tmp_path / "translations.sqlite")
+    return LabelTranslator(list(backends), cache, retries=retries, backoff_s=0)
+
+
+def test_dictionary_file_is_read(tmp_path):
+    (tmp_path / "cs.json").write_text(json.dumps({"cup": "hrnek"}))
+    backend = DictionaryBackend(path=tmp_path)
+    texts = asyncio.run(backend.translate_batch(["cup", "person"], "cs"))
+    assert texts == ["hrnek", None]
+    assert asyncio.run(backend.translate_batch(["cup"], "de")) == [None]
+
+
+def test_cached_labels_skip_the_backends(tmp_path):
+    flaky = FlakyBackend(failures=0)
+    translator = make_translator(
+        tmp_path, DictionaryBackend({"cs": {"cup": "hrnek"}}), flaky
+    )
+    first = asyncio.run(translator.translate(["cup", "person"], "cs"))
+    assert first == {"cup": "hrnek", "person": "PERSON"}
+    assert flaky.calls == [["person"]]
+    again = asyncio.run(translator.translate(["person", "cup"], "cs"))
+    assert again == first
+    assert flaky.calls == [["person"]]
+    assert len(translator.cache) == 2
+
+
+def test_failed_batches_are_retried(tmp_path):
+    flaky = FlakyBackend(failures=2)
+    translator = make_translator(tmp_path, flaky, retries=2)
+    assert asyncio.run(translator.translate(["cup"], "cs")) == {"cup": "CUP"}
+    assert len(flaky.calls) == 3
+
+
+def test_exhausted_retries_raise_and_cache_nothing(tmp_path):
+    flaky = FlakyBackend(failures=3)
+    translator = make_translator(tmp_path, flaky, retries=2)
+    with pytest.raises(ConnectionError):
+        asyncio.run(translator.translate(["cup"], "cs"))
+    assert len(flaky.calls) == 3
+    assert len(translator.cache) == 0
+
+
+def test_failed_backend_falls_through_to_the_next(tmp_path):
+    translator = make_translator(
+        tmp_path,
+        FlakyBackend(failures=10),
+        DictionaryBackend({"cs": {"cup": "hrnek"}}),
+        retries=0,
+    )
+    assert asyncio.run(translator.translate(["cup"], "cs")) == {"cup": "hrnek"}
+
+
+def test_english_is_not_translated(tmp_path):
+    flaky = FlakyBackend(failures=0)
+    translator = make_translator(tmp_path, flaky)
+    assert asyncio.run(translator.translate(["cup"], "en")) == {}
+    assert flaky.calls == []